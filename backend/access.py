@@ -0,0 +1,140 @@
+"""
+Active-membership index for the door check-in.
+
+membership_access has one row per ACTIVATED membership that has not expired,
+keyed by (client_id, membership_id): "may this client come in today (with the
+sauna)?" is a single primary-key range read, without touching memberships,
+payments or the users hierarchy. Every write that activates, shortens or
+deletes memberships calls the helpers below in the same transaction.
+Expired rows do no harm (the lookup filters on the dates); prune() removes them.
+
+Consistency check / rebuild:
+    python -m backend.access check
+    python -m backend.access rebuild
+    python -m backend.access prune
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from . import models
+from .finance_models import MembershipAccess, MembershipPayment, PaymentStatus
+
+_access = MembershipAccess.__table__
+
+
+def grant(db: Session | Connection, memberships: list[dict]) -> None:
+    """
+    Adds activated memberships (dicts with id_m, client_id, start_date,
+    end_date, with_sauna). Call in the transaction that activates them.
+    """
+    rows = [
+        dict(
+            client_id=m["client_id"],
+            membership_id=m["id_m"],
+            start_date=m["start_date"],
+            end_date=m["end_date"] or m["start_date"],
+            with_sauna=m["with_sauna"],
+        )
+        for m in memberships
+    ]
+    if rows:
+        db.execute(insert(_access), rows)
+
+
+def grant_membership(db: Session, m: models.Membership) -> None:
+    grant(db, [dict(id_m=m.id_m, client_id=m.client_id, start_date=m.start_date, end_date=m.end_date, with_sauna=m.with_sauna)])
+
+
+def revoke_client(db: Session, client_id: int) -> None:
+    """Call BEFORE deleting the client's memberships."""
+    db.execute(delete(_access).where(_access.c.client_id == client_id))
+
+
+def lookup(db: Session, client_id: int, day: date, sauna: bool = False):
+    """
+    The membership that lets the client in on `day` (with the sauna when asked),
+    as a (membership_id, end_date, with_sauna) row, or None.
+    """
+    stmt = (
+        select(_access.c.membership_id, _access.c.end_date, _access.c.with_sauna)
+        .where(_access.c.client_id == client_id, _access.c.start_date <= day, _access.c.end_date >= day)
+        .order_by(_access.c.with_sauna.desc(), _access.c.end_date.desc())
+        .limit(1)
+    )
+    if sauna:
+        stmt = stmt.where(_access.c.with_sauna.is_(True))
+    return db.execute(stmt).first()
+
+
+def _active_select(today: date):
+    m, p = models.Membership, MembershipPayment
+    end = func.coalesce(m.end_date, m.start_date)
+    return (
+        select(m.client_id, m.id_m, m.start_date, end, m.with_sauna)
+        .join(p, p.membership_id == m.id_m)
+        .where(p.status == PaymentStatus.ACTIVATED, end >= today)
+    )
+
+
+def rebuild(bind: Connection, today: date | None = None) -> int:
+    """Recomputes the index from memberships + payments. Returns the number of rows."""
+    today = today or date.today()
+    bind.execute(delete(_access))
+    bind.execute(insert(_access).from_select(
+        ["client_id", "membership_id", "start_date", "end_date", "with_sauna"], _active_select(today)
+    ))
+    return bind.execute(select(func.count()).select_from(_access)).scalar()
+
+
+def prune(bind: Session | Connection, today: date | None = None) -> int:
+    """Drops rows of expired memberships. Returns the number of deleted rows."""
+    return bind.execute(delete(_access).where(_access.c.end_date < (today or date.today()))).rowcount
+
+
+def find_mismatches(bind: Connection, today: date | None = None) -> tuple[set, set]:
+    """(missing, unexpected) rows among the memberships that are valid today or later."""
+    today = today or date.today()
+    actual = {tuple(r) for r in bind.execute(_active_select(today)).all()}
+    stored = {
+        tuple(r) for r in bind.execute(
+            select(_access.c.client_id, _access.c.membership_id, _access.c.start_date, _access.c.end_date, _access.c.with_sauna)
+            .where(_access.c.end_date >= today)
+        ).all()
+    }
+    return actual - stored, stored - actual
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check, rebuild or prune the active-membership index.")
+    parser.add_argument("command", choices=["check", "rebuild", "prune"])
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    if args.command == "check":
+        with engine.connect() as conn:
+            missing, unexpected = find_mismatches(conn)
+        for row in sorted(missing)[:50]:
+            print(f"missing    {row}")
+        for row in sorted(unexpected)[:50]:
+            print(f"unexpected {row}")
+        print(f"{len(missing)} missing, {len(unexpected)} unexpected row(s)")
+        return 1 if missing or unexpected else 0
+
+    with engine.begin() as conn:
+        if args.command == "rebuild":
+            print(f"membership_access: {rebuild(conn)} rows")
+        else:
+            print(f"pruned {prune(conn)} expired row(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Async SQLAlchemy engine/session next to the sync one in database.py.
+
+Used by the hot read endpoints (timetable, my-bookings, client memberships,
+staff list), so they run on the event loop instead of FastAPI's threadpool and
+their concurrency is bounded by the connection pool, not by the thread count.
+
+The URL is ASYNC_DATABASE_URL, or DATABASE_URL with the driver swapped:
+    postgresql://...          -> postgresql+asyncpg://...
+    postgresql+psycopg2://... -> postgresql+asyncpg://...
+    sqlite:///...             -> sqlite+aiosqlite:///...
+Needs the asyncpg (or aiosqlite) driver and greenlet installed.
+Pool sizing reuses the DB_POOL_* settings from database.py (a separate pool).
+
+With DATABASE_REPLICA_URL set, get_async_read_db serves read-only routes from
+the replica (ASYNC_DATABASE_REPLICA_URL overrides the derived async URL), except
+for requests pinned to the primary after a write (database.pin_primary).
+"""
+import os
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from .database import (
+    SQLALCHEMY_DATABASE_URL,
+    SQLALCHEMY_REPLICA_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    reads_from_primary,
+)
+
+
+def to_async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql+psycopg://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://") and not url.startswith("sqlite+"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or (
+    to_async_url(SQLALCHEMY_REPLICA_URL) if SQLALCHEMY_REPLICA_URL else None
+)
+
+_async_engine = None
+_AsyncSessionLocal = None
+_async_replica_engine = None
+_AsyncReadSessionLocal = None
+
+
+def _create(url: str):
+    kwargs = {}
+    if not url.startswith("sqlite"):
+        kwargs = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": DB_POOL_PRE_PING,
+        }
+    engine = create_async_engine(url, **kwargs)
+    return engine, async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+
+def get_async_engine():
+    """Created on first use, so importing the app does not require the async driver."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine, _AsyncSessionLocal = _create(ASYNC_DATABASE_URL)
+    return _async_engine
+
+
+def get_async_replica_engine():
+    """Replica engine (lazy); the primary one when no replica is configured."""
+    global _async_replica_engine, _AsyncReadSessionLocal
+    if ASYNC_DATABASE_REPLICA_URL is None:
+        return get_async_engine()
+    if _async_replica_engine is None:
+        _async_replica_engine, _AsyncReadSessionLocal = _create(ASYNC_DATABASE_REPLICA_URL)
+    return _async_replica_engine
+
+
+# Dependency: async session per request (primary)
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency: async session for read-only routes (replica unless pinned to the primary)
+async def get_async_read_db(request: Request):
+    if ASYNC_DATABASE_REPLICA_URL is None or reads_from_primary(request):
+        get_async_engine()
+        factory = _AsyncSessionLocal
+    else:
+        get_async_replica_engine()
+        factory = _AsyncReadSessionLocal
+    async with factory() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _async_replica_engine is not None:
+        await _async_replica_engine.dispose()
@@ -0,0 +1,212 @@
+"""
+Side-by-side benchmark: async read endpoints vs the same queries in sync `def` routes.
+
+Both variants run in-process through an ASGI transport (no network), so the
+difference shown is threadpool-bound (sync) vs event-loop + pool-bound (async).
+Each sync twin runs the async route's statements and row builders (shared
+helpers in schedule.py, finance_router.py, manager_staff.py) and declares the
+same response_model, so only the execution model differs. Cases: my bookings,
+a client's memberships, the timetable and the staff list. The response cache is
+turned off, so the timetable is built from the database on every request.
+
+    python -m backend.benchmarks.async_vs_sync --requests 2000 --concurrency 200
+
+--client-id defaults to the client with the most bookings, --manager-id to the
+first manager. Needs httpx and the async driver (asyncpg / aiosqlite).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import date
+from typing import Literal, Optional
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .. import models, occupancy, response_cache, schedule
+from .. import finance_models  # noqa: F401 (registers finance tables)
+from .. import finance_router as finance
+from .. import manager_staff as staff
+from ..database import SessionLocal, get_read_db
+from ..finance_schemas import MembershipResponse
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(schedule.router)
+    app.include_router(finance.router)
+    app.include_router(staff.router)
+    # both variants hit the database on every request
+    response_cache.cache.max_entries = 0
+
+    # sync twins of the async routes (same SQL and serialization, threadpool execution)
+    @app.get("/sync/schedule/classes", response_model=list[schedule.TimetableClass])
+    def sync_timetable(
+        request: Request,
+        date_from: Optional[date] = Query(default=None),
+        date_to: Optional[date] = Query(default=None),
+        room: Optional[str] = Query(default=None),
+        instructor_id: Optional[int] = Query(default=None, ge=1),
+        name: Optional[str] = Query(default=None, min_length=1),
+        cursor: Optional[str] = Query(default=None),
+        limit: int = Query(default=schedule.DEFAULT_PAGE_SIZE, ge=1, le=schedule.MAX_PAGE_SIZE),
+        db: Session = Depends(get_read_db),
+    ):
+        date_from, date_to = schedule._timetable_range(date_from, date_to)
+
+        def build():
+            stmt = schedule._timetable_stmt(
+                date_from=date_from, date_to=date_to, room=room, instructor_id=instructor_id,
+                name=name, cursor=cursor, limit=limit,
+            )
+            classes, headers = schedule._timetable_page(db.execute(stmt).scalars().all(), limit)
+            counts = occupancy.get_booked_counts(db, [c.id_c for c in classes])
+            return schedule._timetable_rows(classes, counts), headers
+
+        return response_cache.cached_json(request, response_cache.TIMETABLE, build)
+
+    @app.get("/sync/schedule/my-bookings/{client_id}", response_model=list[schedule.MyBooking])
+    def sync_my_bookings(
+        client_id: int,
+        response: Response,
+        when: Optional[Literal["upcoming", "past"]] = Query(default=None),
+        limit: Optional[int] = Query(default=None, ge=1, le=schedule.MAX_PAGE_SIZE),
+        offset: int = Query(default=0, ge=0),
+        db: Session = Depends(get_read_db),
+    ):
+        stmt = schedule._my_bookings_stmt(client_id, when)
+        if limit is not None:
+            total = db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+            response.headers["X-Total-Count"] = str(total)
+            stmt = stmt.limit(limit).offset(offset)
+        return schedule._my_booking_rows(db.execute(stmt).all())
+
+    @app.get("/sync/clients/{client_id}/memberships", response_model=list[MembershipResponse])
+    def sync_memberships(client_id: int, db: Session = Depends(get_read_db)):
+        user = db.execute(select(models.User).where(models.User.id_u == client_id)).scalars().first()
+        if not user or user.role != models.UserRole.CLIENT:
+            raise HTTPException(status_code=404, detail=f"User {client_id} with role {models.UserRole.CLIENT} not found")
+        rows = db.execute(finance._client_memberships_stmt(client_id)).all()
+        return finance._client_membership_rows(client_id, rows)
+
+    @app.get("/sync/manager/staff", response_model=list[staff.StaffResponse])
+    def sync_staff(
+        manager_id: int = Query(..., ge=1),
+        role: staff.StaffRole | None = Query(default=None),
+        db: Session = Depends(get_read_db),
+    ):
+        if db.execute(select(models.Manager).where(models.Manager.id_u == manager_id)).scalars().first() is None:
+            raise HTTPException(status_code=403, detail="Only MANAGER can perform this action.")
+        rows = db.execute(staff._staff_stmt(role)).scalars().all()
+        return staff._staff_rows(rows)
+
+    return app
+
+
+def _busiest_client() -> int:
+    db = SessionLocal()
+    try:
+        row = db.execute(
+            select(models.BookGroupClasses.client_id, func.count())
+            .group_by(models.BookGroupClasses.client_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).first()
+        if row is None:
+            raise SystemExit("No bookings in the database; pass --client-id or seed data first.")
+        return row[0]
+    finally:
+        db.close()
+
+
+def _first_manager() -> int:
+    db = SessionLocal()
+    try:
+        manager_id = db.execute(select(models.Manager.id_u).order_by(models.Manager.id_u).limit(1)).scalar()
+        if manager_id is None:
+            raise SystemExit("No manager in the database; pass --manager-id or seed data first.")
+        return manager_id
+    finally:
+        db.close()
+
+
+async def _run(client: httpx.AsyncClient, path: str, n: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.get(path)
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    wall = time.perf_counter() - t_start
+
+    latencies.sort()
+    return {
+        "path": path,
+        "requests": n,
+        "errors": errors,
+        "rps": round(n / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 2),
+    }
+
+
+async def main_async(n: int, concurrency: int, client_id: int, manager_id: int) -> list[dict]:
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    pairs = [
+        (f"/sync/schedule/my-bookings/{client_id}", f"/schedule/my-bookings/{client_id}"),
+        (f"/sync/clients/{client_id}/memberships", f"/clients/{client_id}/memberships"),
+        ("/sync/schedule/classes", "/schedule/classes"),
+        (f"/sync/manager/staff?manager_id={manager_id}", f"/manager/staff?manager_id={manager_id}"),
+    ]
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for sync_path, async_path in pairs:
+            # warm-up both pools
+            await _run(client, sync_path, min(50, n), concurrency)
+            await _run(client, async_path, min(50, n), concurrency)
+            results.append({"variant": "sync", **await _run(client, sync_path, n, concurrency)})
+            results.append({"variant": "async", **await _run(client, async_path, n, concurrency)})
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Async vs sync read endpoint benchmark.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--client-id", type=int, default=None)
+    parser.add_argument("--manager-id", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    client_id = args.client_id or _busiest_client()
+    manager_id = args.manager_id or _first_manager()
+    results = asyncio.run(main_async(args.requests, args.concurrency, client_id, manager_id))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'variant':<7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}  path")
+        for r in results:
+            print(f"{r['variant']:<7} {r['rps']:>9} {r['p50_ms']:>9} {r['p99_ms']:>9} {r['errors']:>7}  {r['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
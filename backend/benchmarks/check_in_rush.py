@@ -0,0 +1,102 @@
+"""
+Morning-rush benchmark for the door check-in (POST /reception/check-in).
+
+    python -m backend.benchmarks.seed_chain --preset dev        # data first
+    python -m backend.benchmarks.check_in_rush --requests 2000
+    python -m backend.benchmarks.check_in_rush --base-url http://localhost:8000 --concurrency 8
+
+Fires check-ins for clients with a membership valid today (plus a share of
+clients without one, which take the refusal path) and reports the latency
+percentiles. Exits with 1 when p99 is above CHECK_IN_P99_BUDGET_MS
+(default 9 ms; env or --budget-ms). Every run adds rows to check_ins.
+
+--concurrency is the number of doors checking people in at once. In-process
+all of them share one event loop, so the default of 1 measures the time of a
+single check-in; for a rush over several doors point --base-url at a server
+with several workers.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import date
+
+import httpx
+from sqlalchemy import select
+
+from .. import models
+from ..database import SessionLocal
+from ..finance_models import MembershipAccess
+from .endpoints import Scenario, run_scenario
+
+CHECK_IN_P99_BUDGET_MS = float(os.getenv("CHECK_IN_P99_BUDGET_MS", "9"))
+
+
+def _clients(limit: int) -> tuple[list[int], list[int], int | None]:
+    today = date.today()
+    db = SessionLocal()
+    try:
+        members = db.execute(
+            select(MembershipAccess.client_id)
+            .where(MembershipAccess.start_date <= today, MembershipAccess.end_date >= today)
+            .group_by(MembershipAccess.client_id)
+            .limit(limit)
+        ).scalars().all()
+        others = db.execute(
+            select(models.Client.id_u)
+            .where(models.Client.id_u.not_in(select(MembershipAccess.client_id)))
+            .limit(max(1, limit // 10))
+        ).scalars().all()
+        receptionist = db.execute(select(models.Receptionist.id_u).limit(1)).scalar()
+        return list(members), list(others), receptionist
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check-in latency under a morning rush.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=1, help="doors checking in at the same time")
+    parser.add_argument("--refused-share", type=float, default=0.05, help="share of check-ins without a valid membership")
+    parser.add_argument("--budget-ms", type=float, default=CHECK_IN_P99_BUDGET_MS)
+    parser.add_argument("--base-url", default=None, help="benchmark a running server instead of in-process")
+    args = parser.parse_args(argv)
+
+    members, others, receptionist = _clients(5_000)
+    if not members:
+        raise SystemExit("No client has a membership valid today; run python -m backend.benchmarks.seed_chain first.")
+    every = int(1 / args.refused_share) if args.refused_share > 0 and others else 0
+
+    def make(i: int):
+        refused = every and i % every == 0
+        client = others[i % len(others)] if refused else members[i % len(members)]
+        body = {"client_id": client, "receptionist_id": receptionist, "sauna": i % 3 == 0}
+        return [("POST", "/reception/check-in", body, (200,))]
+
+    sc = Scenario("check-in, morning rush", "finance_router", make, write=True)
+
+    async def run() -> dict:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        else:
+            from ..main import app
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        async with client:
+            await run_scenario(client, sc, min(200, args.requests), args.concurrency, offset=args.requests)  # warm-up
+            return await run_scenario(client, sc, args.requests, args.concurrency)
+
+    result = asyncio.run(run())
+    result["budget_p99_ms"] = args.budget_ms
+    print(json.dumps(result, indent=2))
+
+    if result["errors"] or result["p99_ms"] > args.budget_ms:
+        print(f"p99 {result['p99_ms']} ms (budget {args.budget_ms} ms), errors {result['errors']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
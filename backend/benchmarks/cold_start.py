@@ -0,0 +1,92 @@
+"""
+Cold-start check: time to import the app and time until the worker is ready.
+
+Every run is a fresh interpreter, which is what a new uvicorn/gunicorn worker pays:
+
+    python -m backend.benchmarks.cold_start --runs 5
+
+Each run also counts the SQL statements issued while importing backend.main
+(must be 0: no connection, no DDL at import). Exits with 1 when a median is
+above the targets in backend/startup.py (COLD_START_*_TARGET_MS) or when the
+import touched the database. Run migrations first, otherwise warm-up reports
+"migrations pending".
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, "before_cursor_execute", lambda *a, **kw: statements.append(a[2]))
+import backend.main
+t_import = time.perf_counter()
+import_statements = len(statements)
+from backend import startup
+ready = startup.warm_up()
+t_ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "ready_ms": (t_ready - t0) * 1000,
+    "import_statements": import_statements,
+    "ready": ready,
+    "status": startup.readiness.snapshot()["status"],
+}))
+"""
+
+
+def _one_run() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _CHILD],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure worker cold start (import + warm-up).")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    from ..startup import COLD_START_IMPORT_TARGET_MS, COLD_START_READY_TARGET_MS
+
+    runs = [_one_run() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "import_ms_max": round(max(r["import_ms"] for r in runs), 1),
+        "ready_ms_median": round(statistics.median(r["ready_ms"] for r in runs), 1),
+        "ready_ms_max": round(max(r["ready_ms"] for r in runs), 1),
+        "import_statements": max(r["import_statements"] for r in runs),
+        "status": runs[-1]["status"],
+        "import_target_ms": COLD_START_IMPORT_TARGET_MS,
+        "ready_target_ms": COLD_START_READY_TARGET_MS,
+    }
+    ok = (
+        report["import_ms_median"] <= COLD_START_IMPORT_TARGET_MS
+        and report["ready_ms_median"] <= COLD_START_READY_TARGET_MS
+        and report["import_statements"] == 0
+        and all(r["ready"] for r in runs)
+    )
+    report["ok"] = ok
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import  median {report['import_ms_median']} ms  max {report['import_ms_max']} ms  (target {COLD_START_IMPORT_TARGET_MS} ms)")
+        print(f"ready   median {report['ready_ms_median']} ms  max {report['ready_ms_max']} ms  (target {COLD_START_READY_TARGET_MS} ms)")
+        print(f"SQL statements during import: {report['import_statements']}")
+        print(f"worker status: {report['status']}  ->  {'OK' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
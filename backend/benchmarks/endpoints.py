@@ -0,0 +1,340 @@
+"""
+Endpoint benchmark suite: latency and throughput per router, JSON report.
+
+    python -m backend.benchmarks.seed_chain --preset dev        # data first
+    python -m backend.benchmarks.endpoints --out bench-new.json
+    python -m backend.benchmarks.endpoints --compare bench-old.json --max-regression 20
+
+Runs in-process through an ASGI transport by default (no network, no server);
+--base-url http://localhost:8000 benchmarks a running server instead.
+
+Scenarios cover every router: schedule (timetable, my-bookings, book + cancel),
+finance_router (catalog, client memberships, reception reserve + cancel),
+individual_classes (free slots), manager_staff (staff list) and login. Write
+scenarios undo themselves (book -> cancel) and use clients without bookings.
+For each scenario the report has rps, p50/p95/p99/max latency, errors and,
+from the Server-Timing header, the average statements and DB time per operation.
+
+--compare prints the change against an older report; with --max-regression
+the exit code is 1 when any p95 got worse by more than that many percent.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable
+
+import httpx
+from sqlalchemy import exists, func, select
+
+from .. import models, finance_models  # noqa: F401 (registers finance tables)
+from ..database import SessionLocal, engine
+from ..finance_router import MAX_CLASS_CAPACITY
+from .seed_chain import BENCH_PASSWORD, EMAIL_DOMAIN
+
+# one operation = one or more requests: (method, path, json body, accepted status codes)
+Request = tuple[str, str, dict | None, tuple[int, ...]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    router: str
+    make: Callable[[int], list[Request]]
+    write: bool = False
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def discover() -> dict:
+    """Picks the ids the scenarios need from the current database."""
+    db = SessionLocal()
+    try:
+        def first(stmt):
+            return db.execute(stmt).scalar()
+
+        busiest = db.execute(
+            select(models.BookGroupClasses.client_id, func.count())
+            .group_by(models.BookGroupClasses.client_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).first()
+        if busiest is None:
+            raise SystemExit("No bookings in the database; run python -m backend.benchmarks.seed_chain first.")
+
+        spare = db.execute(
+            select(models.Client.id_u)
+            .where(~exists().where(models.BookGroupClasses.client_id == models.Client.id_u))
+            .order_by(models.Client.id_u)
+            .limit(500)
+        ).scalars().all()
+        open_classes = db.execute(
+            select(models.GroupClassOccupancy.group_classes_id)
+            .join(models.Classes, models.Classes.id_c == models.GroupClassOccupancy.group_classes_id)
+            .where(
+                models.Classes.start_date >= date.today(),
+                models.GroupClassOccupancy.booked_count <= MAX_CLASS_CAPACITY - 5,
+            )
+            .order_by(models.Classes.start_date, models.Classes.id_c)
+            .limit(200)
+        ).scalars().all()
+        rooms = db.execute(
+            select(models.Classes.room)
+            .where(models.Classes.start_date >= date.today())
+            .group_by(models.Classes.room)
+            .order_by(models.Classes.room)
+            .limit(50)
+        ).scalars().all()
+        membership_client = db.execute(
+            select(models.Membership.client_id)
+            .group_by(models.Membership.client_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        ).scalar()
+        login_email = first(
+            select(models.User.email).where(models.User.email.like(f"%@{EMAIL_DOMAIN}"), models.User.role == models.UserRole.CLIENT).limit(1)
+        )
+
+        return {
+            "busy_client": busiest[0],
+            "spare_clients": list(spare),
+            "open_classes": list(open_classes),
+            "rooms": list(rooms),
+            "membership_client": membership_client or busiest[0],
+            "manager": first(select(models.Manager.id_u).limit(1)),
+            "receptionist": first(select(models.Receptionist.id_u).limit(1)),
+            "trainers": db.execute(select(models.PersonalTrainer.id_u).order_by(models.PersonalTrainer.id_u).limit(50)).scalars().all(),
+            "login_email": login_email,
+            "dataset": {
+                "users": first(select(func.count()).select_from(models.User)),
+                "classes": first(select(func.count()).select_from(models.Classes)),
+                "bookings": first(select(func.count()).select_from(models.BookGroupClasses)),
+                "memberships": first(select(func.count()).select_from(models.Membership)),
+            },
+        }
+    finally:
+        db.close()
+
+
+def scenarios(ctx: dict) -> list[Scenario]:
+    today = date.today()
+    ok = (200,)
+    busy, spare, classes = ctx["busy_client"], ctx["spare_clients"], ctx["open_classes"]
+    rooms, trainers = ctx["rooms"] or ["A"], ctx["trainers"]
+
+    def pair(i: int) -> tuple[int, int]:
+        # class changes fastest: concurrent operations land on different classes
+        return spare[(i // len(classes)) % len(spare)], classes[i % len(classes)]
+
+    def book_cancel(i: int) -> list[Request]:
+        client, gc = pair(i)
+        return [
+            ("POST", "/schedule/book", {"client_id": client, "group_class_id": gc}, ok),
+            ("DELETE", f"/schedule/bookings/{client}/{gc}", None, ok),
+        ]
+
+    def reserve_cancel(i: int) -> list[Request]:
+        client, gc = pair(i + len(spare) * len(classes) // 2)
+        return [
+            ("POST", f"/reception/group-classes/{gc}/reserve", {"receptionist_id": ctx["receptionist"], "client_id": client}, ok),
+            ("DELETE", f"/schedule/bookings/{client}/{gc}", None, ok),
+        ]
+
+    def window(i: int) -> str:
+        start = today + timedelta(days=i % 28)
+        return f"date_from={start}&date_to={start + timedelta(days=6)}"
+
+    out = [
+        Scenario("timetable, first page (cached)", "schedule",
+                 lambda i: [("GET", "/schedule/classes?limit=50", None, ok)]),
+        Scenario("timetable, room + week (mostly misses)", "schedule",
+                 lambda i: [("GET", f"/schedule/classes?room={rooms[i % len(rooms)]}&{window(i // len(rooms))}", None, ok)]),
+        Scenario("my-bookings, busiest client", "schedule",
+                 lambda i: [("GET", f"/schedule/my-bookings/{busy}", None, ok)]),
+        Scenario("my-bookings, upcoming page of 20", "schedule",
+                 lambda i: [("GET", f"/schedule/my-bookings/{busy}?when=upcoming&limit=20", None, ok)]),
+        Scenario("membership catalog", "finance_router",
+                 lambda i: [("GET", "/memberships/catalog", None, ok)]),
+        Scenario("client memberships", "finance_router",
+                 lambda i: [("GET", f"/clients/{ctx['membership_client']}/memberships", None, ok)]),
+        Scenario("staff list", "manager_staff",
+                 lambda i: [("GET", f"/manager/staff?manager_id={ctx['manager']}", None, ok)]),
+    ]
+    if trainers:
+        out.append(Scenario("free slots, trainer week", "individual_classes",
+                            lambda i: [("GET", f"/classes/free-slots?per_trainer_id={trainers[i % len(trainers)]}&{window(i)}", None, ok)]))
+    out.append(Scenario("free slots, room week", "individual_classes",
+                        lambda i: [("GET", f"/classes/free-slots?room={rooms[i % len(rooms)]}&{window(i)}", None, ok)]))
+    if ctx["login_email"]:
+        out.append(Scenario("login", "login",
+                            lambda i: [("POST", "/login", {"email": ctx["login_email"], "password": BENCH_PASSWORD}, ok)]))
+    if spare and classes:
+        out.append(Scenario("book + cancel", "schedule", book_cancel, write=True))
+        if ctx["receptionist"]:
+            out.append(Scenario("reception reserve + cancel", "finance_router", reserve_cancel, write=True))
+    return out
+
+
+def _server_timing(header: str | None) -> tuple[float, int]:
+    # db;dur=1.2;desc="5 statements"
+    if not header:
+        return 0.0, 0
+    dur, statements = 0.0, 0
+    for part in header.split(";"):
+        part = part.strip()
+        if part.startswith("dur="):
+            dur = float(part[4:])
+        elif part.startswith("desc="):
+            statements = int(part[5:].strip('"').split()[0])
+    return dur, statements
+
+
+async def run_scenario(client: httpx.AsyncClient, sc: Scenario, n: int, concurrency: int, offset: int = 0) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    db_ms = 0.0
+    statements = 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors, db_ms, statements
+        async with sem:
+            t0 = time.perf_counter()
+            for method, path, body, accepted in sc.make(offset + i):
+                r = await client.request(method, path, json=body)
+                if r.status_code not in accepted:
+                    errors += 1
+                dur, count = _server_timing(r.headers.get("server-timing"))
+                db_ms += dur
+                statements += count
+            latencies.append(time.perf_counter() - t0)
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - t_start
+
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        "scenario": sc.name,
+        "router": sc.router,
+        "write": sc.write,
+        "operations": n,
+        "errors": errors,
+        "rps": round(n / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "statements_per_op": round(statements / n, 2),
+        "db_ms_per_op": round(db_ms / n, 3),
+    }
+
+
+async def run_all(ctx: dict, n: int, concurrency: int, base_url: str | None, only: str | None, reads_only: bool) -> list[dict]:
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        from ..main import app  # import is side-effect free
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+    results = []
+    async with client:
+        for sc in scenarios(ctx):
+            if only and only not in sc.router and only not in sc.name:
+                continue
+            if reads_only and sc.write:
+                continue
+            await run_scenario(client, sc, min(50, n), concurrency, offset=n)  # warm-up
+            results.append(await run_scenario(client, sc, n, concurrency))
+    return results
+
+
+def compare(old: dict, new: dict) -> tuple[list[str], float]:
+    """Lines of the comparison table and the worst p95 change (percent)."""
+    before = {r["scenario"]: r for r in old["results"]}
+    lines = [f"{'scenario':<42} {'p95 old':>9} {'p95 new':>9} {'change':>8} {'rps old':>9} {'rps new':>9}"]
+    worst = float("-inf")
+    for r in new["results"]:
+        o = before.get(r["scenario"])
+        if o is None:
+            lines.append(f"{r['scenario']:<42} {'-':>9} {r['p95_ms']:>9} {'new':>8} {'-':>9} {r['rps']:>9}")
+            continue
+        change = (r["p95_ms"] - o["p95_ms"]) / o["p95_ms"] * 100 if o["p95_ms"] else 0.0
+        worst = max(worst, change)
+        lines.append(f"{r['scenario']:<42} {o['p95_ms']:>9} {r['p95_ms']:>9} {change:>+7.1f}% {o['rps']:>9} {r['rps']:>9}")
+    return lines, worst
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every router and write a JSON report.")
+    parser.add_argument("--requests", type=int, default=500, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--base-url", default=None, help="benchmark a running server instead of in-process")
+    parser.add_argument("--only", default=None, help="run scenarios whose router or name contains this")
+    parser.add_argument("--reads-only", action="store_true", help="skip the write scenarios")
+    parser.add_argument("--out", default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="older JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=None, help="fail if any p95 got worse by more than N percent")
+    args = parser.parse_args(argv)
+
+    ctx = discover()
+    results = asyncio.run(run_all(ctx, args.requests, args.concurrency, args.base_url, args.only, args.reads_only))
+
+    report = {
+        "meta": {
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "target": args.base_url or "in-process",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "dataset": ctx["dataset"],
+        },
+        "results": results,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    print(f"\n{'scenario':<42} {'router':<19} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'stmts':>6} {'err':>5}", file=sys.stderr)
+    for r in results:
+        print(f"{r['scenario']:<42} {r['router']:<19} {r['rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['statements_per_op']:>6} {r['errors']:>5}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        lines, worst = compare(old, report)
+        print("\n" + "\n".join(lines), file=sys.stderr)
+        if args.max_regression is not None and worst > args.max_regression:
+            print(f"\np95 regression {worst:+.1f}% exceeds {args.max_regression}%", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Opening-time login burst benchmark (POST /login with scrypt hashes).
+
+    python -m backend.benchmarks.seed_chain --preset dev        # data first
+    python -m backend.benchmarks.login_burst --requests 500 --concurrency 100
+    python -m backend.benchmarks.login_burst --base-url http://localhost:8000
+
+Fires --requests logins of seeded users (BENCH_PASSWORD) with --concurrency in
+flight, and meanwhile one probe at a time on GET /memberships/catalog, a route
+that does no hashing and runs in the shared threadpool. Reports the login
+throughput and latency, how many logins were turned away with 503 (hashing
+queue full, see passwords.py) and the probe latency during the burst. Exits
+with 1 on other errors or when the probe p99 is above
+LOGIN_BURST_PROBE_P99_BUDGET_MS (default 50 ms; env or --budget-ms): a login
+burst must not slow down the rest of the API.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from sqlalchemy import select
+
+from .. import models, passwords
+from ..database import SessionLocal
+from .seed_chain import BENCH_PASSWORD, EMAIL_DOMAIN
+
+LOGIN_BURST_PROBE_P99_BUDGET_MS = float(os.getenv("LOGIN_BURST_PROBE_P99_BUDGET_MS", "50"))
+
+
+def _emails(limit: int) -> list[str]:
+    db = SessionLocal()
+    try:
+        return list(db.execute(
+            select(models.User.email).where(models.User.email.like(f"%@{EMAIL_DOMAIN}")).limit(limit)
+        ).scalars().all())
+    finally:
+        db.close()
+
+
+def _stats(latencies: list[float], wall: float | None = None) -> dict:
+    if not latencies:
+        return {"count": 0}
+    latencies = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    out = {
+        "count": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+    if wall:
+        out["rps"] = round(len(latencies) / wall, 1)
+    return out
+
+
+async def burst(client: httpx.AsyncClient, emails: list[str], n: int, concurrency: int) -> dict:
+    ok: list[float] = []
+    busy = errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    probe: list[float] = []
+
+    async def login(i: int) -> None:
+        nonlocal busy, errors
+        async with sem:
+            t0 = time.perf_counter()
+            r = await client.post("/login", json={"email": emails[i % len(emails)], "password": BENCH_PASSWORD})
+            if r.status_code == 200:
+                ok.append(time.perf_counter() - t0)
+            elif r.status_code == 503:
+                busy += 1
+            else:
+                errors += 1
+
+    async def probe_loop() -> None:
+        while not done.is_set():
+            t0 = time.perf_counter()
+            r = await client.get("/memberships/catalog")
+            if r.status_code == 200:
+                probe.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe_loop())
+    t_start = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(n)))
+    wall = time.perf_counter() - t_start
+    done.set()
+    await prober
+
+    return {
+        "logins": n,
+        "concurrency": concurrency,
+        "seconds": round(wall, 2),
+        "succeeded": _stats(ok, wall),
+        "rejected_busy": busy,
+        "errors": errors,
+        "probe_during_burst": _stats(probe),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Login throughput under a burst.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100, help="logins in flight at once")
+    parser.add_argument("--budget-ms", type=float, default=LOGIN_BURST_PROBE_P99_BUDGET_MS)
+    parser.add_argument("--base-url", default=None, help="benchmark a running server instead of in-process")
+    args = parser.parse_args(argv)
+
+    emails = _emails(1_000)
+    if not emails:
+        raise SystemExit("No generated users; run python -m backend.benchmarks.seed_chain first.")
+
+    async def run() -> dict:
+        if args.base_url:
+            client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+        else:
+            from ..main import app
+            passwords.pool.start()  # in-process there is no warm-up
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+        async with client:
+            await burst(client, emails, min(20, args.requests), 4)  # warm-up
+            result = await burst(client, emails, args.requests, args.concurrency)
+        if not args.base_url:
+            result["hash_pool"] = passwords.pool.snapshot()
+        return result
+
+    try:
+        result = asyncio.run(run())
+    finally:
+        passwords.pool.shutdown()
+    result["budget_probe_p99_ms"] = args.budget_ms
+    print(json.dumps(result, indent=2))
+
+    probe_p99 = result["probe_during_burst"].get("p99_ms", 0)
+    if result["errors"] or probe_p99 > args.budget_ms:
+        print(f"probe p99 {probe_p99} ms (budget {args.budget_ms} ms), errors {result['errors']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Local check of read-replica routing and read-your-writes pinning.
+
+Uses two SQLite files as stand-ins: the "replica" is a snapshot of the primary
+that is refreshed only when we say so (replication lag made explicit).
+
+    python -m backend.benchmarks.replica_routing [--keep]
+
+Steps (exit code 1 if any fails):
+  1. a booking is written to the primary (and sets the pin cookie),
+  2. an unpinned read of my-bookings goes to the replica and does not see it yet,
+  3. the pinned read (cookie from step 1) goes to the primary and sees it,
+  4. after the replica catches up, the unpinned read sees it too.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import date, time, timedelta
+
+_workdir = tempfile.mkdtemp(prefix="gym-replica-")
+PRIMARY = os.path.join(_workdir, "primary.db")
+REPLICA = os.path.join(_workdir, "replica.db")
+
+# must be set before the app modules read the configuration
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{REPLICA}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ASYNC_DATABASE_REPLICA_URL", None)
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from .. import migrate, models  # noqa: E402
+from ..database import READ_PIN_COOKIE, SessionLocal, engine  # noqa: E402
+from ..schedule import router as schedule_router  # noqa: E402
+
+
+def _replicate() -> None:
+    """Copies the primary into the replica file (online backup, open connections see the new data)."""
+    src, dst = sqlite3.connect(PRIMARY), sqlite3.connect(REPLICA)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def _seed() -> tuple[int, int]:
+    db = SessionLocal()
+    try:
+        adr = models.Addresses(city="Krakow", postal_code="30-001", street_name="Main", street_number=1)
+        db.add(adr)
+        db.flush()
+        person = dict(birth_date=date(1990, 1, 1), phone_number="100200300", gender="F", password="x", address_id=adr.id_adr)
+        manager = models.Manager(first_name="M", last_name="M", email="m@replica.local", hire_date=date.today(), **person)
+        instructor = models.Instructor(first_name="I", last_name="I", email="i@replica.local", hire_date=date.today(), **person)
+        client = models.Client(first_name="C", last_name="C", email="c@replica.local", **person)
+        db.add_all([manager, instructor, client])
+        db.flush()
+        day = date.today() + timedelta(days=1)
+        gc = models.GroupClasses(
+            name="Yoga", room="A", start_date=day, end_date=day, start_time=time(18), end_time=time(19),
+            instructor_id=instructor.id_u, manager_id=manager.id_u, classes_type=models.ClassesType.GROUP,
+        )
+        db.add(gc)
+        db.flush()
+        db.add(models.GroupClassOccupancy(group_classes_id=gc.id_c, booked_count=0))
+        db.commit()
+        return client.id_u, gc.id_c
+    finally:
+        db.close()
+
+
+def run() -> list[tuple[str, bool]]:
+    migrate.upgrade(engine)
+    client_id, class_id = _seed()
+    _replicate()
+
+    app = FastAPI()
+    app.include_router(schedule_router)
+    checks = []
+    with TestClient(app) as http:
+        r = http.post("/schedule/book", json={"client_id": client_id, "group_class_id": class_id})
+        pin = r.cookies.get(READ_PIN_COOKIE)
+        checks.append(("booking written to the primary, pin cookie set", r.status_code == 200 and pin is not None))
+
+        http.cookies.clear()
+        stale = http.get(f"/schedule/my-bookings/{client_id}").json()
+        checks.append(("unpinned read served by the (lagging) replica", stale == []))
+
+        pinned = http.get(f"/schedule/my-bookings/{client_id}", cookies={READ_PIN_COOKIE: pin}).json()
+        checks.append(("pinned read served by the primary (read-your-writes)", len(pinned) == 1))
+
+        _replicate()
+        http.cookies.clear()
+        caught_up = http.get(f"/schedule/my-bookings/{client_id}").json()
+        checks.append(("unpinned read after the replica caught up", len(caught_up) == 1))
+    return checks
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check replica routing with two SQLite files.")
+    parser.add_argument("--keep", action="store_true", help="keep the database files")
+    args = parser.parse_args(argv)
+
+    try:
+        checks = run()
+    finally:
+        if not args.keep:
+            for path in (PRIMARY, REPLICA):
+                if os.path.exists(path):
+                    os.remove(path)
+            os.rmdir(_workdir)
+        else:
+            print(f"databases kept in {_workdir}")
+
+    for name, ok in checks:
+        print(f"{'OK  ' if ok else 'FAIL'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
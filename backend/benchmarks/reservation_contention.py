@@ -0,0 +1,198 @@
+"""
+Concurrency check for the seat reservation engine (backend/reservations.py).
+
+Creates a throw-away group class plus N clients, lets N threads book the same
+class at once and verifies that the class is never overbooked and that the
+occupancy counter matches book_group_classes. Fixture rows are removed at the end.
+
+    python -m backend.benchmarks.reservation_contention --clients 64 --capacity 20
+
+Run it against PostgreSQL (DATABASE_URL); SQLite serializes all writers, so it
+cannot show real contention.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import threading
+import time as time_mod
+import uuid
+from datetime import date, time, timedelta
+
+from sqlalchemy import func
+
+from .. import models, finance_models  # noqa: F401 (registers finance tables)
+from ..database import SessionLocal
+from ..reservations import reserve_seat, ClassFullError, AlreadyBookedError
+
+
+def _create_fixture(n_clients: int) -> dict:
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        adr = models.Addresses(city="Bench", postal_code="00-000", street_name="Bench", street_number=1)
+        db.add(adr)
+        db.flush()
+
+        def person(cls, i, **extra):
+            return cls(
+                first_name="Bench",
+                last_name=f"{cls.__name__}{i}",
+                birth_date=date(1990, 1, 1),
+                email=f"bench-{tag}-{cls.__name__.lower()}-{i}@example.com",
+                phone_number="000000000",
+                gender="O",
+                password="bench",
+                address_id=adr.id_adr,
+                **extra,
+            )
+
+        manager = person(models.Manager, 0, hire_date=date.today())
+        instructor = person(models.Instructor, 0, hire_date=date.today())
+        clients = [person(models.Client, i) for i in range(n_clients)]
+        db.add_all([manager, instructor, *clients])
+        db.flush()
+
+        day = date.today() + timedelta(days=365)
+        gc = models.GroupClasses(
+            start_date=day,
+            end_date=day,
+            start_time=time(6, 0),
+            end_time=time(7, 0),
+            room=f"bench-{tag}",
+            name="Bench class",
+            instructor_id=instructor.id_u,
+            manager_id=manager.id_u,
+            classes_type=models.ClassesType.GROUP,
+        )
+        db.add(gc)
+        db.flush()
+        db.add(models.GroupClassOccupancy(group_classes_id=gc.id_c, booked_count=0))
+        db.commit()
+
+        return {
+            "address_id": adr.id_adr,
+            "staff_ids": [manager.id_u, instructor.id_u],
+            "client_ids": [c.id_u for c in clients],
+            "group_class_id": gc.id_c,
+        }
+    finally:
+        db.close()
+
+
+def _drop_fixture(fx: dict) -> None:
+    db = SessionLocal()
+    try:
+        gc_id = fx["group_class_id"]
+        db.query(models.BookGroupClasses).filter(models.BookGroupClasses.group_classes_id == gc_id).delete()
+        db.query(models.GroupClassOccupancy).filter(models.GroupClassOccupancy.group_classes_id == gc_id).delete()
+        db.query(models.GroupClasses).filter(models.GroupClasses.id_c == gc_id).delete()
+        db.query(models.Classes).filter(models.Classes.id_c == gc_id).delete()
+
+        user_ids = fx["client_ids"] + fx["staff_ids"]
+        db.query(models.Client).filter(models.Client.id_u.in_(fx["client_ids"])).delete()
+        db.query(models.Manager).filter(models.Manager.id_u.in_(fx["staff_ids"])).delete()
+        db.query(models.Instructor).filter(models.Instructor.id_u.in_(fx["staff_ids"])).delete()
+        db.query(models.Employee).filter(models.Employee.id_u.in_(fx["staff_ids"])).delete()
+        db.query(models.User).filter(models.User.id_u.in_(user_ids)).delete()
+        db.query(models.Addresses).filter(models.Addresses.id_adr == fx["address_id"]).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(n_clients: int, capacity: int, keep: bool = False) -> dict:
+    fx = _create_fixture(n_clients)
+    gc_id = fx["group_class_id"]
+
+    outcomes = {"booked": 0, "full": 0, "duplicate": 0, "error": 0}
+    latencies: list[float] = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(n_clients)
+
+    def worker(client_id: int) -> None:
+        db = SessionLocal()
+        try:
+            start_gate.wait()
+            t0 = time_mod.perf_counter()
+            try:
+                reserve_seat(db, client_id=client_id, group_class_id=gc_id, max_capacity=capacity)
+                db.commit()
+                result = "booked"
+            except ClassFullError:
+                db.rollback()
+                result = "full"
+            except AlreadyBookedError:
+                db.rollback()
+                result = "duplicate"
+            except Exception:
+                db.rollback()
+                result = "error"
+            elapsed = time_mod.perf_counter() - t0
+            with lock:
+                outcomes[result] += 1
+                latencies.append(elapsed)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=(cid,)) for cid in fx["client_ids"]]
+    t_start = time_mod.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time_mod.perf_counter() - t_start
+
+    db = SessionLocal()
+    try:
+        rows = db.query(func.count(models.BookGroupClasses.client_id)).filter(
+            models.BookGroupClasses.group_classes_id == gc_id
+        ).scalar()
+        counter = db.get(models.GroupClassOccupancy, gc_id).booked_count
+    finally:
+        db.close()
+
+    if not keep:
+        _drop_fixture(fx)
+
+    latencies.sort()
+    return {
+        "clients": n_clients,
+        "capacity": capacity,
+        "outcomes": outcomes,
+        "booking_rows": rows,
+        "occupancy_counter": counter,
+        "overbooked": rows > capacity,
+        "counter_consistent": rows == counter,
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(n_clients / wall, 1) if wall else None,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000, 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent booking check for one group class.")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="do not delete the fixture rows")
+    args = parser.parse_args(argv)
+
+    report = run(args.clients, args.capacity, keep=args.keep)
+    for k, v in report.items():
+        print(f"{k}: {v}")
+
+    expected = min(args.clients, args.capacity)
+    ok = (
+        not report["overbooked"]
+        and report["counter_consistent"]
+        and report["booking_rows"] == expected
+        and report["outcomes"]["error"] == 0
+    )
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Synthetic gym-chain dataset for benchmarks.
+
+    python -m backend.benchmarks.seed_chain --preset dev      # a few seconds, fine on SQLite
+    python -m backend.benchmarks.seed_chain --preset chain    # 50 clubs, 200 staff, 100k clients,
+                                                              # 200k classes, 2M bookings, 2M memberships
+    python -m backend.benchmarks.seed_chain --preset dev --clients 5000 --seed 7
+
+Every number can be overridden. Rows are written with chunked executemany
+inserts (no ORM objects) and explicit primary keys, continuing after the
+current maximum, so the generator can run against a database that already has
+data. On PostgreSQL the id sequences are moved past the new rows afterwards.
+
+Shape of the data (deterministic for a given --seed):
+  - every club has a manager; the other staff are spread over the clubs
+    (instructors 50%, personal trainers 30%, receptionists 20%),
+  - every instructor has their own room, and there is one trainer room per four
+    instructor rooms (80% group / 20% individual classes); classes are hourly
+    slots 07:00-21:00 walking day by day around today, so no two classes share a
+    room or an instructor at the same time (the database overlap constraints hold),
+  - bookings go to group classes (at most CAPACITY per class), with the
+    occupancy counters filled in; the last --spare-clients clients get no
+    bookings, so the endpoint benchmark has clients that can book anything,
+  - memberships with a payment row each, spread over the last two years (sold
+    at the seller's club or, for online sales, half of the time at a random
+    club), and the revenue rollups and the check-in index rebuilt from them.
+Every user's password is BENCH_PASSWORD, stored as one shared scrypt hash
+(login benchmarks; hashing each row would dominate the seeding). The database must be migrated
+first (python -m backend.migrate).
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time as time_mod
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+
+from .. import access, migrate, models, finance_models, passwords, prices, revenue  # noqa: F401 (registers finance tables)
+from ..database import engine
+from ..finance_router import MAX_CLASS_CAPACITY, _compute_end_date, _compute_price
+
+BENCH_PASSWORD = "bench-password"
+EMAIL_DOMAIN = "bench.example.com"
+CAPACITY = MAX_CLASS_CAPACITY
+CHUNK = 10_000
+FIRST_HOUR, LAST_HOUR = 7, 21  # classes start 07:00 ... 20:00
+
+PRESETS = {
+    "dev": dict(clubs=5, staff=40, clients=2_000, classes=4_000, bookings=40_000, memberships=20_000),
+    "chain": dict(clubs=50, staff=200, clients=100_000, classes=200_000, bookings=2_000_000, memberships=2_000_000),
+}
+
+
+def _next_id(conn, column) -> int:
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def _bulk(conn, table, rows, stats: dict) -> None:
+    for i in range(0, len(rows), CHUNK):
+        conn.execute(insert(table), rows[i:i + CHUNK])
+    stats[table.name] = stats.get(table.name, 0) + len(rows)
+
+
+def _staff_roles(n_staff: int, n_clubs: int) -> list[models.UserRole]:
+    """One manager per club, the rest split 50/30/20 between instructors, trainers and receptionists."""
+    rest = max(n_staff - n_clubs, 3)
+    n_instr = max(1, rest * 5 // 10)
+    n_pt = max(1, rest * 3 // 10)
+    n_rec = max(1, rest - n_instr - n_pt)
+    return (
+        [models.UserRole.MANAGER] * n_clubs
+        + [models.UserRole.INSTRUCTOR] * n_instr
+        + [models.UserRole.PERSONAL_TRAINER] * n_pt
+        + [models.UserRole.RECEPTIONIST] * n_rec
+    )
+
+
+def generate(
+    *,
+    clubs: int,
+    staff: int,
+    clients: int,
+    classes: int,
+    bookings: int,
+    memberships: int,
+    seed: int = 1,
+    spare_clients: int = 1_000,
+    log=print,
+) -> dict:
+    rng = random.Random(seed)
+    stats: dict[str, int] = {}
+    t0 = time_mod.perf_counter()
+    today = date.today()
+    prices.catalog.refresh()  # load the prices now: inside the transaction below SQLite would lock
+
+    with engine.begin() as conn:
+        if conn.execute(
+            select(models.User.id_u).where(models.User.email.like(f"%@{EMAIL_DOMAIN}")).limit(1)
+        ).first():
+            raise SystemExit(f"Database already contains generated users (@{EMAIL_DOMAIN}); use a fresh database.")
+
+        # --- addresses (a pool shared by the users) and staff ---
+        adr0 = _next_id(conn, models.Addresses.id_adr)
+        n_addresses = max(clubs, min(1_000, clients // 10 + 1))
+        _bulk(conn, models.Addresses.__table__, [
+            dict(id_adr=adr0 + i, city=f"City {i % max(clubs, 1)}", postal_code=f"{i % 100:02d}-{i % 1000:03d}",
+                 street_name=f"Street {i}", street_number=1 + i % 200)
+            for i in range(n_addresses)
+        ], stats)
+
+        password_hash = passwords.make_hash(BENCH_PASSWORD)
+        uid = _next_id(conn, models.User.id_u)
+        users, employees, by_role = [], [], {role: [] for role in models.UserRole}
+        club_of: dict[int, int] = {}
+
+        for i, role in enumerate(_staff_roles(staff, clubs)):
+            users.append(dict(
+                id_u=uid, first_name=f"Staff{i}", last_name=role.value.title(), birth_date=date(1985, 1, 1) + timedelta(days=i),
+                email=f"staff{i}@{EMAIL_DOMAIN}", phone_number=f"5{i:08d}", gender="FM"[i % 2],
+                password=password_hash, role=role, address_id=adr0 + i % n_addresses,
+            ))
+            employees.append(dict(id_u=uid, contract_type="B2B" if i % 3 else "UoP", hire_date=today - timedelta(days=30 + i), salary=4_000 + 50 * (i % 40)))
+            by_role[role].append(uid)
+            club_of[uid] = len(by_role[role]) - 1 if role == models.UserRole.MANAGER else i % clubs
+            uid += 1
+
+        client_ids = list(range(uid, uid + clients))
+        for n, cid in enumerate(client_ids):
+            users.append(dict(
+                id_u=cid, first_name=f"Client{n}", last_name=f"Member{n % 5000}",
+                birth_date=date(1960, 1, 1) + timedelta(days=rng.randrange(16_000)),
+                email=f"client{n}@{EMAIL_DOMAIN}", phone_number=f"6{n:08d}", gender="FM"[n % 2],
+                password=password_hash, role=models.UserRole.CLIENT, address_id=adr0 + rng.randrange(n_addresses),
+            ))
+
+        _bulk(conn, models.User.__table__, users, stats)
+        _bulk(conn, models.Employee.__table__, employees, stats)
+        for role, model in (
+            (models.UserRole.MANAGER, models.Manager),
+            (models.UserRole.INSTRUCTOR, models.Instructor),
+            (models.UserRole.PERSONAL_TRAINER, models.PersonalTrainer),
+            (models.UserRole.RECEPTIONIST, models.Receptionist),
+        ):
+            _bulk(conn, model.__table__, [dict(id_u=u) for u in by_role[role]], stats)
+        _bulk(conn, models.Client.__table__, [dict(id_u=c) for c in client_ids], stats)
+
+        club0 = _next_id(conn, models.Club.id_cl)
+        _bulk(conn, models.Club.__table__, [
+            dict(id_cl=club0 + i, tax=0.23, manager_id=m) for i, m in enumerate(by_role[models.UserRole.MANAGER])
+        ], stats)
+        log(f"users: {len(users)} ({time_mod.perf_counter() - t0:.1f}s)")
+
+        # --- classes: hourly slots walking day by day over the rooms ---
+        # 4 instructor rooms per trainer room -> 80% group / 20% individual classes
+        instructors, trainers = by_role[models.UserRole.INSTRUCTOR], by_role[models.UserRole.PERSONAL_TRAINER]
+        rooms = [("G", u) for u in instructors] + [("I", u) for u in trainers[: max(1, len(instructors) // 4)]]
+        slots_per_day = len(rooms) * (LAST_HOUR - FIRST_HOUR)
+        first_day = today - timedelta(days=(classes // slots_per_day) // 2)
+        managers = by_role[models.UserRole.MANAGER]
+        receptionists = by_role[models.UserRole.RECEPTIONIST]
+        bookable = client_ids[: max(0, len(client_ids) - spare_clients)]
+
+        cid0 = _next_id(conn, models.Classes.id_c)
+        class_rows, group_rows, individual_rows, group_ids = [], [], [], []
+        for n in range(classes):
+            day_idx, rest = divmod(n, slots_per_day)
+            hour, room_idx = divmod(rest, len(rooms))
+            kind, staff_id = rooms[room_idx]
+            day = first_day + timedelta(days=day_idx)
+            class_id = cid0 + n
+            club = club_of[staff_id] % clubs
+            class_rows.append(dict(
+                id_c=class_id, start_date=day, end_date=day,
+                start_time=time(FIRST_HOUR + hour), end_time=time(FIRST_HOUR + hour, 55),
+                room=f"C{club + 1}-{kind}{room_idx}",
+                classes_type=models.ClassesType.GROUP if kind == "G" else models.ClassesType.INDIVIDUAL,
+            ))
+            if kind == "G":
+                group_rows.append(dict(
+                    id_c=class_id, name=("Yoga", "Pilates", "Spinning", "Crossfit", "Zumba", "Boxing")[n % 6],
+                    instructor_id=staff_id, manager_id=managers[club % len(managers)],
+                    receptionist_id=receptionists[n % len(receptionists)] if receptionists else None,
+                ))
+                group_ids.append(class_id)
+            else:
+                individual_rows.append(dict(
+                    id_c=class_id, additional_info=None,
+                    client_id=rng.choice(bookable or client_ids), per_trainer_id=staff_id,
+                ))
+
+        _bulk(conn, models.Classes.__table__, class_rows, stats)
+        _bulk(conn, models.GroupClasses.__table__, group_rows, stats)
+        _bulk(conn, models.IndividualClasses.__table__, individual_rows, stats)
+        log(f"classes: {len(class_rows)} ({time_mod.perf_counter() - t0:.1f}s)")
+
+        # --- bookings (at most CAPACITY per class) + occupancy counters ---
+        per_class = bookings / len(group_ids) if group_ids else 0
+        if per_class > CAPACITY:
+            log(f"bookings capped at {CAPACITY} per class ({CAPACITY * len(group_ids)} total)")
+        booking_rows, occupancy_rows = [], []
+        for class_id in group_ids:
+            k = min(CAPACITY, len(bookable), int(per_class) + (rng.random() < per_class % 1))
+            chosen = rng.sample(bookable, k) if k else []
+            booking_rows.extend(dict(client_id=c, group_classes_id=class_id) for c in chosen)
+            occupancy_rows.append(dict(group_classes_id=class_id, booked_count=k))
+            if len(booking_rows) >= CHUNK * 10:
+                _bulk(conn, models.BookGroupClasses.__table__, booking_rows, stats)
+                booking_rows = []
+        _bulk(conn, models.BookGroupClasses.__table__, booking_rows, stats)
+        _bulk(conn, models.GroupClassOccupancy.__table__, occupancy_rows, stats)
+        log(f"bookings: {stats.get('book_group_classes', 0)} ({time_mod.perf_counter() - t0:.1f}s)")
+
+        # --- memberships with a payment row each ---
+        mid = _next_id(conn, models.Membership.id_m)
+        types = list(models.MembershipType)
+        membership_rows, payment_rows = [], []
+        for n in range(memberships):
+            mtype = rng.choices(types, weights=(10, 60, 20, 10))[0]
+            sauna = rng.random() < 0.3
+            start = today - timedelta(days=rng.randrange(730))
+            cash = rng.random() < 0.4
+            seller = rng.choice(receptionists) if cash and receptionists else None
+            if seller is not None:
+                club_id = club0 + club_of[seller]
+            else:
+                club_id = club0 + rng.randrange(clubs) if clubs and rng.random() < 0.5 else None
+            membership_rows.append(dict(
+                id_m=mid + n, type=mtype, with_sauna=sauna, price=_compute_price(mtype, sauna, None, club_id),
+                start_date=start, end_date=_compute_end_date(mtype, start), client_id=rng.choice(client_ids),
+                receptionist_id=seller, club_id=club_id,
+            ))
+            payment_rows.append(dict(
+                membership_id=mid + n,
+                status=finance_models.PaymentStatus.TO_PAY if cash and rng.random() < 0.1 else finance_models.PaymentStatus.ACTIVATED,
+                payment_method=finance_models.PaymentMethod.CASH if cash else finance_models.PaymentMethod.ONLINE,
+                created_at=datetime.combine(start - timedelta(days=rng.randrange(7)), time(12), tzinfo=timezone.utc),
+            ))
+            if len(membership_rows) >= CHUNK * 10:
+                _bulk(conn, models.Membership.__table__, membership_rows, stats)
+                _bulk(conn, finance_models.MembershipPayment.__table__, payment_rows, stats)
+                membership_rows, payment_rows = [], []
+        _bulk(conn, models.Membership.__table__, membership_rows, stats)
+        _bulk(conn, finance_models.MembershipPayment.__table__, payment_rows, stats)
+        log(f"memberships: {stats.get('memberships', 0)} ({time_mod.perf_counter() - t0:.1f}s)")
+        revenue.rebuild(conn)
+        access.rebuild(conn)
+        log(f"revenue rollups, check-in index ({time_mod.perf_counter() - t0:.1f}s)")
+
+        if conn.dialect.name == "postgresql":
+            for table, column in (("addresses", "id_adr"), ("users", "id_u"), ("clubs", "id_cl"),
+                                  ("classes", "id_c"), ("memberships", "id_m")):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                    f"(SELECT COALESCE(MAX({column}), 1) FROM {table}))"
+                ))
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE"))
+
+    stats["seconds"] = round(time_mod.perf_counter() - t0, 1)
+    return stats
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic gym chain for benchmarks.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="dev")
+    for name in ("clubs", "staff", "clients", "classes", "bookings", "memberships"):
+        parser.add_argument(f"--{name}", type=int, default=None)
+    parser.add_argument("--spare-clients", type=int, default=1_000, help="clients left without bookings")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    pending = migrate.pending_versions_readonly(engine)
+    if pending:
+        raise SystemExit(f"Pending migrations {pending}; run `python -m backend.migrate` first.")
+
+    sizes = dict(PRESETS[args.preset])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    if sizes["clubs"] < 1 or sizes["staff"] < sizes["clubs"] + 3:
+        raise SystemExit("Need at least one club and clubs + 3 staff (manager per club, instructor, trainer, receptionist).")
+
+    stats = generate(**sizes, seed=args.seed, spare_clients=min(args.spare_clients, sizes["clients"] // 2))
+    for table, count in stats.items():
+        print(f"{table:<26} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Serialization microbenchmark: cost of turning 1k timetable rows into a JSON body.
+
+    python -m backend.benchmarks.serialization --rows 1000 --repeat 200
+
+No database or server involved; the rows are the dicts _build_timetable returns
+(dates, times, ints, short strings). Paths measured, in microseconds per 1k rows:
+
+  before      jsonable_encoder + JSONResponse (what the routes did without a
+              response class or model: a full encoder pass, then json.dumps)
+  orjson      fast_json.dumps, the response cache / FastJSONResponse path
+  stdlib      fast_json.dumps with orjson missing (json.dumps + default hook)
+  model       response_model path: validate list[TimetableClass] + dump to
+              JSON-able python, then fast_json.dumps
+  model/rows  same, when the route builds one pydantic model per row first
+              (the staff / membership list style before this change)
+
+Bodies of all paths are checked to decode to the same JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time as _time
+from datetime import date, time, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from .. import fast_json
+from ..schedule import TimetableClass
+
+
+def make_rows(n: int) -> list[dict]:
+    start = date(2026, 1, 5)
+    return [
+        {
+            "id_c": i + 1,
+            "name": f"Class {i % 37}",
+            "room": f"Room {i % 12}",
+            "start_date": start + timedelta(days=i // 20),
+            "end_date": start + timedelta(days=i // 20),
+            "start_time": time(6 + i % 14, 0),
+            "end_time": time(7 + i % 14, 0),
+            "max_capacity": 20,
+            "booked_count": i % 21,
+        }
+        for i in range(n)
+    ]
+
+
+def _paths(rows: list[dict]):
+    adapter = TypeAdapter(list[TimetableClass])
+
+    def before():
+        return JSONResponse(content=jsonable_encoder(rows)).body
+
+    def orjson_path():
+        return fast_json.dumps(rows)
+
+    def stdlib_path():
+        saved, fast_json.orjson = fast_json.orjson, None
+        try:
+            return fast_json.dumps(rows)
+        finally:
+            fast_json.orjson = saved
+
+    def model():
+        return fast_json.dumps(adapter.dump_python(adapter.validate_python(rows), mode="json"))
+
+    def model_rows():
+        built = [TimetableClass(**r).model_dump() for r in rows]
+        return fast_json.dumps(adapter.dump_python(adapter.validate_python(built), mode="json"))
+
+    paths = {"before": before, "stdlib": stdlib_path, "model": model, "model/rows": model_rows}
+    if fast_json.orjson is not None:
+        paths["orjson"] = orjson_path
+    return paths
+
+
+def measure(fn, repeat: int) -> list[float]:
+    fn()  # warm-up
+    out = []
+    for _ in range(repeat):
+        t0 = _time.perf_counter()
+        fn()
+        out.append(_time.perf_counter() - t0)
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Timetable JSON serialization cost per 1k rows.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    paths = _paths(rows)
+
+    reference = json.loads(paths["before"]())
+    for name, fn in paths.items():
+        if json.loads(fn()) != reference:
+            print(f"{name}: body differs from the jsonable_encoder output")
+            return 1
+
+    scale = 1000 / args.rows
+    results = {}
+    for name, fn in paths.items():
+        samples = measure(fn, args.repeat)
+        results[name] = {
+            "median_us_per_1k": round(statistics.median(samples) * 1e6 * scale, 1),
+            "p95_us_per_1k": round(sorted(samples)[int(len(samples) * 0.95) - 1] * 1e6 * scale, 1),
+        }
+    base = results["before"]["median_us_per_1k"]
+    for r in results.values():
+        r["speedup"] = round(base / r["median_us_per_1k"], 2)
+
+    if args.json:
+        print(json.dumps({"rows": args.rows, "repeat": args.repeat, "results": results}, indent=2))
+        return 0
+
+    print(f"{args.rows} rows x {args.repeat}, orjson {'on' if fast_json.orjson is not None else 'missing'}")
+    print(f"{'path':<12}{'median us/1k':>14}{'p95 us/1k':>12}{'speedup':>10}")
+    for name, r in results.items():
+        print(f"{name:<12}{r['median_us_per_1k']:>14}{r['p95_us_per_1k']:>12}{r['speedup']:>9}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
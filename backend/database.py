@@ -1,22 +1,126 @@
 import os # Standard library to interact with the operating system
+import threading
+import time
 from dotenv import load_dotenv # Function that load .env file content
-from sqlalchemy import create_engine # SQLAlchemy is so called ORM
+from sqlalchemy import create_engine, text # SQLAlchemy is so called ORM
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from fastapi import Request
 
 # When .env is in the main catalofg
-load_dotenv(dotenv_path=".env") 
+load_dotenv(dotenv_path=".env")
 
 # Load link to the database from .env
 SQLALCHEMY_DATABASE_URL=os.getenv("DATABASE_URL")
 #chek is value not null
 if SQLALCHEMY_DATABASE_URL is None:
     raise ValueError("DATABASE_URL is not set. Please check your .env file!")
+
+# Connection pool settings (all optional, override in .env)
+DB_POOL_SIZE=int(os.getenv("DB_POOL_SIZE", "10")) # Connections kept open
+DB_MAX_OVERFLOW=int(os.getenv("DB_MAX_OVERFLOW", "20")) # Extra connections opened under load
+DB_POOL_TIMEOUT=float(os.getenv("DB_POOL_TIMEOUT", "10")) # Seconds to wait for a free connection
+DB_POOL_RECYCLE=int(os.getenv("DB_POOL_RECYCLE", "1800")) # Reconnect connections older than this (seconds)
+DB_POOL_PRE_PING=os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Optional read replica for GET routes (unset -> reads go to DATABASE_URL as well)
+SQLALCHEMY_REPLICA_URL=os.getenv("DATABASE_REPLICA_URL") or None
+# After a write the client reads from the primary for this long (replica lag budget)
+READ_YOUR_WRITES_SECONDS=int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PIN_COOKIE="read_primary_until"
+
+
+class PoolMetrics:
+    """Counters for connection checkouts: how often and how long requests waited for a connection."""
+
+    # upper bounds (ms) of the checkout wait histogram
+    BUCKETS_MS=(1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock=threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts=0
+            self.timeouts=0
+            self.wait_total_ms=0.0
+            self.wait_max_ms=0.0
+            self.buckets=[0]*(len(self.BUCKETS_MS)+1) # last one = slower than the biggest bound
+
+    def record_wait(self, wait_ms):
+        with self._lock:
+            self.checkouts+=1
+            self.wait_total_ms+=wait_ms
+            self.wait_max_ms=max(self.wait_max_ms, wait_ms)
+            for i, bound in enumerate(self.BUCKETS_MS):
+                if wait_ms<=bound:
+                    self.buckets[i]+=1
+                    break
+            else:
+                self.buckets[-1]+=1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts+=1
+
+    def snapshot(self):
+        with self._lock:
+            labels=[f"<={b}ms" for b in self.BUCKETS_MS]+[f">{self.BUCKETS_MS[-1]}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total_ms/self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+pool_metrics=PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        start=time.perf_counter()
+        try:
+            conn=super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_wait((time.perf_counter()-start)*1000)
+        return conn
+
+
+def _engine_kwargs(url):
+    if url.startswith("sqlite"):
+        # local file-backed runs: SQLite picks its own pool
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
 # Create the engine
-engine=create_engine(SQLALCHEMY_DATABASE_URL) # This knows how to physically connect with Docker
+engine=create_engine(SQLALCHEMY_DATABASE_URL, **_engine_kwargs(SQLALCHEMY_DATABASE_URL)) # This knows how to physically connect with Docker
 SessionLocal=sessionmaker(autocommit=False,autoflush=False,bind=engine) # 'Movement in database'- each one is a distinct session
 # autocommit=false -> we need to confirm changes (maybe to change later)
 
+# Replica engine/sessions for read-only routes (same engine when no replica is configured)
+replica_engine=(
+    create_engine(SQLALCHEMY_REPLICA_URL, **_engine_kwargs(SQLALCHEMY_REPLICA_URL))
+    if SQLALCHEMY_REPLICA_URL else engine
+)
+ReadSessionLocal=sessionmaker(autocommit=False,autoflush=False,bind=replica_engine)
+
 # Base class for all database models
 # Every class will inherit from this one -> so teh SQLAlchemy knows that those classes are tables in database
 Base=declarative_base()
@@ -27,4 +131,77 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() # And automatically closes it
\ No newline at end of file
+        db.close() # And automatically closes it
+
+
+def pin_primary(response):
+    """Read-your-writes: the next READ_YOUR_WRITES_SECONDS of this client's reads go to the primary."""
+    if SQLALCHEMY_REPLICA_URL is None:
+        return
+    response.set_cookie(
+        READ_PIN_COOKIE,
+        str(int(time.time())+READ_YOUR_WRITES_SECONDS),
+        max_age=READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def is_pinned(request):
+    """True when a replica is configured and the request carries a live read-your-writes pin."""
+    if SQLALCHEMY_REPLICA_URL is None:
+        return False
+    until=request.cookies.get(READ_PIN_COOKIE)
+    try:
+        return until is not None and int(until)>time.time()
+    except ValueError:
+        return False
+
+
+def reads_from_primary(request):
+    """True when there is no replica or the request is pinned to the primary."""
+    return SQLALCHEMY_REPLICA_URL is None or is_pinned(request)
+
+
+# Dependency for read-only routes: replica session, or the primary while pinned
+def get_read_db(request: Request):
+    db=(SessionLocal if reads_from_primary(request) else ReadSessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def pool_status():
+    """Live pool numbers + checkout wait metrics (for the health endpoint)."""
+    pool=engine.pool
+    status={"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update({"max_overflow": DB_MAX_OVERFLOW, "timeout_s": DB_POOL_TIMEOUT})
+    status.update(pool_metrics.snapshot())
+    if replica_engine is not engine and isinstance(replica_engine.pool, QueuePool):
+        replica=replica_engine.pool
+        status["replica"]={
+            "size": replica.size(),
+            "checked_in": replica.checkedin(),
+            "checked_out": replica.checkedout(),
+            "overflow": replica.overflow(),
+        }
+    return status
+
+
+def check_database():
+    """True if a connection can be checked out and answers SELECT 1."""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
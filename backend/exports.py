@@ -0,0 +1,217 @@
+"""
+Streaming exports for accounting (CSV or NDJSON).
+
+    GET /exports/memberships?manager_id=1&club_id=2&date_from=2026-01-01&date_to=2026-03-31&format=csv
+    GET /exports/group-bookings?manager_id=1&club_id=2&format=ndjson
+    GET /exports/individual-classes?manager_id=1&date_from=2026-01-01
+
+Rows are read with a server-side cursor (stream_results + yield_per) from the
+read replica when one is configured, turned into text EXPORT_CHUNK_ROWS rows at
+a time and sent as a chunked StreamingResponse. The first bytes go out after
+the first chunk, and memory stays flat however many rows match.
+
+Filters: date range on the class date (bookings, individual classes) or the
+membership start date. club_id filters memberships by the club that sold them
+(memberships.club_id, as in the revenue rollups) and group bookings by the
+club's manager, who manages its group classes; individual classes have no club
+link in the schema.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import date
+from enum import Enum
+from typing import Iterator, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import get_read_db, replica_engine
+from .finance_models import BookGroupClassesMeta, MembershipPayment
+from .manager_staff import _ensure_manager
+
+router = APIRouter(prefix="/exports", tags=["Exports"])
+
+EXPORT_CHUNK_ROWS = 2_000
+
+Format = Literal["csv", "ndjson"]
+
+_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _value(v):
+    if isinstance(v, Enum):
+        return v.value
+    if hasattr(v, "isoformat"):
+        return v.isoformat()
+    return v
+
+
+def _encode(columns: list[str], rows, fmt: Format) -> bytes:
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(columns, (_value(v) for v in row))), separators=(",", ":")) + "\n"
+            for row in rows
+        ).encode()
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerows([("" if v is None else _value(v)) for v in row] for row in rows)
+    return buf.getvalue().encode()
+
+
+def _stream(stmt, fmt: Format) -> Iterator[bytes]:
+    """Runs stmt on its own connection with a server-side cursor and yields encoded chunks."""
+    with replica_engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS).execute(stmt)
+        columns = list(result.keys())
+        if fmt == "csv":
+            yield _encode([], [columns], "csv")
+        for rows in result.partitions():
+            yield _encode(columns, rows, fmt)
+
+
+def _response(stmt, fmt: Format, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        _stream(stmt, fmt),
+        media_type=_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+def _check_range(date_from: date | None, date_to: date | None) -> None:
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must be >= date_from")
+
+
+def _file_name(kind: str, date_from: date | None, date_to: date | None) -> str:
+    return "_".join([kind, str(date_from or "start"), str(date_to or "now")])
+
+
+@router.get("/memberships")
+def export_memberships(
+    manager_id: int = Query(..., ge=1),
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
+    club_id: int | None = Query(default=None, ge=1),
+    format: Format = Query(default="csv"),
+    db: Session = Depends(get_read_db),
+):
+    """Memberships with their payment, by membership start date."""
+    _ensure_manager(db, manager_id)
+    _check_range(date_from, date_to)
+
+    m, p = models.Membership, MembershipPayment
+    stmt = (
+        select(
+            m.id_m.label("membership_id"),
+            m.client_id,
+            m.type,
+            m.with_sauna,
+            m.price,
+            m.start_date,
+            m.end_date,
+            m.receptionist_id,
+            m.club_id,
+            p.status.label("payment_status"),
+            p.payment_method,
+            p.created_at.label("paid_at"),
+        )
+        .outerjoin(p, p.membership_id == m.id_m)
+        .order_by(m.id_m)
+    )
+    if date_from:
+        stmt = stmt.where(m.start_date >= date_from)
+    if date_to:
+        stmt = stmt.where(m.start_date <= date_to)
+    if club_id is not None:
+        if db.get(models.Club, club_id) is None:
+            raise HTTPException(status_code=404, detail="Club not found")
+        stmt = stmt.where(m.club_id == club_id)
+    return _response(stmt, format, _file_name("memberships", date_from, date_to))
+
+
+@router.get("/group-bookings")
+def export_group_bookings(
+    manager_id: int = Query(..., ge=1),
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
+    club_id: int | None = Query(default=None, ge=1),
+    format: Format = Query(default="csv"),
+    db: Session = Depends(get_read_db),
+):
+    """Group class bookings (+ reception meta: membership, payment status), by class date."""
+    _ensure_manager(db, manager_id)
+    _check_range(date_from, date_to)
+
+    gc, b, meta = models.GroupClasses, models.BookGroupClasses, BookGroupClassesMeta
+    stmt = (
+        select(
+            b.client_id,
+            b.group_classes_id.label("group_class_id"),
+            gc.name.label("class_name"),
+            gc.room,
+            gc.start_date,
+            gc.start_time,
+            gc.end_time,
+            gc.instructor_id,
+            gc.manager_id,
+            meta.membership_id,
+            meta.status.label("reservation_status"),
+            meta.booked_by_receptionist_id,
+            meta.created_at.label("booked_at"),
+        )
+        .join(gc, gc.id_c == b.group_classes_id)
+        .outerjoin(meta, (meta.client_id == b.client_id) & (meta.group_classes_id == b.group_classes_id))
+        .order_by(gc.start_date, gc.start_time, b.group_classes_id, b.client_id)
+    )
+    if date_from:
+        stmt = stmt.where(gc.start_date >= date_from)
+    if date_to:
+        stmt = stmt.where(gc.start_date <= date_to)
+    if club_id is not None:
+        club = db.get(models.Club, club_id)
+        if club is None:
+            raise HTTPException(status_code=404, detail="Club not found")
+        stmt = stmt.where(gc.manager_id == club.manager_id)
+    return _response(stmt, format, _file_name("group_bookings", date_from, date_to))
+
+
+@router.get("/individual-classes")
+def export_individual_classes(
+    manager_id: int = Query(..., ge=1),
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
+    format: Format = Query(default="csv"),
+    db: Session = Depends(get_read_db),
+):
+    """Individual (personal trainer) classes, by class date."""
+    _ensure_manager(db, manager_id)
+    _check_range(date_from, date_to)
+
+    ic = models.IndividualClasses.__table__
+    c = models.Classes.__table__
+    stmt = (
+        select(
+            c.c.id_c.label("class_id"),
+            c.c.start_date,
+            c.c.end_date,
+            c.c.start_time,
+            c.c.end_time,
+            c.c.room,
+            ic.c.client_id,
+            ic.c.per_trainer_id,
+            ic.c.additional_info,
+        )
+        .join(ic, ic.c.id_c == c.c.id_c)
+        .order_by(c.c.start_date, c.c.start_time, c.c.id_c)
+    )
+    if date_from:
+        stmt = stmt.where(c.c.start_date >= date_from)
+    if date_to:
+        stmt = stmt.where(c.c.start_date <= date_to)
+    return _response(stmt, format, _file_name("individual_classes", date_from, date_to))
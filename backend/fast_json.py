@@ -0,0 +1,63 @@
+"""
+Fast JSON rendering for API responses.
+
+FastJSONResponse is the app-wide default response class. It renders with
+orjson when it is installed (optional dependency: pip install orjson), which
+serializes date/time/datetime/enum/UUID natively, and otherwise with the
+standard json module plus a small default() hook. Either way there is no
+jsonable_encoder pass over the payload: dates, times and enums go straight to
+their ISO / value form, the same output jsonable_encoder would produce.
+
+dumps() is also used by the response cache to render cached bodies.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+def _default(o: Any):
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, BaseModel):
+        return o.model_dump(mode="json")
+    if isinstance(o, Decimal):
+        return int(o) if o == o.to_integral_value() else float(o)
+    if isinstance(o, timedelta):
+        return o.total_seconds()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, UUID):
+        return str(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,10 +1,10 @@
 import enum
 
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Boolean, Column, Date, Float, Integer, ForeignKey, DateTime, Index, PrimaryKeyConstraint, UniqueConstraint
 from sqlalchemy import Enum as SAEnum
 from sqlalchemy.sql import func
 
-from .models import Base
+from .models import Base, MembershipType
 
 class PaymentMethod(str, enum.Enum):
     ONLINE = "ONLINE"     # płatność elektroniczna
@@ -28,6 +28,7 @@ class MembershipPayment(Base):
 class ReservationStatus(str, enum.Enum):
     PAID = "PAID"
     TO_PAY = "TO_PAY"
+    WAITLISTED = "WAITLISTED"   # czeka na wolne miejsce (brak wiersza w book_group_classes)
 
 
 class BookGroupClassesMeta(Base):
@@ -36,8 +37,138 @@ class BookGroupClassesMeta(Base):
     client_id = Column(Integer, ForeignKey("clients.id_u"), primary_key=True)
     group_classes_id = Column(Integer, ForeignKey("group_classes.id_c"), primary_key=True)
 
-    membership_id = Column(Integer, ForeignKey("memberships.id_m"), nullable=True)
+    membership_id = Column(Integer, ForeignKey("memberships.id_m"), nullable=True, index=True)
     status = Column(SAEnum(ReservationStatus), nullable=False)
 
     booked_by_receptionist_id = Column(Integer, ForeignKey("receptionists.id_u"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        # waitlist FIFO: WHERE group_classes_id = ? AND status = 'WAITLISTED' ORDER BY created_at
+        Index("ix_book_group_classes_meta_waitlist", "group_classes_id", "status", "created_at"),
+    )
+
+
+# --- revenue rollups (maintained by backend/revenue.py) ---
+
+class SalesChannel(str, enum.Enum):
+    CLIENT = "CLIENT"         # kupiony przez klienta (online)
+    RECEPTION = "RECEPTION"   # sprzedany na recepcji (receptionist_id ustawiony)
+
+
+REVENUE_DIMENSIONS = ("membership_type", "with_sauna", "payment_method", "channel", "club_id")
+
+
+class _RevenueRollup:
+    # dimensions; club_id 0 = membership not linked to a club
+    membership_type = Column(SAEnum(MembershipType), nullable=False)
+    with_sauna = Column(Boolean, nullable=False)
+    payment_method = Column(SAEnum(PaymentMethod), nullable=False)
+    channel = Column(SAEnum(SalesChannel), nullable=False)
+    club_id = Column(Integer, nullable=False)
+
+    # measures
+    memberships_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+    revenue_to_pay = Column(Integer, nullable=False, default=0)  # part of revenue with payment status TO_PAY
+
+
+class RevenueDaily(_RevenueRollup, Base):
+    __tablename__ = "revenue_daily"
+
+    day = Column(Date, nullable=False)  # sale date
+
+    __table_args__ = (PrimaryKeyConstraint("day", *REVENUE_DIMENSIONS),)
+
+
+class RevenueMonthly(_RevenueRollup, Base):
+    __tablename__ = "revenue_monthly"
+
+    month = Column(Date, nullable=False)  # first day of the month
+
+    __table_args__ = (PrimaryKeyConstraint("month", *REVENUE_DIMENSIONS),)
+
+
+# --- wejście do klubu (check-in) ---
+
+class MembershipAccess(Base):
+    """
+    Activated memberships that are current or upcoming, keyed by client
+    (maintained by backend/access.py). The door check-in reads only this table.
+    """
+    __tablename__ = "membership_access"
+
+    client_id = Column(Integer, ForeignKey("clients.id_u"), primary_key=True)
+    membership_id = Column(Integer, ForeignKey("memberships.id_m"), primary_key=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)  # = start_date for a one-time pass
+    with_sauna = Column(Boolean, nullable=False)
+
+
+class CheckIn(Base):
+    __tablename__ = "check_ins"
+
+    id = Column(Integer, primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id_u"), nullable=False)
+    membership_id = Column(Integer, ForeignKey("memberships.id_m"), nullable=True)  # None when refused
+    day = Column(Date, nullable=False)
+    checked_in_at = Column(DateTime(timezone=True), nullable=False)
+    granted = Column(Boolean, nullable=False)
+    sauna = Column(Boolean, nullable=False, default=False)  # sauna access was asked for
+    receptionist_id = Column(Integer, ForeignKey("receptionists.id_u"), nullable=True)
+
+    __table_args__ = (
+        # who came on a given day (no-show penalties)
+        Index("ix_check_ins_day_client", "day", "client_id"),
+    )
+
+
+# --- kary za nieobecność (backend/no_shows.py) ---
+
+class NoShow(Base):
+    """A booked group class the client did not come to (no granted check-in that day)."""
+    __tablename__ = "no_shows"
+
+    client_id = Column(Integer, ForeignKey("clients.id_u"), primary_key=True)
+    group_classes_id = Column(Integer, ForeignKey("group_classes.id_c"), primary_key=True)
+    day = Column(Date, nullable=False, index=True)
+    membership_id = Column(Integer, ForeignKey("memberships.id_m"), nullable=True)  # shortened by one day; None = no membership
+    applied = Column(Boolean, nullable=False, default=False)  # membership already shortened for it
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class NoShowRun(Base):
+    """One row per processed day: the job never penalizes a day twice."""
+    __tablename__ = "no_show_runs"
+
+    day = Column(Date, primary_key=True)
+    no_shows = Column(Integer, nullable=False, default=0)
+    memberships_shortened = Column(Integer, nullable=False, default=0)
+    seconds = Column(Float, nullable=False, default=0)
+    finished_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+# --- cennik karnetów (backend/prices.py) ---
+
+class MembershipPrice(Base):
+    """Price of a membership type in a club from valid_from on (club_id 0 = every club without its own price)."""
+    __tablename__ = "membership_prices"
+
+    id = Column(Integer, primary_key=True)
+    club_id = Column(Integer, nullable=False, default=0)
+    membership_type = Column(SAEnum(MembershipType), nullable=False)
+    valid_from = Column(Date, nullable=False)
+    base_price = Column(Integer, nullable=False)
+    sauna_surcharge = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("club_id", "membership_type", "valid_from", name="uq_membership_prices_club_type_from"),
+    )
+
+
+class PriceCatalogVersion(Base):
+    """Single row; bumped by every price change so workers know to reload their cached catalog."""
+    __tablename__ = "price_catalog_version"
+
+    id = Column(Integer, primary_key=True)  # always 1
+    version = Column(Integer, nullable=False, default=0)
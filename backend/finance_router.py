@@ -1,47 +1,44 @@
-import hashlib
 from calendar import monthrange
-from datetime import date
+from datetime import date, datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import get_db
-from . import models
+from .database import get_db, pin_primary
+from .async_database import get_async_read_db
+from . import access, models, passwords, prices, response_cache, revenue
 from .finance_models import (
+    CheckIn,
     MembershipPayment,
     PaymentMethod,
     PaymentStatus,
     BookGroupClassesMeta,
     ReservationStatus,
 )
+from .reservations import reserve_seat, reserve_seats_bulk, ClassFullError, AlreadyBookedError
 from .finance_schemas import (
     MembershipCatalogItem,
+    CheckInRequest,
+    CheckInResponse,
     ClientPurchaseRequest,
     ReceptionSellRequest,
     MembershipResponse,
     ReceptionReserveRequest,
+    ReceptionBatchReserveRequest,
+    ReceptionBatchReserveItemResult,
+    ReceptionBatchReserveResponse,
 )
 
 router = APIRouter(tags=["Finance & Reception"])
 
-# --- Cennik i stałe ---
-BASE_PRICES = {
-    models.MembershipType.ONE_TIME_PASS: 30,
-    models.MembershipType.MONTHLY: 150,
-    models.MembershipType.QUARTERLY: 400,
-    models.MembershipType.ANNUAL: 1200,
-}
-SAUNA_SURCHARGE = 50
-
+# --- Stałe (cennik: tabela membership_prices, patrz prices.py) ---
 # Limit miejsc ustawiony na sztywno, wymagany do weryfikacji przy rezerwacji
 MAX_CLASS_CAPACITY = 20
 
 
 # --- Funkcje pomocnicze ---
-def _hash_password(pw: str) -> str:
-    return hashlib.sha256(pw.encode("utf-8")).hexdigest()
-
-
 def _add_months(d: date, months: int) -> date:
     y = d.year + (d.month - 1 + months) // 12
     m = (d.month - 1 + months) % 12 + 1
@@ -61,15 +58,20 @@ def _compute_end_date(mtype: models.MembershipType, start: date) -> date:
     raise ValueError("Unknown membership type")
 
 
-def _compute_price(mtype: models.MembershipType, with_sauna: bool, override: int | None) -> int:
+def _compute_price(
+    mtype: models.MembershipType, with_sauna: bool, override: int | None, club_id: int | None = None
+) -> int:
     if override is not None:
         return override
 
     if isinstance(mtype, str):
         mtype = models.MembershipType(mtype)
 
-    base = BASE_PRICES[mtype]
-    return base + (SAUNA_SURCHARGE if with_sauna else 0)
+    # cennik z pamięci procesu (prices.catalog), bez zapytania do bazy
+    try:
+        return prices.catalog.price(mtype, club_id=club_id).amount(with_sauna)
+    except prices.PriceNotFound as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 def _require_role(db: Session, user_id: int, role: models.UserRole):
@@ -79,16 +81,41 @@ def _require_role(db: Session, user_id: int, role: models.UserRole):
     return user
 
 
+def _require_club(db: Session, club_id: int | None) -> None:
+    if club_id is not None and db.get(models.Club, club_id) is None:
+        raise HTTPException(status_code=404, detail=f"Club {club_id} not found")
+
+
+async def _require_role_async(db: AsyncSession, user_id: int, role: models.UserRole):
+    user = (await db.execute(select(models.User).where(models.User.id_u == user_id))).scalars().first()
+    if not user or user.role != role:
+        raise HTTPException(status_code=404, detail=f"User {user_id} with role {role} not found")
+    return user
+
+
 # --- 1. ZAKUP KARNETÓW (Proces wyboru rodzaju i wariantu) ---
 @router.get("/memberships/catalog", response_model=list[MembershipCatalogItem])
-def catalog():
+def catalog(request: Request, club_id: int | None = Query(default=None, ge=1)):
     """
-    Zwraca katalog karnetów.
+    Zwraca katalog karnetów z dzisiejszymi cenami (klubu club_id, domyślnie ceny sieci).
     Rozróżnia ofertę dostępną online (Client) i tylko stacjonarnie (Reception - np. OneTimePass).
+    Odpowiedź z cache (ETag / 304).
     """
+    return response_cache.cached_json(request, response_cache.CATALOG, lambda: (_build_catalog(club_id), {}))
+
+
+def _price_or_none(t: models.MembershipType, with_sauna: bool, club_id: int | None) -> int | None:
+    try:
+        return prices.catalog.price(t, club_id=club_id).amount(with_sauna)
+    except prices.PriceNotFound:
+        return None
+
+
+def _build_catalog(club_id: int | None = None) -> list[MembershipCatalogItem]:
     items: list[MembershipCatalogItem] = []
     for t in models.MembershipType:
         for with_sauna in (False, True):
+            price = _price_or_none(t, with_sauna, club_id)
             if t == models.MembershipType.ONE_TIME_PASS:
                 # Karnet jednorazowy tylko na recepcji
                 items.append(MembershipCatalogItem(
@@ -96,6 +123,7 @@ def catalog():
                     variant="GYM_SAUNA" if with_sauna else "GYM",
                     purchase_channel="RECEPTION_ONLY",
                     allowed_payment=[PaymentMethod.CASH, PaymentMethod.ONLINE],
+                    price=price,
                 ))
             else:
                 # Pozostałe dostępne dla klienta
@@ -104,21 +132,23 @@ def catalog():
                     variant="GYM_SAUNA" if with_sauna else "GYM",
                     purchase_channel="CLIENT",
                     allowed_payment=[PaymentMethod.ONLINE, PaymentMethod.CASH],
+                    price=price,
                 ))
     return items
 
 
 # --- 2. ZAKUP PRZEZ UŻYTKOWNIKA (Inna logika: blokada jednorazowych, status płatności) ---
 @router.post("/clients/{client_id}/memberships/purchase", response_model=MembershipResponse)
-def client_purchase(client_id: int, req: ClientPurchaseRequest, db: Session = Depends(get_db)):
+def client_purchase(client_id: int, req: ClientPurchaseRequest, response: Response, db: Session = Depends(get_db)):
     _require_role(db, client_id, models.UserRole.CLIENT)
 
     # Klient nie może kupić jednorazowego online (wymóg biznesowy)
     if req.type == models.MembershipType.ONE_TIME_PASS:
         raise HTTPException(status_code=400, detail="ONE_TIME_PASS can be purchased only at reception")
+    _require_club(db, req.club_id)
 
     end_date = _compute_end_date(req.type, req.start_date)
-    price = _compute_price(req.type, req.with_sauna, req.price_override)
+    price = _compute_price(req.type, req.with_sauna, req.price_override, req.club_id)
 
     # Jeśli płatność online -> AKTYWOWANY, inna -> DO OPŁACENIA
     pay_status = PaymentStatus.ACTIVATED if req.payment_method == PaymentMethod.ONLINE else PaymentStatus.TO_PAY
@@ -131,6 +161,7 @@ def client_purchase(client_id: int, req: ClientPurchaseRequest, db: Session = De
         end_date=end_date,
         client_id=client_id,
         receptionist_id=None,
+        club_id=req.club_id,
     )
     db.add(m)
     db.flush()
@@ -141,7 +172,11 @@ def client_purchase(client_id: int, req: ClientPurchaseRequest, db: Session = De
         payment_method=req.payment_method,
     )
     db.add(mp)
+    if pay_status == PaymentStatus.ACTIVATED:
+        access.grant_membership(db, m)  # door check-in index
+    revenue.record(db, [revenue.sale_of(db, m, mp)])  # dashboard rollups, same transaction
     db.commit()
+    pin_primary(response)
 
     return MembershipResponse(
         membership_id=m.id_m,
@@ -153,13 +188,15 @@ def client_purchase(client_id: int, req: ClientPurchaseRequest, db: Session = De
         end_date=m.end_date,
         payment_status=mp.status.value,
         payment_method=mp.payment_method,
+        club_id=m.club_id,
     )
 
 
 # --- 3. ZAKUP PRZEZ RECEPCJĘ (Inna logika: obsługa nowych klientów, natychmiastowa aktywacja) ---
 @router.post("/reception/memberships/sell", response_model=MembershipResponse)
-def reception_sell(req: ReceptionSellRequest, db: Session = Depends(get_db)):
+def reception_sell(req: ReceptionSellRequest, response: Response, db: Session = Depends(get_db)):
     _require_role(db, req.receptionist_id, models.UserRole.RECEPTIONIST)
+    _require_club(db, req.club_id)
 
     client_id = req.client_id
 
@@ -184,7 +221,7 @@ def reception_sell(req: ReceptionSellRequest, db: Session = Depends(get_db)):
             email=req.new_client_email,
             phone_number=req.new_client_phone_number,
             gender=req.new_client_gender,
-            password=_hash_password(req.new_client_password),
+            password=passwords.hash_password_sync(req.new_client_password),
             role=models.UserRole.CLIENT,
             address_id=req.new_client_address_id,
         )
@@ -195,7 +232,7 @@ def reception_sell(req: ReceptionSellRequest, db: Session = Depends(get_db)):
         _require_role(db, client_id, models.UserRole.CLIENT)
 
     end_date = _compute_end_date(req.type, req.start_date)
-    price = _compute_price(req.type, req.with_sauna, req.price_override)
+    price = _compute_price(req.type, req.with_sauna, req.price_override, req.club_id)
 
     # Sprzedaż na recepcji -> zawsze od razu opłacone/aktywowane
     pay_status = PaymentStatus.ACTIVATED
@@ -208,6 +245,7 @@ def reception_sell(req: ReceptionSellRequest, db: Session = Depends(get_db)):
         end_date=end_date,
         client_id=client_id,
         receptionist_id=req.receptionist_id,
+        club_id=req.club_id,
     )
     db.add(m)
     db.flush()
@@ -218,7 +256,10 @@ def reception_sell(req: ReceptionSellRequest, db: Session = Depends(get_db)):
         payment_method=req.payment_method,
     )
     db.add(mp)
+    access.grant_membership(db, m)  # door check-in index
+    revenue.record(db, [revenue.sale_of(db, m, mp)])  # dashboard rollups, same transaction
     db.commit()
+    pin_primary(response)
 
     return MembershipResponse(
         membership_id=m.id_m,
@@ -230,12 +271,13 @@ def reception_sell(req: ReceptionSellRequest, db: Session = Depends(get_db)):
         end_date=m.end_date,
         payment_status=mp.status.value,
         payment_method=mp.payment_method,
+        club_id=m.club_id,
     )
 
 
 # --- 4. REZERWACJA ZAJĘĆ PRZEZ RECEPCJONISTĘ ---
 @router.post("/reception/group-classes/{group_class_id}/reserve")
-def reception_reserve(group_class_id: int, req: ReceptionReserveRequest, db: Session = Depends(get_db)):
+def reception_reserve(group_class_id: int, req: ReceptionReserveRequest, response: Response, db: Session = Depends(get_db)):
     """
     Rezerwacja w imieniu klienta przez recepcjonistę.
     Zawiera logikę sprawdzania wolnych miejsc oraz weryfikację ważności karnetu.
@@ -248,23 +290,7 @@ def reception_reserve(group_class_id: int, req: ReceptionReserveRequest, db: Ses
     if not gc:
         raise HTTPException(status_code=404, detail="Group class not found")
 
-    # 2. Weryfikacja wolnych miejsc (zgodnie z wymogiem obsługi)
-    current_bookings_count = db.query(models.BookGroupClasses).filter(
-        models.BookGroupClasses.group_classes_id == group_class_id
-    ).count()
-
-    if current_bookings_count >= MAX_CLASS_CAPACITY:
-        raise HTTPException(status_code=409, detail="Class is full (limit reached)")
-
-    # 3. Sprawdzenie czy klient nie jest już zapisany
-    exists = db.query(models.BookGroupClasses).filter(
-        models.BookGroupClasses.client_id == req.client_id,
-        models.BookGroupClasses.group_classes_id == group_class_id,
-    ).first()
-    if exists:
-        raise HTTPException(status_code=409, detail="Already reserved")
-
-    # 4. Weryfikacja karnetu (przypisanie karnetu do zajęć)
+    # 2. Weryfikacja karnetu (przypisanie karnetu do zajęć)
     membership_id = req.membership_id
     res_status = ReservationStatus.TO_PAY
 
@@ -288,9 +314,18 @@ def reception_reserve(group_class_id: int, req: ReceptionReserveRequest, db: Ses
         else:
             res_status = ReservationStatus.TO_PAY
 
-    # Zapis w bazie
-    booking = models.BookGroupClasses(client_id=req.client_id, group_classes_id=group_class_id)
-    db.add(booking)
+    # 3. Zajęcie miejsca (atomowo, wspólna ścieżka z /schedule/book)
+    try:
+        reserve_seat(
+            db,
+            client_id=req.client_id,
+            group_class_id=group_class_id,
+            max_capacity=MAX_CLASS_CAPACITY,
+        )
+    except ClassFullError:
+        raise HTTPException(status_code=409, detail="Class is full (limit reached)")
+    except AlreadyBookedError:
+        raise HTTPException(status_code=409, detail="Already reserved")
 
     meta = BookGroupClassesMeta(
         client_id=req.client_id,
@@ -302,47 +337,199 @@ def reception_reserve(group_class_id: int, req: ReceptionReserveRequest, db: Ses
     db.add(meta)
 
     db.commit()
+    response_cache.invalidate(response_cache.TIMETABLE)
+    pin_primary(response)
     return {"ok": True, "status": res_status.value}
 
-# --- 2b. LISTA KARNETÓW KLIENTA ---
-@router.get("/clients/{client_id}/memberships", response_model=list[MembershipResponse])
-def list_client_memberships(client_id: int, db: Session = Depends(get_db)):
-    """Returns all memberships purchased by a client (history), newest first."""
-    _require_role(db, client_id, models.UserRole.CLIENT)
+# --- 4b. REZERWACJA GRUPOWA (cała drużyna / klasa szkolna w jednym żądaniu) ---
+@router.post("/reception/group-classes/reserve-batch", response_model=ReceptionBatchReserveResponse)
+def reception_reserve_batch(req: ReceptionBatchReserveRequest, response: Response, db: Session = Depends(get_db)):
+    """
+    Rezerwacja wielu (klient, zajęcia, karnet) naraz.
+    Walidacja zbiorowymi zapytaniami, zapis w jednej transakcji, wynik dla każdej pozycji.
+    """
+    _require_role(db, req.receptionist_id, models.UserRole.RECEPTIONIST)
 
-    memberships = (
-        db.query(models.Membership)
-        .filter(models.Membership.client_id == client_id)
-        .order_by(models.Membership.start_date.desc(), models.Membership.id_m.desc())
+    items = req.items
+    client_ids = {it.client_id for it in items}
+    class_ids = {it.group_class_id for it in items}
+    membership_ids = {it.membership_id for it in items if it.membership_id is not None}
+
+    clients = {
+        r[0]
+        for r in db.query(models.User.id_u)
+        .filter(models.User.id_u.in_(client_ids), models.User.role == models.UserRole.CLIENT)
+        .all()
+    }
+    class_dates = dict(
+        db.query(models.GroupClasses.id_c, models.GroupClasses.start_date)
+        .filter(models.GroupClasses.id_c.in_(class_ids))
         .all()
     )
+    memberships = {}
+    pay_status = {}
+    if membership_ids:
+        memberships = {
+            m.id_m: m
+            for m in db.query(models.Membership).filter(models.Membership.id_m.in_(membership_ids)).all()
+        }
+        pay_status = dict(
+            db.query(MembershipPayment.membership_id, MembershipPayment.status)
+            .filter(MembershipPayment.membership_id.in_(membership_ids))
+            .all()
+        )
 
-    if not memberships:
-        return []
+    results: list[ReceptionBatchReserveItemResult | None] = [None] * len(items)
+    accepted: list[tuple[int, ReservationStatus]] = []  # (index, status)
+
+    for i, it in enumerate(items):
+        error = None
+        res_status = ReservationStatus.TO_PAY
+
+        if it.client_id not in clients:
+            error = f"User {it.client_id} with role {models.UserRole.CLIENT} not found"
+        elif it.group_class_id not in class_dates:
+            error = "Group class not found"
+        elif it.membership_id is not None:
+            m = memberships.get(it.membership_id)
+            class_date = class_dates[it.group_class_id]
+            if not m or m.client_id != it.client_id:
+                error = "Invalid membership_id for this client"
+            elif not (m.start_date <= class_date <= m.end_date):
+                error = f"Membership is not valid on the class date ({class_date})"
+            elif pay_status.get(it.membership_id) == PaymentStatus.ACTIVATED:
+                res_status = ReservationStatus.PAID
+
+        if error is None:
+            accepted.append((i, res_status))
+        else:
+            results[i] = ReceptionBatchReserveItemResult(
+                index=i, client_id=it.client_id, group_class_id=it.group_class_id, ok=False, error=error
+            )
 
-    ids = [m.id_m for m in memberships]
-    payments = (
-        db.query(MembershipPayment)
-        .filter(MembershipPayment.membership_id.in_(ids))
-        .all()
+    outcomes = reserve_seats_bulk(
+        db,
+        [(items[i].client_id, items[i].group_class_id) for i, _ in accepted],
+        max_capacity=MAX_CLASS_CAPACITY,
     )
-    pay_by_id = {p.membership_id: p for p in payments}
-
-    out: list[MembershipResponse] = []
-    for m in memberships:
-        p = pay_by_id.get(m.id_m)
-        out.append(
-            MembershipResponse(
-                membership_id=m.id_m,
-                client_id=client_id,
-                type=m.type,
-                with_sauna=m.with_sauna,
-                price=m.price,
-                start_date=m.start_date,
-                end_date=m.end_date,
-                payment_status=(p.status.value if p else "UNKNOWN"),
-                payment_method=(p.payment_method if p else PaymentMethod.CASH),
+
+    meta_rows = []
+    for (i, res_status), outcome in zip(accepted, outcomes):
+        it = items[i]
+        if outcome is None:
+            meta_rows.append({
+                "client_id": it.client_id,
+                "group_classes_id": it.group_class_id,
+                "membership_id": it.membership_id,
+                "status": res_status,
+                "booked_by_receptionist_id": req.receptionist_id,
+            })
+            results[i] = ReceptionBatchReserveItemResult(
+                index=i, client_id=it.client_id, group_class_id=it.group_class_id, ok=True, status=res_status
             )
-        )
+        else:
+            error = "Class is full (limit reached)" if isinstance(outcome, ClassFullError) else "Already reserved"
+            results[i] = ReceptionBatchReserveItemResult(
+                index=i, client_id=it.client_id, group_class_id=it.group_class_id, ok=False, error=error
+            )
+
+    if meta_rows:
+        db.execute(insert(BookGroupClassesMeta), meta_rows)
+
+    db.commit()
+    if meta_rows:
+        response_cache.invalidate(response_cache.TIMETABLE)
+        pin_primary(response)
+
+    return ReceptionBatchReserveResponse(
+        reserved=len(meta_rows),
+        rejected=len(items) - len(meta_rows),
+        results=results,
+    )
+
+# --- 5. WEJŚCIE DO KLUBU (CHECK-IN NA RECEPCJI) ---
+@router.post("/reception/check-in", response_model=CheckInResponse)
+def check_in(req: CheckInRequest, db: Session = Depends(get_db)):
+    """
+    Door check-in: does the client have an activated membership valid today
+    (with the sauna when asked)? Reads the membership_access index by client_id
+    and records the attempt in check_ins (refused ones too), so a granted
+    check-in is two statements.
+    """
+    if req.receptionist_id is not None:
+        _require_role(db, req.receptionist_id, models.UserRole.RECEPTIONIST)
+
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    row = access.lookup(db, req.client_id, today, sauna=req.sauna)
+
+    reason = None
+    if row is None:
+        # refused -> tell why (the extra queries only run on this path)
+        role = db.execute(select(models.User.role).where(models.User.id_u == req.client_id)).scalar()
+        if role != models.UserRole.CLIENT:
+            raise HTTPException(status_code=404, detail=f"Client {req.client_id} not found")
+        if req.sauna and access.lookup(db, req.client_id, today) is not None:
+            reason = "Membership does not include the sauna"
+        else:
+            reason = "No activated membership valid today"
+
+    db.execute(insert(CheckIn.__table__).values(
+        client_id=req.client_id,
+        membership_id=row.membership_id if row else None,
+        day=today,
+        checked_in_at=now,
+        granted=row is not None,
+        sauna=req.sauna,
+        receptionist_id=req.receptionist_id,
+    ))
+    db.commit()
+
+    return {
+        "client_id": req.client_id,
+        "granted": row is not None,
+        "reason": reason,
+        "membership_id": row.membership_id if row else None,
+        "valid_until": row.end_date if row else None,
+        "sauna_access": bool(row.with_sauna) if row else False,
+        "checked_in_at": now,
+    }
+
+
+# --- 2b. LISTA KARNETÓW KLIENTA ---
+def _client_memberships_stmt(client_id: int):
+    # karnet + płatność jednym zapytaniem
+    return (
+        select(models.Membership, MembershipPayment)
+        .outerjoin(MembershipPayment, MembershipPayment.membership_id == models.Membership.id_m)
+        .where(models.Membership.client_id == client_id)
+        .order_by(models.Membership.start_date.desc(), models.Membership.id_m.desc())
+    )
+
+
+def _client_membership_rows(client_id: int, rows) -> list[dict]:
+    # plain dicts: response_model validates them once (a model per row would be dumped and validated again)
+    return [
+        {
+            "membership_id": m.id_m,
+            "client_id": client_id,
+            "type": m.type,
+            "with_sauna": m.with_sauna,
+            "price": m.price,
+            "start_date": m.start_date,
+            "end_date": m.end_date,
+            "payment_status": (p.status.value if p else "UNKNOWN"),
+            "payment_method": (p.payment_method if p else PaymentMethod.CASH),
+            "club_id": m.club_id,
+        }
+        for m, p in rows
+    ]
+
+
+@router.get("/clients/{client_id}/memberships", response_model=list[MembershipResponse])
+async def list_client_memberships(client_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Returns all memberships purchased by a client (history), newest first."""
+    await _require_role_async(db, client_id, models.UserRole.CLIENT)
 
-    return out
+    rows = (await db.execute(_client_memberships_stmt(client_id))).all()
+    return _client_membership_rows(client_id, rows)
@@ -1,8 +1,8 @@
-from datetime import date
-from pydantic import BaseModel, Field
+from datetime import date, datetime
+from pydantic import BaseModel, Field, model_validator
 
 from . import models
-from .finance_models import PaymentMethod
+from .finance_models import PaymentMethod, PaymentStatus, ReservationStatus
 
 
 class MembershipCatalogItem(BaseModel):
@@ -10,6 +10,7 @@ class MembershipCatalogItem(BaseModel):
     variant: str  # "GYM" | "GYM_SAUNA"
     purchase_channel: str  # "CLIENT" | "RECEPTION_ONLY"
     allowed_payment: list[PaymentMethod]
+    price: int | None = None  # today's price; None = no price set
 
 
 class ClientPurchaseRequest(BaseModel):
@@ -18,6 +19,7 @@ class ClientPurchaseRequest(BaseModel):
     with_sauna: bool
     payment_method: PaymentMethod
     price_override: int | None = Field(default=None, ge=0)
+    club_id: int | None = Field(default=None, ge=1)  # club where it is sold (revenue statistics)
 
 
 class ReceptionSellRequest(BaseModel):
@@ -39,6 +41,7 @@ class ReceptionSellRequest(BaseModel):
     with_sauna: bool
     payment_method: PaymentMethod
     price_override: int | None = Field(default=None, ge=0)
+    club_id: int | None = Field(default=None, ge=1)  # club where it is sold (revenue statistics)
 
 
 class MembershipResponse(BaseModel):
@@ -51,9 +54,99 @@ class MembershipResponse(BaseModel):
     end_date: date
     payment_status: str
     payment_method: PaymentMethod
+    club_id: int | None = None
+
+
+class CheckInRequest(BaseModel):
+    client_id: int = Field(ge=1)
+    receptionist_id: int | None = Field(default=None, ge=1)
+    sauna: bool = False  # client wants the sauna too
+
+
+class CheckInResponse(BaseModel):
+    client_id: int
+    granted: bool
+    reason: str | None = None  # why it was refused
+    membership_id: int | None = None
+    valid_until: date | None = None
+    sauna_access: bool = False
+    checked_in_at: datetime
 
 
 class ReceptionReserveRequest(BaseModel):
     receptionist_id: int
     client_id: int
     membership_id: int | None = None
+
+
+class ReceptionBatchReserveItem(BaseModel):
+    client_id: int
+    group_class_id: int
+    membership_id: int | None = None
+
+
+class ReceptionBatchReserveRequest(BaseModel):
+    receptionist_id: int
+    items: list[ReceptionBatchReserveItem] = Field(min_length=1, max_length=500)
+
+
+class ReceptionBatchReserveItemResult(BaseModel):
+    index: int
+    client_id: int
+    group_class_id: int
+    ok: bool
+    status: ReservationStatus | None = None  # PAID | TO_PAY when ok
+    error: str | None = None
+
+
+class ReceptionBatchReserveResponse(BaseModel):
+    reserved: int
+    rejected: int
+    results: list[ReceptionBatchReserveItemResult]
+
+
+class MemberImportRow(BaseModel):
+    # klient + adres
+    first_name: str = Field(min_length=1, max_length=20)
+    last_name: str = Field(min_length=1, max_length=50)
+    birth_date: date
+    email: str = Field(max_length=100, pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+    phone_number: str = Field(min_length=1, max_length=20)
+    gender: str = Field(min_length=1, max_length=1)
+    password: str = Field(min_length=1, max_length=200)
+    city: str = Field(min_length=1, max_length=100)
+    postal_code: str = Field(min_length=1, max_length=10)
+    street_name: str = Field(min_length=1, max_length=100)
+    street_number: int = Field(ge=1)
+    apartment_number: int | None = Field(default=None, ge=1)
+
+    # opcjonalny karnet
+    membership_type: models.MembershipType | None = None
+    membership_start: date | None = None
+    with_sauna: bool = False
+    price: int | None = Field(default=None, ge=0)
+    payment_method: PaymentMethod = PaymentMethod.CASH
+    payment_status: PaymentStatus = PaymentStatus.ACTIVATED
+
+    @model_validator(mode="after")
+    def _membership_needs_start(self):
+        if self.membership_type is not None and self.membership_start is None:
+            raise ValueError("membership_start is required with membership_type")
+        return self
+
+
+class MemberImportReject(BaseModel):
+    line: int  # CSV: line of the record (header = 1), NDJSON: line number
+    email: str | None = None
+    errors: list[str]
+
+
+class MemberImportReport(BaseModel):
+    rows: int
+    imported_clients: int
+    imported_memberships: int
+    rejected: int
+    rejects: list[MemberImportReject]  # first MAX_REPORTED_REJECTS only
+    rejects_truncated: bool
+    batches: int
+    seconds: float
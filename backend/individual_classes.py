@@ -1,16 +1,21 @@
 from __future__ import annotations
 
-from datetime import date, time
+from datetime import date, time, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from . import models
+from . import models, response_cache
 from .database import get_db
+from .overlap import overlap_error_detail
 
 router = APIRouter()
 
+MAX_FREE_SLOT_DAYS = 31
+
 
 class IndividualClassCreate(BaseModel):
     start_date: date
@@ -125,6 +130,13 @@ def create_individual_class(req: IndividualClassCreate, db: Session = Depends(ge
         )
         db.add(ind)
         db.commit()
+        response_cache.invalidate(response_cache.TIMETABLE)
+    except IntegrityError as e:
+        db.rollback()
+        detail = overlap_error_detail(e)
+        if detail:
+            raise HTTPException(status_code=400, detail=detail) from e
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}") from e
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}") from e
@@ -133,4 +145,129 @@ def create_individual_class(req: IndividualClassCreate, db: Session = Depends(ge
         "status": "success",
         "message": "Individual class created",
         "class_id": new_class.id_c,
-    }
\ No newline at end of file
+    }
+
+
+class FreeSlot(BaseModel):
+    date: date
+    start_time: time
+    end_time: time
+
+
+def _minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _as_time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def find_free_slots(
+    db: Session,
+    *,
+    date_from: date,
+    date_to: date,
+    slot_minutes: int,
+    open_time: time,
+    close_time: time,
+    room: str | None = None,
+    per_trainer_id: int | None = None,
+) -> list[FreeSlot]:
+    """
+    Free slots of slot_minutes within opening hours, for a room and/or a trainer.
+    One range query for all busy classes, then one sweep over the sorted intervals.
+    """
+    individual = models.IndividualClasses.__table__
+    conds = []
+    if room is not None:
+        conds.append(models.Classes.room == room)
+    if per_trainer_id is not None:
+        conds.append(individual.c.per_trainer_id == per_trainer_id)
+
+    busy_rows = (
+        db.query(
+            models.Classes.start_date,
+            models.Classes.end_date,
+            models.Classes.start_time,
+            models.Classes.end_time,
+        )
+        .outerjoin(individual, individual.c.id_c == models.Classes.id_c)
+        .filter(
+            models.Classes.start_date <= date_to,
+            models.Classes.end_date >= date_from,
+            models.Classes.start_time < close_time,
+            models.Classes.end_time > open_time,
+            or_(*conds),
+        )
+        .all()
+    )
+
+    # (day, start_min, end_min); a multi-day class blocks the same hours on every day it spans
+    busy: list[tuple[date, int, int]] = []
+    for r in busy_rows:
+        if r.end_time <= r.start_time:
+            continue
+        d = max(r.start_date, date_from)
+        last = min(r.end_date, date_to)
+        while d <= last:
+            busy.append((d, _minutes(r.start_time), _minutes(r.end_time)))
+            d += timedelta(days=1)
+    busy.sort()
+
+    open_min, close_min = _minutes(open_time), _minutes(close_time)
+    slots: list[FreeSlot] = []
+
+    def emit(day: date, gap_start: int, gap_end: int) -> None:
+        t = max(gap_start, open_min)
+        gap_end = min(gap_end, close_min)
+        while t + slot_minutes <= gap_end:
+            slots.append(FreeSlot(date=day, start_time=_as_time(t), end_time=_as_time(t + slot_minutes)))
+            t += slot_minutes
+
+    i = 0
+    day = date_from
+    while day <= date_to:
+        cursor = open_min
+        while i < len(busy) and busy[i][0] == day:
+            _, b_start, b_end = busy[i]
+            if b_start > cursor:
+                emit(day, cursor, b_start)
+            cursor = max(cursor, b_end)
+            i += 1
+        emit(day, cursor, close_min)
+        day += timedelta(days=1)
+
+    return slots
+
+
+@router.get("/free-slots", response_model=list[FreeSlot])
+def get_free_slots(
+    date_from: date,
+    date_to: date,
+    room: str | None = Query(default=None, min_length=1, max_length=120),
+    per_trainer_id: int | None = Query(default=None, gt=0),
+    slot_minutes: int = Query(default=60, ge=15, le=480),
+    open_time: time = Query(default=time(6, 0)),
+    close_time: time = Query(default=time(22, 0)),
+    db: Session = Depends(get_db),
+):
+    """All free slots for a room and/or personal trainer in a date range (max 31 days)."""
+    if room is None and per_trainer_id is None:
+        raise HTTPException(status_code=400, detail="Provide room and/or per_trainer_id.")
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must be >= date_from.")
+    if (date_to - date_from).days + 1 > MAX_FREE_SLOT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_FREE_SLOT_DAYS} days.")
+    if close_time <= open_time:
+        raise HTTPException(status_code=400, detail="close_time must be after open_time.")
+
+    return find_free_slots(
+        db,
+        date_from=date_from,
+        date_to=date_to,
+        slot_minutes=slot_minutes,
+        open_time=open_time,
+        close_time=close_time,
+        room=room,
+        per_trainer_id=per_trainer_id,
+    )
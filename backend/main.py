@@ -1,42 +1,45 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
-from .database import engine, Base, get_db # Import connection tools
+from fastapi.responses import JSONResponse
+from .database import get_db, check_database, pool_status # Import connection tools
+from .async_database import dispose_async_engine, get_async_db
 from . import models,individual_classes
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 from . import finance_models  # важно: зарегистрировать новые таблицы в metadata
 from .finance_router import router as finance_router
-from . import schedule
+from .member_import import router as member_import_router
+from .exports import router as exports_router
+from . import schedule, occupancy, response_cache, overlap, waitlist, startup, sql_metrics, fast_json, revenue, access, prices, passwords
 from typing import Optional
-from sqlalchemy import func
-from datetime import date, time
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, time, timedelta
+from bisect import bisect_left, bisect_right
 from .manager_staff import router as manager_staff_router
 
-from sqlalchemy import text
-from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.exc import IntegrityError
+
+# No DDL at import or startup: the schema is managed by `python -m backend.migrate`
+# (run once per deploy). Workers only warm up in the background, see startup.py and /ready.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up = asyncio.create_task(asyncio.to_thread(startup.warm_up))
+    price_watch = asyncio.create_task(prices.watch())  # picks up price changes made by other workers
+    yield
+    price_watch.cancel()
+    await warm_up
+    passwords.pool.shutdown() # stop the password hashing processes
+    await dispose_async_engine() # close the async pool on shutdown
 
-def ensure_db_schema():
-    """
-    Quick-and-dirty migrations (idempotent).
-    Keeps dev DB in sync without Alembic.
-    """
-    with engine.begin() as conn:
-        # Add start_time/end_time to classes if missing
-        conn.execute(text("""
-            ALTER TABLE classes
-            ADD COLUMN IF NOT EXISTS start_time time NOT NULL DEFAULT '18:00';
-        """))
-        conn.execute(text("""
-            ALTER TABLE classes
-            ADD COLUMN IF NOT EXISTS end_time time NOT NULL DEFAULT '19:00';
-        """))
-
-# Check models and create tables in the DB
-# If tables already exist don't overwrite them, only create new ones
-models.Base.metadata.create_all(bind=engine)
-ensure_db_schema()
 # Instance of FastAPI class
-app=FastAPI()
+app=FastAPI(lifespan=lifespan, default_response_class=fast_json.FastJSONResponse)
+
+# Per-route statement counts / DB time (GET /metrics/sql) and the slow-query log
+sql_metrics.install()
+app.add_middleware(sql_metrics.SQLMetricsMiddleware)
 
 app.include_router(
     individual_classes.router,
@@ -45,15 +48,57 @@ app.include_router(
 )
 
 app.include_router(finance_router)
+app.include_router(member_import_router)
+app.include_router(exports_router)
 
 app.include_router(manager_staff_router)
 
 app.include_router(schedule.router)
+
+
+@app.exception_handler(passwords.HashingBusy)
+async def hashing_busy(request, exc: passwords.HashingBusy):
+    # password hashing queue full (login burst): ask the client to retry instead of queueing
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(passwords.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
 # Tells which URL should trigger this function
 # The one below means: when someone visits the home page...
 @app.get("/")
 def check_status():
-    return {"status": "Database created!"} # Returns a JSON response to verify connection with DB and server
+    # Health + connection pool metrics (checkout wait, in use, overflow) + password hashing pool
+    db_ok = check_database()
+    return JSONResponse(
+        status_code=200 if db_ok else 503,
+        content={
+            "status": "ok" if db_ok else "database unavailable",
+            "pool": pool_status(),
+            "password_hashing": passwords.pool.snapshot(),
+        },
+    )
+
+
+@app.get("/ready")
+async def check_ready():
+    # Readiness: 200 once this worker is warm (mappers, first connection, schema current)
+    if not startup.readiness.ready:
+        await asyncio.to_thread(startup.warm_up) # retry a failed warm-up on each probe
+    return JSONResponse(
+        status_code=200 if startup.readiness.ready else 503,
+        content=startup.readiness.snapshot(),
+    )
+
+
+@app.get("/metrics/sql")
+def get_sql_metrics(reset: bool = False):
+    # Per route: statements and DB time per request (histograms), slowest statement
+    snapshot = sql_metrics.sql_metrics.snapshot()
+    if reset:
+        sql_metrics.sql_metrics.reset()
+    return snapshot
 
 
 # -------USER CREATION-------
@@ -91,20 +136,24 @@ def create_test_user(user: UserCreate, db: Session = Depends(get_db)):
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered.")
     
+    # Only the hash is stored (hashed in the password pool, see passwords.py)
+    fields = user.model_dump()
+    fields["password"] = passwords.hash_password_sync(user.password)
+
     # Create object from the defined role
     if user.role == models.UserRole.PERSONAL_TRAINER:
-        new_user = models.PersonalTrainer(**user.model_dump(), hire_date=date.today())
+        new_user = models.PersonalTrainer(**fields, hire_date=date.today())
     elif user.role == models.UserRole.RECEPTIONIST:
-        new_user = models.Receptionist(**user.model_dump(), hire_date=date.today())
+        new_user = models.Receptionist(**fields, hire_date=date.today())
     elif user.role == models.UserRole.MANAGER:
-        new_user = models.Manager(**user.model_dump(), hire_date=date.today())
+        new_user = models.Manager(**fields, hire_date=date.today())
     elif user.role == models.UserRole.INSTRUCTOR:
-        new_user = models.Instructor(**user.model_dump(), hire_date=date.today())
+        new_user = models.Instructor(**fields, hire_date=date.today())
     elif user.role == models.UserRole.CLIENT:
-        new_user = models.Client(**user.model_dump())
+        new_user = models.Client(**fields)
     else:
         # For undefined roles- should not happen
-        new_user = models.User(**user.model_dump())
+        new_user = models.User(**fields)
 
     db.add(new_user)
     db.commit()
@@ -117,16 +166,26 @@ class LoginRequest(BaseModel):
     password: str
 
 @app.post("/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     # Fin user by email
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = (await db.execute(select(models.User).where(models.User.email == request.email))).scalars().first()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found.")
     
-    # Password check
-    if user.password != request.password:
+    # Password check in the hashing pool (off the event loop and the shared threadpool)
+    check = await passwords.verify_password(request.password, user.password)
+    if not check.ok:
         raise HTTPException(status_code=401, detail="Invalid password.")
+
+    if check.new_hash is not None:
+        # legacy format or old cost: store the new hash (unless the password changed meanwhile)
+        await db.execute(
+            update(models.User)
+            .where(models.User.id_u == user.id_u, models.User.password == user.password)
+            .values(password=check.new_hash)
+        )
+        await db.commit()
     
     return {
         "message": "Login successful",
@@ -216,13 +275,160 @@ def create_group_class(data: GroupClassesCreate, db: Session = Depends(get_db)):
 
     try:
         db.add(new_group_class)
+        db.flush()
+        db.add(models.GroupClassOccupancy(group_classes_id=new_group_class.id_c, booked_count=0))
         db.commit()
         db.refresh(new_group_class)
+        response_cache.invalidate(response_cache.TIMETABLE)
         return {"message": "Group class created successfully.", "class_id": new_group_class.id_c}
+    except IntegrityError as e:
+        db.rollback()
+        detail = overlap.overlap_error_detail(e)
+        if detail:
+            raise HTTPException(status_code=400, detail=detail)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+
+# -------GROUP CLASS SERIES (weekly timetable in one request)-------
+
+MAX_SERIES_OCCURRENCES = 366
+
+
+class GroupClassSeriesCreate(BaseModel):
+    start_date: date  # first day of the series
+    until: date  # last day (inclusive)
+    weekdays: list[int] = Field(min_length=1, max_length=7)  # 0=Monday ... 6=Sunday
+    start_time: time
+    end_time: time
+    room: str
+    name: str
+    instructor_id: int
+    manager_id: int
+    receptionist_id: int | None = None
+    skip_conflicts: bool = False  # True -> create free occurrences, report the rest
+
+
+def _series_dates(data: GroupClassSeriesCreate) -> list[date]:
+    weekdays = set(data.weekdays)
+    days = (data.until - data.start_date).days + 1
+    return [
+        d for d in (data.start_date + timedelta(days=i) for i in range(days))
+        if d.weekday() in weekdays
+    ]
+
+
+@app.post("/classes/group/series")
+def create_group_class_series(data: GroupClassSeriesCreate, db: Session = Depends(get_db)):
+    manager = db.query(models.Manager).filter(models.Manager.id_u == data.manager_id).first()
+    if not manager:
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied. Only a Manager can create group classes."
+        )
+
+    if data.until < data.start_date:
+        raise HTTPException(status_code=400, detail="until must be >= start_date")
+    if data.end_time <= data.start_time:
+        raise HTTPException(status_code=400, detail="end_time must be > start_time (same-day class)")
+    if any(wd < 0 or wd > 6 for wd in data.weekdays):
+        raise HTTPException(status_code=400, detail="weekdays must be between 0 (Monday) and 6 (Sunday)")
+    # every full week holds one occurrence per weekday: refuse a long range before building its dates
+    full_weeks = ((data.until - data.start_date).days + 1) // 7
+    if full_weeks * len(set(data.weekdays)) > MAX_SERIES_OCCURRENCES:
+        raise HTTPException(status_code=400, detail=f"Too many occurrences (max {MAX_SERIES_OCCURRENCES})")
+
+    dates = _series_dates(data)
+    if not dates:
+        raise HTTPException(status_code=400, detail="The recurrence rule produces no occurrences")
+    if len(dates) > MAX_SERIES_OCCURRENCES:
+        raise HTTPException(status_code=400, detail=f"Too many occurrences (max {MAX_SERIES_OCCURRENCES})")
+
+    # one query for every class that can clash with any occurrence (same room or same instructor)
+    existing = (
+        db.query(
+            models.Classes.start_date,
+            models.Classes.end_date,
+            models.Classes.room,
+            models.GroupClasses.instructor_id,
+        )
+        .outerjoin(models.GroupClasses, models.GroupClasses.id_c == models.Classes.id_c)
+        .filter(
+            models.Classes.start_date <= dates[-1],
+            models.Classes.end_date >= dates[0],
+            models.Classes.start_time < data.end_time,
+            models.Classes.end_time > data.start_time,
+            or_(
+                models.Classes.room == data.room,
+                models.GroupClasses.instructor_id == data.instructor_id,
+            ),
+        )
+        .all()
+    )
+
+    conflicts: dict[date, str] = {}
+    for row in existing:
+        reason = (
+            "Instructor is already assigned to another group class at this time."
+            if row.instructor_id == data.instructor_id
+            else "Room is occupied during this time."
+        )
+        lo = bisect_left(dates, row.start_date)
+        hi = bisect_right(dates, row.end_date)
+        for d in dates[lo:hi]:
+            conflicts.setdefault(d, reason)
+
+    conflict_list = [{"date": d.isoformat(), "reason": conflicts[d]} for d in sorted(conflicts)]
+
+    if conflicts and not data.skip_conflicts:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Some occurrences conflict with existing classes.", "conflicts": conflict_list},
+        )
+
+    new_classes = [
+        models.GroupClasses(
+            start_date=d,
+            end_date=d,
+            start_time=data.start_time,
+            end_time=data.end_time,
+            room=data.room,
+            name=data.name,
+            instructor_id=data.instructor_id,
+            manager_id=data.manager_id,
+            receptionist_id=data.receptionist_id,
+            classes_type=models.ClassesType.GROUP
+        )
+        for d in dates if d not in conflicts
+    ]
+
+    try:
+        db.add_all(new_classes)
+        db.flush()
+        db.add_all([models.GroupClassOccupancy(group_classes_id=c.id_c, booked_count=0) for c in new_classes])
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        detail = overlap.overlap_error_detail(e)
+        if detail:
+            # an overlapping class was created concurrently
+            raise HTTPException(status_code=400, detail=detail)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+    if new_classes:
+        response_cache.invalidate(response_cache.TIMETABLE)
+
+    return {
+        "message": f"Created {len(new_classes)} group classes.",
+        "class_ids": [c.id_c for c in new_classes],
+        "conflicts": conflict_list,
+    }
+
     
 class DeleteClientRequest(BaseModel):
     password: str
@@ -240,7 +446,7 @@ def delete_client(client_id: int, payload: DeleteClientRequest, db: Session = De
         raise HTTPException(status_code=404, detail="Client not found.")
 
     # minimal confirmation
-    if user.password != payload.password:
+    if not passwords.verify_password_sync(payload.password, user.password).ok:
         raise HTTPException(status_code=401, detail="Invalid password.")
 
     address_id = user.address_id
@@ -253,6 +459,14 @@ def delete_client(client_id: int, payload: DeleteClientRequest, db: Session = De
             .all()
         ]
 
+        revenue.remove_client_sales(db, client_id)
+        access.revoke_client(db, client_id)
+        db.query(finance_models.CheckIn) \
+          .filter(finance_models.CheckIn.client_id == client_id) \
+          .delete(synchronize_session=False)
+        db.query(finance_models.NoShow) \
+          .filter(finance_models.NoShow.client_id == client_id) \
+          .delete(synchronize_session=False)
         if membership_ids:
             db.query(finance_models.MembershipPayment) \
               .filter(finance_models.MembershipPayment.membership_id.in_(membership_ids)) \
@@ -263,6 +477,13 @@ def delete_client(client_id: int, payload: DeleteClientRequest, db: Session = De
           .delete(synchronize_session=False)
 
         # ---- BOOKINGS (meta + base) ----
+        booked_class_ids = [
+            r[0] for r in db.query(models.BookGroupClasses.group_classes_id)
+            .filter(models.BookGroupClasses.client_id == client_id)
+            .all()
+        ]
+        occupancy.decrement_for_client(db, client_id)
+
         db.query(finance_models.BookGroupClassesMeta) \
           .filter(finance_models.BookGroupClassesMeta.client_id == client_id) \
           .delete(synchronize_session=False)
@@ -271,6 +492,12 @@ def delete_client(client_id: int, payload: DeleteClientRequest, db: Session = De
           .filter(models.BookGroupClasses.client_id == client_id) \
           .delete(synchronize_session=False)
 
+        # freed seats go to the waitlists
+        for group_class_id in booked_class_ids:
+            group_class = db.get(models.GroupClasses, group_class_id)
+            if group_class is not None:
+                waitlist.promote(db, group_class_id, schedule._get_max_capacity(group_class))
+
         # ---- MESSAGES ----
         db.query(models.ReceiveMsg) \
           .filter(models.ReceiveMsg.client_id == client_id) \
@@ -302,6 +529,7 @@ def delete_client(client_id: int, payload: DeleteClientRequest, db: Session = De
               .delete(synchronize_session=False)
 
         db.commit()
+        response_cache.invalidate(response_cache.TIMETABLE)
         return {"status": "success", "message": "Client deleted."}
 
     except Exception as e:
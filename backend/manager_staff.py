@@ -3,13 +3,17 @@ from __future__ import annotations
 from datetime import date
 from enum import Enum
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from pydantic import BaseModel, Field
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .database import get_db
-from . import models
+from .database import get_db, get_read_db, pin_primary
+from .async_database import get_async_read_db
+from . import models, passwords, prices, response_cache, revenue
+from .finance_models import MembershipPrice
 
 
 router = APIRouter(prefix="/manager", tags=["Manager"])
@@ -44,7 +48,7 @@ class CreateStaffRequest(BaseModel):
     phone_number: str = Field(min_length=3, max_length=40)  # NOT NULL
     gender: str = Field(min_length=1, max_length=1, pattern="^[FMO]$")
 
-    # plaintext (zgodnie z tym jak działa Wasz /login)
+    # zapisywane jako hash scrypt (passwords.py)
     password: str = Field(min_length=1, max_length=200)
 
     contract_type: str = Field(min_length=1, max_length=40)
@@ -66,6 +70,45 @@ class StaffResponse(BaseModel):
     address_id: int | None = None
 
 
+class RevenueTotals(BaseModel):
+    memberships_sold: int
+    revenue: int
+    revenue_to_pay: int
+
+
+class RevenueBucket(RevenueTotals):
+    key: str
+
+
+class RevenueReport(BaseModel):
+    period: str
+    club_id: int | None = None
+    totals: RevenueTotals
+    series: list[RevenueBucket]  # per day (month view) / per month (year view)
+    by_type: list[RevenueBucket]
+    by_sauna: list[RevenueBucket]
+    by_payment_method: list[RevenueBucket]
+    by_channel: list[RevenueBucket]
+    by_club: list[RevenueBucket]  # key "none" = memberships sold without a club
+
+
+class SetPriceRequest(BaseModel):
+    manager_id: int = Field(..., ge=1)
+    club_id: int = Field(default=prices.ALL_CLUBS, ge=0)  # 0 = chain-wide price
+    membership_type: models.MembershipType
+    valid_from: date
+    base_price: int = Field(..., ge=0)
+    sauna_surcharge: int = Field(..., ge=0)
+
+
+class PriceResponse(BaseModel):
+    club_id: int
+    membership_type: models.MembershipType
+    valid_from: date
+    base_price: int
+    sauna_surcharge: int
+
+
 def _ensure_manager(db: Session, manager_id: int) -> models.Manager:
     mgr = db.query(models.Manager).filter(models.Manager.id_u == manager_id).first()
     if not mgr:
@@ -73,6 +116,13 @@ def _ensure_manager(db: Session, manager_id: int) -> models.Manager:
     return mgr
 
 
+async def _ensure_manager_async(db: AsyncSession, manager_id: int) -> models.Manager:
+    mgr = (await db.execute(select(models.Manager).where(models.Manager.id_u == manager_id))).scalars().first()
+    if not mgr:
+        raise HTTPException(status_code=403, detail="Only MANAGER can perform this action.")
+    return mgr
+
+
 def _role_to_model(role: StaffRole):
     if role == StaffRole.RECEPTIONIST:
         return models.Receptionist, models.UserRole.RECEPTIONIST
@@ -82,7 +132,7 @@ def _role_to_model(role: StaffRole):
 
 
 @router.post("/staff", response_model=StaffResponse)
-def create_staff(req: CreateStaffRequest, db: Session = Depends(get_db)):
+def create_staff(req: CreateStaffRequest, response: Response, db: Session = Depends(get_db)):
     _ensure_manager(db, req.manager_id)
 
     # szybki check żeby ładnie zwrócić błąd
@@ -110,7 +160,7 @@ def create_staff(req: CreateStaffRequest, db: Session = Depends(get_db)):
         email=req.email.strip(),
         phone_number=req.phone_number.strip(),
         gender=req.gender,
-        password=req.password,  # plaintext
+        password=passwords.hash_password_sync(req.password),
         role=role_enum,
         address_id=adr.id_adr,
         hire_date=date.today(),
@@ -122,6 +172,7 @@ def create_staff(req: CreateStaffRequest, db: Session = Depends(get_db)):
         db.add(employee)
         db.commit()
         db.refresh(employee)
+        pin_primary(response) # the staff list right after shows the new employee
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail="Could not create staff (duplicate email or integrity error).")
@@ -140,17 +191,10 @@ def create_staff(req: CreateStaffRequest, db: Session = Depends(get_db)):
     )
 
 
-@router.get("/staff", response_model=list[StaffResponse])
-def list_staff(
-    manager_id: int = Query(..., ge=1),
-    role: StaffRole | None = Query(default=None),
-    db: Session = Depends(get_db),
-):
-    _ensure_manager(db, manager_id)
-
-    q = (
-        db.query(models.Employee)
-        .filter(
+def _staff_stmt(role: StaffRole | None):
+    stmt = (
+        select(models.Employee)
+        .where(
             models.Employee.role.in_(
                 [
                     models.UserRole.RECEPTIONIST,
@@ -163,22 +207,124 @@ def list_staff(
     )
 
     if role is not None:
-        q = q.filter(models.Employee.role == models.UserRole[role.value])
+        stmt = stmt.where(models.Employee.role == models.UserRole[role.value])
+    return stmt
 
-    rows = q.all()
 
+def _staff_rows(rows) -> list[dict]:
+    # plain dicts: response_model validates them once
     return [
-        StaffResponse(
-            user_id=r.id_u,
-            role=r.role.value if hasattr(r.role, "value") else str(r.role),
-            first_name=r.first_name,
-            last_name=r.last_name,
-            email=r.email,
-            phone_number=r.phone_number,
-            contract_type=getattr(r, "contract_type", None),
-            hire_date=getattr(r, "hire_date", None),
-            salary=getattr(r, "salary", None),
-            address_id=r.address_id,
-        )
+        {
+            "user_id": r.id_u,
+            "role": r.role.value if hasattr(r.role, "value") else str(r.role),
+            "first_name": r.first_name,
+            "last_name": r.last_name,
+            "email": r.email,
+            "phone_number": r.phone_number,
+            "contract_type": getattr(r, "contract_type", None),
+            "hire_date": getattr(r, "hire_date", None),
+            "salary": getattr(r, "salary", None),
+            "address_id": r.address_id,
+        }
         for r in rows
     ]
+
+
+@router.get("/staff", response_model=list[StaffResponse])
+async def list_staff(
+    manager_id: int = Query(..., ge=1),
+    role: StaffRole | None = Query(default=None),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    await _ensure_manager_async(db, manager_id)
+
+    rows = (await db.execute(_staff_stmt(role))).scalars().all()
+    return _staff_rows(rows)
+
+
+# --- STATYSTYKI SPRZEDAŻY (z tabel revenue_daily / revenue_monthly) ---
+@router.get("/stats/revenue/month", response_model=RevenueReport)
+async def revenue_month(
+    manager_id: int = Query(..., ge=1),
+    year: int = Query(..., ge=2000, le=2100),
+    month: int = Query(..., ge=1, le=12),
+    club_id: int | None = Query(default=None, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Membership sales of one month, per day and per dimension (club_id=0: sold without a club)."""
+    await _ensure_manager_async(db, manager_id)
+    rows = (await db.execute(revenue.month_stmt(year, month, club_id))).all()
+    return {"period": f"{year:04d}-{month:02d}", "club_id": club_id, **revenue.summarize(rows, "day", "%Y-%m-%d")}
+
+
+@router.get("/stats/revenue/year", response_model=RevenueReport)
+async def revenue_year(
+    manager_id: int = Query(..., ge=1),
+    year: int = Query(..., ge=2000, le=2100),
+    club_id: int | None = Query(default=None, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Membership sales of one year, per month and per dimension."""
+    await _ensure_manager_async(db, manager_id)
+    rows = (await db.execute(revenue.year_stmt(year, club_id))).all()
+    return {"period": f"{year:04d}", "club_id": club_id, **revenue.summarize(rows, "month", "%Y-%m")}
+
+
+# --- CENNIK KARNETÓW (tabela membership_prices, cache w prices.py) ---
+@router.get("/prices", response_model=list[PriceResponse])
+def list_prices(
+    manager_id: int = Query(..., ge=1),
+    club_id: int | None = Query(default=None, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """All price rows, past and future (club_id=0: chain-wide prices)."""
+    _ensure_manager(db, manager_id)
+    stmt = select(MembershipPrice).order_by(
+        MembershipPrice.club_id, MembershipPrice.membership_type, MembershipPrice.valid_from
+    )
+    if club_id is not None:
+        stmt = stmt.where(MembershipPrice.club_id == club_id)
+    return [
+        {
+            "club_id": p.club_id,
+            "membership_type": p.membership_type,
+            "valid_from": p.valid_from,
+            "base_price": p.base_price,
+            "sauna_surcharge": p.sauna_surcharge,
+        }
+        for p in db.execute(stmt).scalars()
+    ]
+
+
+@router.post("/prices", response_model=PriceResponse)
+def set_price(req: SetPriceRequest, response: Response, db: Session = Depends(get_db)):
+    """
+    Sets the price of a membership type from valid_from on (today or later; past
+    prices stay as they were). Every worker picks it up within
+    prices.PRICE_CATALOG_POLL_SECONDS, no redeploy.
+    """
+    _ensure_manager(db, req.manager_id)
+    if req.valid_from < date.today():
+        raise HTTPException(status_code=400, detail="valid_from cannot be in the past.")
+    if req.club_id != prices.ALL_CLUBS and db.get(models.Club, req.club_id) is None:
+        raise HTTPException(status_code=404, detail=f"Club {req.club_id} not found")
+
+    try:
+        prices.set_price(
+            db,
+            club_id=req.club_id,
+            membership_type=req.membership_type,
+            valid_from=req.valid_from,
+            base_price=req.base_price,
+            sauna_surcharge=req.sauna_surcharge,
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Price was changed concurrently, try again.")
+
+    # this worker sees the new price right away, the others on their next poll
+    prices.catalog.invalidate()
+    response_cache.invalidate(response_cache.CATALOG)
+    pin_primary(response)  # the price list right after shows the new row
+    return req.model_dump(exclude={"manager_id"})
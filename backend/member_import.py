@@ -0,0 +1,353 @@
+"""
+Streaming bulk import of member records (clients + optional membership).
+
+    python -m backend.member_import members.csv --receptionist-id 3
+    python -m backend.member_import members.ndjson --batch-size 2000
+    POST /reception/members/import?receptionist_id=3    (body = the CSV / NDJSON file)
+
+One record per CSV row (header with the MemberImportRow field names) or per
+NDJSON line. Records are parsed one at a time, validated with MemberImportRow
+and loaded in batches of --batch-size, each batch in its own transaction:
+  1. duplicate emails inside the batch, emails already in the database
+     (one IN query) and memberships without a price in the catalog are rejected,
+  2. addresses, users, clients, memberships and membership payments are bulk
+     inserted table by table (multi-row INSERT ... RETURNING for the keys).
+Only the current batch and at most MAX_REPORTED_REJECTS rejects are kept in
+memory, so memory use does not depend on the file size. The endpoint reads the
+request body as a stream (nothing is buffered to disk).
+
+Passwords are hashed in the password pool (passwords.py, import cost) before
+the batch transaction opens; prices and end dates follow the membership catalog unless
+the row gives a price.
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import csv
+import json
+import sys
+import time
+from typing import Iterable, Iterator, Literal
+
+import anyio
+from fastapi import APIRouter, Query, Request
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+
+from . import access, models, passwords, prices, revenue
+from .database import SessionLocal, engine as default_engine
+from .finance_models import MembershipPayment, PaymentStatus
+from .finance_router import _compute_end_date, _require_role
+from .finance_schemas import MemberImportReject, MemberImportReport, MemberImportRow
+
+router = APIRouter(tags=["Finance & Reception"])
+
+DEFAULT_BATCH_SIZE = 1_000
+MAX_BATCH_SIZE = 10_000
+MAX_REPORTED_REJECTS = 1_000
+
+Format = Literal["csv", "ndjson"]
+
+
+# --- parsing (record by record) ---
+
+def _clean(record: dict) -> dict:
+    # empty values ("" in CSV, null in JSON) count as missing -> field defaults apply
+    out = {}
+    for k, v in record.items():
+        if isinstance(v, str):
+            v = v.strip()
+        if k is not None and v not in (None, ""):
+            out[k.strip()] = v
+    return out
+
+
+def parse_csv(lines: Iterable[str]) -> Iterator[tuple[int, dict | None, str | None]]:
+    reader = csv.DictReader(lines)
+    for record in reader:
+        if None in record:
+            yield reader.line_num, None, "more fields than header columns"
+            continue
+        yield reader.line_num, _clean(record), None
+
+
+def parse_ndjson(lines: Iterable[str]) -> Iterator[tuple[int, dict | None, str | None]]:
+    for n, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield n, None, "expected a JSON object"
+            continue
+        yield n, _clean(record), None
+
+
+def _errors(e: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()]
+
+
+# --- loading (batch by batch) ---
+
+class _Report:
+    def __init__(self):
+        self.rows = 0
+        self.clients = 0
+        self.memberships = 0
+        self.rejected = 0
+        self.rejects: list[MemberImportReject] = []
+        self.batches = 0
+
+    def reject(self, line: int, email: str | None, errors: list[str]) -> None:
+        self.rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append(MemberImportReject(line=line, email=email, errors=errors))
+
+
+def _insert_returning(conn, table, pk, rows: list[dict]) -> list[int]:
+    if not rows:
+        return []
+    result = conn.execute(insert(table).returning(pk, sort_by_parameter_order=True), rows)
+    return [r[0] for r in result]
+
+
+def _row_price(row: MemberImportRow) -> int | None:
+    """Price column, else today's chain-wide catalog price (raises prices.PriceNotFound)."""
+    if row.membership_type is None:
+        return None
+    if row.price is not None:
+        return row.price
+    return prices.catalog.price(row.membership_type).amount(row.with_sauna)
+
+
+def _load_batch(
+    conn, batch: list[tuple[int, MemberImportRow]], hashes: dict[int, str], receptionist_id: int | None, report: _Report
+) -> None:
+    # 1. emails: duplicates inside the batch, then one query for the ones already taken
+    seen: set[str] = set()
+    unique: list[tuple[int, MemberImportRow]] = []
+    for line, row in batch:
+        if row.email in seen:
+            report.reject(line, row.email, ["email: duplicated in the file"])
+        else:
+            seen.add(row.email)
+            unique.append((line, row))
+
+    taken = set(conn.execute(select(models.User.email).where(models.User.email.in_(seen))).scalars()) if seen else set()
+    rows: list[MemberImportRow] = []
+    lines: list[int] = []
+    row_prices: list[int | None] = []
+    for line, row in unique:
+        if row.email in taken:
+            report.reject(line, row.email, ["email: already exists"])
+            continue
+        try:
+            price = _row_price(row)
+        except prices.PriceNotFound as e:
+            report.reject(line, row.email, [f"membership_type: {e}"])
+            continue
+        rows.append(row)
+        lines.append(line)
+        row_prices.append(price)
+    if not rows:
+        return
+
+    # 2. table by table, keys come back in parameter order
+    address_ids = _insert_returning(conn, models.Addresses.__table__, models.Addresses.__table__.c.id_adr, [
+        dict(city=r.city, postal_code=r.postal_code, street_name=r.street_name,
+             street_number=r.street_number, apartment_number=r.apartment_number)
+        for r in rows
+    ])
+    user_ids = _insert_returning(conn, models.User.__table__, models.User.__table__.c.id_u, [
+        dict(first_name=r.first_name, last_name=r.last_name, birth_date=r.birth_date, email=r.email,
+             phone_number=r.phone_number, gender=r.gender, password=hashes[line],
+             role=models.UserRole.CLIENT, address_id=adr)
+        for r, line, adr in zip(rows, lines, address_ids)
+    ])
+    conn.execute(insert(models.Client.__table__), [dict(id_u=u) for u in user_ids])
+
+    with_membership = [
+        (r, u, price)
+        for r, u, price in zip(rows, user_ids, row_prices) if r.membership_type is not None
+    ]
+    membership_rows = [
+        dict(type=r.membership_type, with_sauna=r.with_sauna, price=price,
+             start_date=r.membership_start, end_date=_compute_end_date(r.membership_type, r.membership_start),
+             client_id=u, receptionist_id=receptionist_id)
+        for r, u, price in with_membership
+    ]
+    membership_ids = _insert_returning(conn, models.Membership.__table__, models.Membership.__table__.c.id_m, membership_rows)
+    if membership_ids:
+        conn.execute(insert(MembershipPayment.__table__), [
+            dict(membership_id=m, status=r.payment_status, payment_method=r.payment_method)
+            for (r, _, _), m in zip(with_membership, membership_ids)
+        ])
+        access.grant(conn, [
+            dict(row, id_m=m) for (r, _, _), row, m in zip(with_membership, membership_rows, membership_ids)
+            if r.payment_status == PaymentStatus.ACTIVATED
+        ])
+        days = revenue.sale_days(conn, membership_ids)
+        revenue.record(conn, [
+            revenue.Sale(day=days[m], membership_type=r.membership_type, with_sauna=r.with_sauna,
+                         payment_method=r.payment_method, channel=revenue.channel_for(receptionist_id),
+                         club_id=0, price=price, to_pay=r.payment_status == PaymentStatus.TO_PAY)
+            for (r, _, price), m in zip(with_membership, membership_ids)
+        ])
+
+    report.clients += len(user_ids)
+    report.memberships += len(membership_ids)
+
+
+def _flush(engine: Engine, batch, receptionist_id, report: _Report) -> None:
+    report.batches += 1
+    # hashed before the transaction opens (password pool, see passwords.py), kept for the retry
+    hashes = dict(zip((line for line, _ in batch), passwords.hash_many(row.password for _, row in batch)))
+    for attempt in (1, 2):
+        partial = _Report()
+        try:
+            with engine.begin() as conn:
+                _load_batch(conn, batch, hashes, receptionist_id, partial)
+        except IntegrityError as e:
+            if attempt == 1:
+                continue  # e.g. an email taken concurrently: validate again against the database
+            for line, row in batch:
+                report.reject(line, row.email, [f"database: {e.orig}"])
+            return
+        report.clients += partial.clients
+        report.memberships += partial.memberships
+        report.rejected += partial.rejected
+        report.rejects.extend(partial.rejects[: MAX_REPORTED_REJECTS - len(report.rejects)])
+        return
+
+
+def import_members(
+    lines: Iterable[str],
+    fmt: Format = "csv",
+    *,
+    receptionist_id: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    engine: Engine = default_engine,
+) -> MemberImportReport:
+    t0 = time.perf_counter()
+    report = _Report()
+    batch: list[tuple[int, MemberImportRow]] = []
+
+    for line, record, error in (parse_ndjson(lines) if fmt == "ndjson" else parse_csv(lines)):
+        report.rows += 1
+        if error is not None:
+            report.reject(line, None, [error])
+            continue
+        try:
+            batch.append((line, MemberImportRow.model_validate(record)))
+        except ValidationError as e:
+            report.reject(line, record.get("email"), _errors(e))
+            continue
+        if len(batch) >= batch_size:
+            _flush(engine, batch, receptionist_id, report)
+            batch = []
+
+    if batch:
+        _flush(engine, batch, receptionist_id, report)
+
+    return MemberImportReport(
+        rows=report.rows,
+        imported_clients=report.clients,
+        imported_memberships=report.memberships,
+        rejected=report.rejected,
+        rejects=report.rejects,
+        rejects_truncated=report.rejected > len(report.rejects),
+        batches=report.batches,
+        seconds=round(time.perf_counter() - t0, 3),
+    )
+
+
+# --- endpoint ---
+
+def _stream_lines(body) -> Iterator[str]:
+    """Lines of the async request body, read from a worker thread chunk by chunk."""
+    chunks = body.__aiter__()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buf = ""
+    while True:
+        try:
+            chunk = anyio.from_thread.run(chunks.__anext__)
+        except StopAsyncIteration:
+            break
+        buf += decoder.decode(chunk)
+        *complete, buf = buf.split("\n")
+        for line in complete:
+            yield line + "\n"
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf
+
+
+@router.post("/reception/members/import", response_model=MemberImportReport)
+async def import_members_endpoint(
+    request: Request,
+    receptionist_id: int = Query(..., ge=1),
+    format: Format | None = Query(default=None, description="csv | ndjson (default: from Content-Type)"),
+    batch_size: int = Query(default=DEFAULT_BATCH_SIZE, ge=1, le=MAX_BATCH_SIZE),
+):
+    """
+    Imports clients (+ optional memberships) from a CSV or NDJSON request body.
+    Valid rows are loaded, invalid ones are listed in the report with their line number.
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt: Format = format or ("ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv")
+
+    def run() -> MemberImportReport:
+        db = SessionLocal()
+        try:
+            _require_role(db, receptionist_id, models.UserRole.RECEPTIONIST)
+        finally:
+            db.close()
+        return import_members(
+            _stream_lines(request.stream()), fmt, receptionist_id=receptionist_id, batch_size=batch_size
+        )
+
+    return await anyio.to_thread.run_sync(run)
+
+
+# --- command ---
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Import member records from CSV or NDJSON.")
+    parser.add_argument("path", help="file to import, - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], default=None, help="default: from the file extension")
+    parser.add_argument("--receptionist-id", type=int, default=None, help="recorded as the seller of the memberships")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    if args.receptionist_id is not None:
+        db = SessionLocal()
+        try:
+            _require_role(db, args.receptionist_id, models.UserRole.RECEPTIONIST)
+        finally:
+            db.close()
+
+    f = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8-sig")
+    try:
+        report = import_members(f, fmt, receptionist_id=args.receptionist_id, batch_size=args.batch_size)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    print(f"rows {report.rows}, clients {report.imported_clients}, memberships {report.imported_memberships}, "
+          f"rejected {report.rejected}, batches {report.batches}, {report.seconds}s")
+    for r in report.rejects[:50]:
+        print(f"  line {r.line} {r.email or ''}: {'; '.join(r.errors)}")
+    if report.rejected > 50:
+        print(f"  ... {report.rejected - 50} more")
+    return 0 if report.rejected == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in schema_migrations, so a database that is up
+to date costs a single SELECT. Every schema change gets a new entry at the end
+of MIGRATIONS (never edit an applied one).
+
+    python -m backend.migrate            # apply pending migrations
+    python -m backend.migrate status     # list applied / pending versions
+
+Run it once per deploy, before the app workers start: the app itself never
+changes the schema, it only reports pending migrations on /ready.
+On PostgreSQL the run holds an advisory lock, so concurrent runs (several
+containers starting at once) apply each migration exactly once.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from sqlalchemy import Enum, ForeignKeyConstraint, MetaData, Table, inspect, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from . import models, finance_models, overlap, revenue, access, prices  # noqa: F401 (finance tables must be in metadata)
+
+ADVISORY_LOCK_ID = 7_311_001  # arbitrary, constant for this app
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    statements: list[str] = field(default_factory=list)
+    run: Callable[[Connection], None] | None = None
+    dialects: tuple[str, ...] | None = None  # None = every database; else skipped (but recorded) elsewhere
+    transactional: bool = True  # False -> AUTOCOMMIT (e.g. CREATE INDEX CONCURRENTLY)
+
+
+# Version 1 is frozen: the tables of the first schema, without what later migrations add
+BASELINE_TABLES = [
+    "clubs", "addresses", "users", "clients", "employees", "managers", "receptionists",
+    "personal_trainers", "instructors", "classes", "individual_classes", "group_classes",
+    "book_group_classes", "memberships", "messages", "receive_msg",
+    "membership_payments", "book_group_classes_meta",
+]
+LATER_COLUMNS = {("memberships", "club_id")}  # migration 8
+BASELINE_ENUMS = {("book_group_classes_meta", "status"): ("PAID", "TO_PAY")}  # migration 3 adds WAITLISTED
+
+
+def _create_baseline(conn: Connection) -> None:
+    # copies of today's tables, minus later columns, enum values and indexes
+    later_indexes = {name for name, _, _ in HOT_PATH_INDEXES}  # migrations 6 / 7
+    frozen = MetaData()
+    for name in BASELINE_TABLES:
+        table = models.Base.metadata.tables[name]
+        columns = []
+        for c in table.columns:
+            if (name, c.name) in LATER_COLUMNS:
+                continue
+            col = c._copy()
+            if f"ix_{name}_{c.name}" in later_indexes:
+                col.index = None
+            if (name, c.name) in BASELINE_ENUMS:
+                col.type = Enum(*BASELINE_ENUMS[name, c.name], name=c.type.name)
+            columns.append(col)
+        foreign_keys = [
+            ForeignKeyConstraint([fk.parent.name], [fk.target_fullname], ondelete=fk.ondelete, onupdate=fk.onupdate)
+            for fk in table.foreign_keys if (name, fk.parent.name) not in LATER_COLUMNS
+        ]
+        Table(name, frozen, *columns, *foreign_keys)
+    frozen.create_all(bind=conn)
+
+
+def _create_tables(*names: str) -> Callable[[Connection], None]:
+    # only this migration's tables (with their indexes); no-op for tables that already exist
+    def run(conn: Connection) -> None:
+        models.Base.metadata.create_all(bind=conn, tables=[models.Base.metadata.tables[n] for n in names])
+    return run
+
+
+def _add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    # ADD COLUMN IF NOT EXISTS is not portable; databases created from the models already have it
+    def run(conn: Connection) -> None:
+        if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return run
+
+
+def _create_occupancy(conn: Connection) -> None:
+    _create_tables("group_class_occupancy")(conn)
+    conn.execute(text("""
+        INSERT INTO group_class_occupancy (group_classes_id, booked_count)
+        SELECT g.id_c, COUNT(b.client_id)
+          FROM group_classes g
+          LEFT JOIN book_group_classes b ON b.group_classes_id = g.id_c
+         GROUP BY g.id_c
+        ON CONFLICT (group_classes_id) DO NOTHING;
+    """))
+
+
+def _create_revenue_rollups(conn: Connection) -> None:
+    _create_tables("revenue_daily", "revenue_monthly")(conn)
+    revenue.rebuild(conn)
+
+
+def _create_check_in_tables(conn: Connection) -> None:
+    _create_tables("membership_access", "check_ins")(conn)
+    access.rebuild(conn)
+
+
+def _create_price_catalog(conn: Connection) -> None:
+    # the prices that used to be hard-coded in finance_router, as chain-wide rows
+    _create_tables("membership_prices", "price_catalog_version")(conn)
+    if conn.execute(select(finance_models.MembershipPrice.id).limit(1)).first() is None:
+        conn.execute(insert(finance_models.MembershipPrice), [
+            dict(club_id=prices.ALL_CLUBS, membership_type=t, valid_from=prices.DEFAULT_VALID_FROM,
+                 base_price=base, sauna_surcharge=prices.DEFAULT_SAUNA_SURCHARGE)
+            for t, base in prices.DEFAULT_PRICES.items()
+        ])
+    if conn.execute(select(finance_models.PriceCatalogVersion.id)).first() is None:
+        conn.execute(insert(finance_models.PriceCatalogVersion).values(id=1, version=1))
+
+
+# (name, table, columns) of the hot-path lookup indexes
+HOT_PATH_INDEXES = [
+    ("ix_book_group_classes_client_id", "book_group_classes", "client_id"),
+    ("ix_classes_room_start_date", "classes", "room, start_date"),
+    ("ix_classes_start_date_time", "classes", "start_date, start_time, id_c"),
+    ("ix_group_classes_instructor_id", "group_classes", "instructor_id"),
+    ("ix_individual_classes_per_trainer_id", "individual_classes", "per_trainer_id"),
+    ("ix_memberships_client_id", "memberships", "client_id"),
+    ("ix_book_group_classes_meta_membership_id", "book_group_classes_meta", "membership_id"),
+    ("ix_book_group_classes_meta_waitlist", "book_group_classes_meta", "group_classes_id, status, created_at"),
+]
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "initial schema", run=_create_baseline),
+    Migration(
+        2,
+        "classes.start_time / end_time",
+        statements=[
+            "ALTER TABLE classes ADD COLUMN IF NOT EXISTS start_time time NOT NULL DEFAULT '18:00';",
+            "ALTER TABLE classes ADD COLUMN IF NOT EXISTS end_time time NOT NULL DEFAULT '19:00';",
+        ],
+        dialects=("postgresql",),
+    ),
+    Migration(
+        3,
+        "WAITLISTED reservation status",
+        statements=["ALTER TYPE reservationstatus ADD VALUE IF NOT EXISTS 'WAITLISTED';"],
+        dialects=("postgresql",),
+    ),
+    Migration(4, "room / instructor overlap exclusion constraints", statements=overlap.DDL, dialects=("postgresql",)),
+    Migration(5, "group class occupancy counters (+ backfill)", run=_create_occupancy),
+    Migration(
+        6,
+        "hot-path lookup indexes (PostgreSQL: built CONCURRENTLY)",
+        statements=[
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols});"
+            for name, table, cols in HOT_PATH_INDEXES
+        ],
+        dialects=("postgresql",),
+        transactional=False,
+    ),
+    Migration(
+        7,
+        "hot-path lookup indexes (other databases)",
+        statements=[
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols});"
+            for name, table, cols in HOT_PATH_INDEXES
+        ],
+        dialects=("sqlite",),
+    ),
+    Migration(
+        8,
+        "memberships.club_id (club where the membership was sold)",
+        run=_add_column("memberships", "club_id", "integer REFERENCES clubs (id_cl)"),
+    ),
+    Migration(9, "revenue_daily / revenue_monthly rollups (+ backfill)", run=_create_revenue_rollups),
+    Migration(10, "membership_access index + check_ins (+ backfill)", run=_create_check_in_tables),
+    Migration(11, "no_shows / no_show_runs (no-show penalty job)", run=_create_tables("no_shows", "no_show_runs")),
+    Migration(12, "membership_prices + price_catalog_version (initial chain-wide prices)", run=_create_price_catalog),
+]
+
+
+def _ensure_version_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version integer PRIMARY KEY,
+                description varchar(200) NOT NULL,
+                applied_at timestamp NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+        """))
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    _ensure_version_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def pending(engine: Engine) -> list[Migration]:
+    done = applied_versions(engine)
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+def pending_versions_readonly(engine: Engine) -> list[int]:
+    """
+    Pending versions without any DDL (for app processes, which must not touch
+    the schema). A database that was never migrated reports every version.
+    """
+    try:
+        with engine.connect() as conn:
+            done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+    except (OperationalError, ProgrammingError):
+        done = set()
+    return [m.version for m in MIGRATIONS if m.version not in done]
+
+
+def _record(conn: Connection, m: Migration) -> None:
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+        {"v": m.version, "d": m.description},
+    )
+
+
+def _apply(engine: Engine, m: Migration) -> None:
+    dialect = engine.dialect.name
+    skip = m.dialects is not None and dialect not in m.dialects
+
+    if m.transactional or skip:
+        with engine.begin() as conn:
+            if not skip:
+                for stmt in m.statements:
+                    conn.execute(text(stmt))
+                if m.run is not None:
+                    m.run(conn)
+            _record(conn, m)
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for stmt in m.statements:
+            conn.execute(text(stmt))
+        if m.run is not None:
+            m.run(conn)
+        _record(conn, m)
+
+
+def upgrade(engine: Engine, log: Callable[[str], None] = lambda _msg: None) -> list[int]:
+    """Applies pending migrations in version order. Returns the applied versions."""
+    todo = pending(engine)
+    if not todo:
+        return []
+
+    lock_conn = None
+    if engine.dialect.name == "postgresql":
+        lock_conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+    try:
+        applied = []
+        # re-read under the lock: another process may have finished meanwhile
+        for m in pending(engine):
+            t0 = time.perf_counter()
+            _apply(engine, m)
+            applied.append(m.version)
+            log(f"applied {m.version:04d} {m.description} ({time.perf_counter() - t0:.2f}s)")
+        return applied
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+            lock_conn.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations.")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    if args.command == "status":
+        done = applied_versions(engine)
+        for m in MIGRATIONS:
+            print(f"{'applied' if m.version in done else 'pending':<8} {m.version:04d} {m.description}")
+        return 0
+
+    applied = upgrade(engine, log=print)
+    print(f"{len(applied)} migration(s) applied" if applied else "database is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
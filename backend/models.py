@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Enum, Boolean, Double
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Enum, Boolean, Double, Index
 from .database import Base
 from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, Enum as SAEnum
 import enum
@@ -127,6 +127,11 @@ class Classes(Base):
     room=Column(String(20),nullable=False)
     classes_type=Column(SAEnum(ClassesType),nullable=False)
 
+    __table_args__=(
+        Index("ix_classes_room_start_date","room","start_date"), # room conflict checks
+        Index("ix_classes_start_date_time","start_date","start_time","id_c"), # timetable order (keyset)
+    )
+
     __mapper_args__={
         "polymorphic_on":classes_type,
         "polymorphic_identity":ClassesType.INDIVIDUAL
@@ -138,7 +143,7 @@ class IndividualClasses(Classes):
     id_c=Column(Integer,ForeignKey("classes.id_c"),primary_key=True)
     additional_info=Column(String(250))
     client_id=Column(Integer,ForeignKey("clients.id_u"),nullable=False)
-    per_trainer_id=Column(Integer,ForeignKey("personal_trainers.id_u"),nullable=False)
+    per_trainer_id=Column(Integer,ForeignKey("personal_trainers.id_u"),nullable=False,index=True)
 
     __mapper_args__={
         "polymorphic_identity":ClassesType.INDIVIDUAL
@@ -149,7 +154,7 @@ class GroupClasses(Classes):
 
     id_c=Column(Integer,ForeignKey("classes.id_c"),primary_key=True)
     name=Column(String(30),nullable=False)
-    instructor_id=Column(Integer,ForeignKey("instructors.id_u"),nullable=False)
+    instructor_id=Column(Integer,ForeignKey("instructors.id_u"),nullable=False,index=True)
     manager_id=Column(Integer,ForeignKey("managers.id_u"))
     receptionist_id=Column(Integer,ForeignKey("receptionists.id_u"))
 
@@ -160,9 +165,16 @@ class GroupClasses(Classes):
 class BookGroupClasses(Base):
     __tablename__="book_group_classes"
 
-    client_id=Column(Integer,ForeignKey("clients.id_u"),nullable=False,primary_key=True)
+    client_id=Column(Integer,ForeignKey("clients.id_u"),nullable=False,primary_key=True,index=True)
     group_classes_id=Column(Integer,ForeignKey("group_classes.id_c"),nullable=False,primary_key=True)
 
+class GroupClassOccupancy(Base):
+    __tablename__="group_class_occupancy"
+
+    # Number of rows in book_group_classes per class, kept in sync in the same transaction as the booking
+    group_classes_id=Column(Integer,ForeignKey("group_classes.id_c"),primary_key=True)
+    booked_count=Column(Integer,nullable=False,default=0)
+
 # ---------MEMBERSHIPS---------
 class MembershipType(str,enum.Enum):
     ONE_TIME_PASS="ONE_TIME_PASS"
@@ -179,8 +191,9 @@ class Membership(Base):
     price=Column(Integer,nullable=False) # Better option is distinct table with prices for each plan, but for now let's leave it like this
     start_date = Column(Date, nullable=False) # One day for one time pass
     end_date = Column(Date) # So this is not obligatory for it
-    client_id=Column(Integer,ForeignKey("clients.id_u"),nullable=False)
+    client_id=Column(Integer,ForeignKey("clients.id_u"),nullable=False,index=True)
     receptionist_id=Column(Integer,ForeignKey("receptionists.id_u"))
+    club_id=Column(Integer,ForeignKey("clubs.id_cl")) # Club where it was sold (revenue statistics), optional
 
 # ---------MESSAGES---------
 class Message(Base):
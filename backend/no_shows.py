@@ -0,0 +1,200 @@
+"""
+Nightly no-show penalty job.
+
+A client who booked a group class and had no granted check-in on the class day
+loses one day of membership per missed class (see "Attendance Discipline" in
+the README). The membership is the one the reception linked to the booking, or
+else the client's activated membership valid that day (latest ending first).
+
+    python -m backend.no_shows                     # every day not processed yet, up to yesterday
+    python -m backend.no_shows --day 2026-03-14    # one day
+    5 0 * * *  cd /app && python -m backend.no_shows    # cron, once a night
+
+Each day is one transaction of a few set-based statements, whatever the number
+of bookings: the no-shows are inserted into no_shows with INSERT ... SELECT,
+then memberships.end_date (and the check-in index) are shortened with one
+UPDATE each for the no-shows not applied yet, which are then marked applied.
+A row in no_show_runs marks the day as done, so running the job again (or from
+two machines at once) never penalizes a day twice, and a run that died
+half-way left nothing behind and simply continues with the days not done yet.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from sqlalchemy import Date, Integer, cast, exists, func, insert, literal, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .finance_models import (
+    BookGroupClassesMeta,
+    CheckIn,
+    MembershipAccess,
+    MembershipPayment,
+    NoShow,
+    NoShowRun,
+    PaymentStatus,
+)
+
+_bookings = models.BookGroupClasses.__table__
+_classes = models.Classes.__table__
+_memberships = models.Membership.__table__
+_payments = MembershipPayment.__table__
+_meta = BookGroupClassesMeta.__table__
+_check_ins = CheckIn.__table__
+_no_shows = NoShow.__table__
+_runs = NoShowRun.__table__
+_access = MembershipAccess.__table__
+
+
+@dataclass
+class DayReport:
+    day: date
+    no_shows: int = 0
+    memberships_shortened: int = 0
+    seconds: float = 0.0
+    skipped: bool = False  # processed before
+
+
+def _no_shows_select(day: date):
+    b = _bookings
+    linked = (
+        select(_meta.c.membership_id)
+        .where(_meta.c.client_id == b.c.client_id, _meta.c.group_classes_id == b.c.group_classes_id)
+        .scalar_subquery()
+    )
+    valid = (
+        select(_memberships.c.id_m)
+        .join(_payments, _payments.c.membership_id == _memberships.c.id_m)
+        .where(
+            _memberships.c.client_id == b.c.client_id,
+            _payments.c.status == PaymentStatus.ACTIVATED,
+            _memberships.c.start_date <= day,
+            _memberships.c.end_date >= day,
+        )
+        .order_by(_memberships.c.end_date.desc(), _memberships.c.id_m.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    came = exists().where(_check_ins.c.day == day, _check_ins.c.client_id == b.c.client_id, _check_ins.c.granted.is_(True))
+    recorded = exists().where(_no_shows.c.client_id == b.c.client_id, _no_shows.c.group_classes_id == b.c.group_classes_id)
+    return (
+        select(b.c.client_id, b.c.group_classes_id, literal(day, Date), func.coalesce(linked, valid), literal(False))
+        .join(_classes, _classes.c.id_c == b.c.group_classes_id)
+        .where(_classes.c.start_date == day, ~came, ~recorded)
+    )
+
+
+def _shortened_end_date(conn: Connection, penalty):
+    # end_date - penalty days, never before start_date
+    m = _memberships.c
+    if conn.dialect.name == "postgresql":
+        return func.greatest(m.end_date - penalty, m.start_date)
+    return func.max(func.date(m.end_date, func.printf("-%d days", penalty)), m.start_date)
+
+
+def process_day(conn: Connection, day: date) -> DayReport:
+    """Penalizes the no-shows of one day. Call inside a transaction; does nothing if the day was done."""
+    t0 = time.perf_counter()
+    report = DayReport(day)
+    try:
+        with conn.begin_nested():
+            # claims the day; a second run (now or concurrent) stops here
+            conn.execute(insert(_runs).values(day=day, no_shows=0, memberships_shortened=0, seconds=0))
+    except IntegrityError:
+        report.skipped = True
+        return report
+
+    report.no_shows = conn.execute(
+        insert(_no_shows).from_select(
+            ["client_id", "group_classes_id", "day", "membership_id", "applied"], _no_shows_select(day)
+        )
+    ).rowcount
+
+    # only rows not applied yet: the ledger, not no_show_runs, decides what was already penalized
+    todo = (_no_shows.c.day == day, _no_shows.c.applied.is_(False), _no_shows.c.membership_id.is_not(None))
+    penalized = select(_no_shows.c.membership_id).where(*todo)
+    penalty = cast(
+        select(func.count()).where(*todo, _no_shows.c.membership_id == _memberships.c.id_m).scalar_subquery(),
+        Integer,
+    )
+    report.memberships_shortened = conn.execute(
+        update(_memberships)
+        .where(_memberships.c.id_m.in_(penalized), _memberships.c.end_date.is_not(None))
+        .values(end_date=_shortened_end_date(conn, penalty))
+    ).rowcount
+
+    # keep the door check-in index in line
+    conn.execute(
+        update(_access)
+        .where(_access.c.membership_id.in_(penalized))
+        .values(end_date=select(_memberships.c.end_date).where(_memberships.c.id_m == _access.c.membership_id).scalar_subquery())
+    )
+    conn.execute(update(_no_shows).where(*todo).values(applied=True))
+
+    report.seconds = round(time.perf_counter() - t0, 3)
+    conn.execute(
+        update(_runs).where(_runs.c.day == day).values(
+            no_shows=report.no_shows,
+            memberships_shortened=report.memberships_shortened,
+            seconds=report.seconds,
+            finished_at=func.now(),
+        )
+    )
+    return report
+
+
+def pending_days(conn: Connection, until: date) -> list[date]:
+    """
+    Days from the first processed one up to `until` without a no_show_runs row
+    (only `until` on the first run). Gaps left by a manual --day run ahead of
+    the nightly job are filled, not skipped.
+    """
+    first = conn.execute(select(func.min(_runs.c.day))).scalar() or until
+    done = set(conn.execute(select(_runs.c.day).where(_runs.c.day >= first, _runs.c.day <= until)).scalars())
+    days = (first + timedelta(days=i) for i in range((until - first).days + 1))
+    return [d for d in days if d not in done]
+
+
+def run(engine: Engine, days: list[date] | None = None, until: date | None = None) -> list[DayReport]:
+    """Processes the given days (default: every pending day up to yesterday), one transaction each."""
+    if days is None:
+        with engine.connect() as conn:
+            days = pending_days(conn, until or date.today() - timedelta(days=1))
+    reports = []
+    for day in days:
+        with engine.begin() as conn:
+            reports.append(process_day(conn, day))
+    return reports
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Shorten memberships of clients who missed booked classes.")
+    parser.add_argument("--day", type=date.fromisoformat, default=None, help="process this day only (YYYY-MM-DD)")
+    parser.add_argument("--until", type=date.fromisoformat, default=None, help="catch up to this day (default: yesterday)")
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    for d in (args.day, args.until):
+        if d is not None and d >= date.today():
+            parser.error("days must be in the past (check-ins of the day are not complete yet)")
+
+    reports = run(engine, days=[args.day] if args.day else None, until=args.until)
+    if not reports:
+        print("nothing to do")
+    for r in reports:
+        if r.skipped:
+            print(f"{r.day}: already processed")
+        else:
+            print(f"{r.day}: {r.no_shows} no-show(s), {r.memberships_shortened} membership(s) shortened, {r.seconds}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Per-class occupancy counter for group classes.
+
+group_class_occupancy.booked_count mirrors COUNT(*) of book_group_classes for
+the class. Every write to book_group_classes must go through the helpers below
+inside the same session, so the counter commits (or rolls back) together with
+the booking.
+
+Consistency check / rebuild:
+    python -m backend.occupancy check
+    python -m backend.occupancy rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+def _count_bookings(db: Session, group_class_id: int) -> int:
+    return db.query(func.count(models.BookGroupClasses.client_id)).filter(
+        models.BookGroupClasses.group_classes_id == group_class_id
+    ).scalar() or 0
+
+
+def ensure_row(db: Session, group_class_id: int) -> models.GroupClassOccupancy:
+    """Returns the occupancy row, creating it from the bookings table if missing (legacy classes)."""
+    occ = db.get(models.GroupClassOccupancy, group_class_id)
+    if occ is None:
+        try:
+            with db.begin_nested():
+                occ = models.GroupClassOccupancy(
+                    group_classes_id=group_class_id,
+                    booked_count=_count_bookings(db, group_class_id),
+                )
+                db.add(occ)
+        except IntegrityError:
+            # created concurrently by another request
+            occ = db.get(models.GroupClassOccupancy, group_class_id)
+    return occ
+
+
+def get_booked_count(db: Session, group_class_id: int) -> int:
+    """O(1) read of the current number of bookings for a class."""
+    booked = db.query(models.GroupClassOccupancy.booked_count).filter(
+        models.GroupClassOccupancy.group_classes_id == group_class_id
+    ).scalar()
+    if booked is None:
+        return _count_bookings(db, group_class_id)
+    return int(booked)
+
+
+def _stored_counts_stmt(group_class_ids: list[int]):
+    return select(models.GroupClassOccupancy.group_classes_id, models.GroupClassOccupancy.booked_count).where(
+        models.GroupClassOccupancy.group_classes_id.in_(group_class_ids)
+    )
+
+
+def _fallback_counts_stmt(group_class_ids: list[int]):
+    # classes created before the counter existed -> fall back to counting
+    return (
+        select(models.BookGroupClasses.group_classes_id, func.count(models.BookGroupClasses.client_id))
+        .where(models.BookGroupClasses.group_classes_id.in_(group_class_ids))
+        .group_by(models.BookGroupClasses.group_classes_id)
+    )
+
+
+def get_booked_counts(db: Session, group_class_ids: list[int]) -> dict[int, int]:
+    """Booking counts for a page of classes (primary-key lookups only)."""
+    if not group_class_ids:
+        return {}
+
+    counts = dict(db.execute(_stored_counts_stmt(group_class_ids)).all())
+    missing = [i for i in group_class_ids if i not in counts]
+    if missing:
+        counts.update(db.execute(_fallback_counts_stmt(missing)).all())
+
+    return {i: int(counts.get(i, 0) or 0) for i in group_class_ids}
+
+
+async def get_booked_counts_async(db: AsyncSession, group_class_ids: list[int]) -> dict[int, int]:
+    """Same as get_booked_counts, for the async read endpoints."""
+    if not group_class_ids:
+        return {}
+
+    counts = dict((await db.execute(_stored_counts_stmt(group_class_ids))).all())
+    missing = [i for i in group_class_ids if i not in counts]
+    if missing:
+        counts.update((await db.execute(_fallback_counts_stmt(missing))).all())
+
+    return {i: int(counts.get(i, 0) or 0) for i in group_class_ids}
+
+
+def increment(db: Session, group_class_id: int, by: int = 1) -> None:
+    """Call right after adding BookGroupClasses row(s) for the class (before flush is fine)."""
+    db.flush()
+    updated = (
+        db.query(models.GroupClassOccupancy)
+        .filter(models.GroupClassOccupancy.group_classes_id == group_class_id)
+        .update(
+            {models.GroupClassOccupancy.booked_count: models.GroupClassOccupancy.booked_count + by},
+            synchronize_session=False,
+        )
+    )
+    if updated == 0:
+        # no row yet -> ensure_row counts the bookings, already including the new one(s)
+        ensure_row(db, group_class_id)
+
+
+def decrement(db: Session, group_class_id: int, by: int = 1) -> None:
+    """Call together with deleting BookGroupClasses row(s) for the class."""
+    db.query(models.GroupClassOccupancy).filter(
+        models.GroupClassOccupancy.group_classes_id == group_class_id
+    ).update(
+        {models.GroupClassOccupancy.booked_count: models.GroupClassOccupancy.booked_count - by},
+        synchronize_session=False,
+    )
+
+
+def decrement_for_client(db: Session, client_id: int) -> None:
+    """Releases one seat in every class the client is booked for (call BEFORE deleting the bookings)."""
+    booked_class_ids = select(models.BookGroupClasses.group_classes_id).where(
+        models.BookGroupClasses.client_id == client_id
+    )
+    db.query(models.GroupClassOccupancy).filter(
+        models.GroupClassOccupancy.group_classes_id.in_(booked_class_ids)
+    ).update(
+        {models.GroupClassOccupancy.booked_count: models.GroupClassOccupancy.booked_count - 1},
+        synchronize_session=False,
+    )
+
+
+def find_mismatches(db: Session) -> list[tuple[int, int, int]]:
+    """Returns (group_class_id, stored_count, actual_count) for every class whose counter is wrong."""
+    actual = dict(
+        db.query(
+            models.BookGroupClasses.group_classes_id,
+            func.count(models.BookGroupClasses.client_id),
+        )
+        .group_by(models.BookGroupClasses.group_classes_id)
+        .all()
+    )
+    stored = dict(
+        db.query(models.GroupClassOccupancy.group_classes_id, models.GroupClassOccupancy.booked_count).all()
+    )
+    class_ids = [row[0] for row in db.query(models.GroupClasses.id_c).all()]
+
+    out = []
+    for class_id in class_ids:
+        a = int(actual.get(class_id, 0))
+        s = stored.get(class_id)
+        if s is None or int(s) != a:
+            out.append((class_id, s if s is None else int(s), a))
+    return out
+
+
+def rebuild(db: Session) -> int:
+    """Recomputes every counter from book_group_classes. Returns the number of fixed rows."""
+    fixed = 0
+    for class_id, stored, actual in find_mismatches(db):
+        if stored is None:
+            db.add(models.GroupClassOccupancy(group_classes_id=class_id, booked_count=actual))
+        else:
+            db.query(models.GroupClassOccupancy).filter(
+                models.GroupClassOccupancy.group_classes_id == class_id
+            ).update({models.GroupClassOccupancy.booked_count: actual}, synchronize_session=False)
+        fixed += 1
+    db.commit()
+    return fixed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check or rebuild group class occupancy counters.")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "check":
+            mismatches = find_mismatches(db)
+            for class_id, stored, actual in mismatches:
+                print(f"class {class_id}: stored={stored} actual={actual}")
+            print(f"{len(mismatches)} mismatched class(es)")
+            return 1 if mismatches else 0
+
+        fixed = rebuild(db)
+        print(f"rebuilt {fixed} class(es)")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
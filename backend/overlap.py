@@ -0,0 +1,126 @@
+"""
+Database-enforced overlap rules for the timetable (PostgreSQL).
+
+classes gets two generated range columns:
+    date_span  daterange  [start_date, end_date]
+    time_span  timerange  [start_time, end_time)   (empty when end_time <= start_time)
+and a copy of the group class instructor (group_instructor_id, kept in sync by a
+trigger on group_classes), so both rules can be GiST exclusion constraints on one table:
+
+    classes_room_no_overlap        same room, overlapping dates and times
+    classes_instructor_no_overlap  same instructor, overlapping dates and times
+
+Personal trainers are not covered: they may run up to 5 overlapping individual
+classes (individual_classes.is_trainer_limit_reached), which is a count rule.
+
+The application keeps its pre-checks for readable errors; the constraints make
+the rules hold under concurrent inserts. overlap_error_detail() maps a
+violation back to the API's existing 400 messages. If existing classes already
+overlap, the migration that adds the constraints fails (and stays pending) until
+they are moved or deleted.
+"""
+from __future__ import annotations
+
+from sqlalchemy.exc import IntegrityError
+
+ROOM_CONSTRAINT = "classes_room_no_overlap"
+INSTRUCTOR_CONSTRAINT = "classes_instructor_no_overlap"
+
+ROOM_CONFLICT_DETAIL = "Room is occupied during this time."
+INSTRUCTOR_CONFLICT_DETAIL = "Instructor is already assigned to another group class at this time."
+
+
+def _add_constraint(name: str, definition: str) -> str:
+    return f"""
+    DO $$
+    DECLARE
+        conflict text;
+    BEGIN
+        ALTER TABLE classes ADD CONSTRAINT {name} {definition};
+    EXCEPTION
+        WHEN duplicate_object OR duplicate_table THEN NULL;
+        WHEN exclusion_violation THEN
+            GET STACKED DIAGNOSTICS conflict = PG_EXCEPTION_DETAIL;
+            RAISE EXCEPTION '{name} not created: existing classes overlap'
+                USING ERRCODE = 'exclusion_violation',
+                      DETAIL = conflict,
+                      HINT = 'Move or delete the overlapping classes, then run python -m backend.migrate again.';
+    END $$;
+    """
+
+
+# Idempotent, executed in order
+DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist;",
+    """
+    DO $$ BEGIN
+        CREATE TYPE timerange AS RANGE (subtype = time);
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$;
+    """,
+    """
+    ALTER TABLE classes
+    ADD COLUMN IF NOT EXISTS date_span daterange
+        GENERATED ALWAYS AS (daterange(start_date, end_date, '[]')) STORED;
+    """,
+    """
+    ALTER TABLE classes
+    ADD COLUMN IF NOT EXISTS time_span timerange
+        GENERATED ALWAYS AS (
+            CASE WHEN start_time < end_time
+                 THEN timerange(start_time, end_time, '[)')
+                 ELSE timerange(start_time, start_time, '[)')
+            END
+        ) STORED;
+    """,
+    """
+    ALTER TABLE classes
+    ADD COLUMN IF NOT EXISTS group_instructor_id integer;
+    """,
+    """
+    UPDATE classes c
+       SET group_instructor_id = g.instructor_id
+      FROM group_classes g
+     WHERE g.id_c = c.id_c
+       AND c.group_instructor_id IS DISTINCT FROM g.instructor_id;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_group_instructor() RETURNS trigger AS $$
+    BEGIN
+        UPDATE classes SET group_instructor_id = NEW.instructor_id WHERE id_c = NEW.id_c;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    DROP TRIGGER IF EXISTS group_classes_sync_instructor ON group_classes;
+    CREATE TRIGGER group_classes_sync_instructor
+        AFTER INSERT OR UPDATE OF instructor_id ON group_classes
+        FOR EACH ROW EXECUTE FUNCTION sync_group_instructor();
+    """,
+    # Existing overlapping rows make ADD CONSTRAINT fail: the migration aborts (and stays pending)
+    # with the conflicting rows in DETAIL, instead of being recorded without the constraint
+    _add_constraint(
+        ROOM_CONSTRAINT,
+        "EXCLUDE USING gist (room WITH =, date_span WITH &&, time_span WITH &&)",
+    ),
+    _add_constraint(
+        INSTRUCTOR_CONSTRAINT,
+        "EXCLUDE USING gist (group_instructor_id WITH =, date_span WITH &&, time_span WITH &&)"
+        " WHERE (group_instructor_id IS NOT NULL)",
+    ),
+]
+
+
+def overlap_error_detail(exc: IntegrityError) -> str | None:
+    """Returns the API error message for an exclusion-constraint violation, None for other errors."""
+    orig = getattr(exc, "orig", None)
+    # psycopg2: pgcode, psycopg 3: sqlstate
+    if (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) != "23P01":
+        return None
+
+    diag = getattr(orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None) or str(orig)
+    if INSTRUCTOR_CONSTRAINT in constraint:
+        return INSTRUCTOR_CONFLICT_DETAIL
+    return ROOM_CONFLICT_DETAIL
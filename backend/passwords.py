@@ -0,0 +1,301 @@
+"""
+Password hashing on a dedicated, size-bounded process pool.
+
+Passwords are stored as scrypt hashes (memory-hard, stdlib hashlib):
+
+    scrypt$<n>$<r>$<p>$<salt, base64>$<hash, base64>
+
+A hash costs tens of milliseconds of CPU on purpose, so it never runs on the
+event loop nor in the threadpool shared by every other route: all hashing goes
+to `pool`, PASSWORD_HASH_WORKERS processes of its own. At most
+PASSWORD_HASH_MAX_PENDING hashes may be running or queued; past that the
+request fails fast with HashingBusy (503 + Retry-After, see main.py) instead of
+piling up behind a login burst.
+
+Cost: PASSWORD_SCRYPT_N / _R / _P. Hashes made with other parameters, and
+legacy passwords (plaintext, unsalted sha256 from before), still verify; on a
+successful check verify_password() also returns the hash with the current
+parameters (computed in the same worker call), which the caller stores.
+The member import relies on that: it hashes with PASSWORD_IMPORT_SCRYPT_N, so
+loading thousands of members takes minutes, not hours, and each imported hash
+gets the full cost on the member's first login.
+
+    python -m backend.passwords bench       # time of one hash with the current cost
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# ~16 hashes queued per worker: about a second of waiting at the default cost
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(16 * PASSWORD_HASH_WORKERS)))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+# bulk import: a cheaper n (upgraded to PASSWORD_SCRYPT_N on the member's first login)
+PASSWORD_IMPORT_SCRYPT_N = int(os.getenv("PASSWORD_IMPORT_SCRYPT_N", str(2 ** 10)))
+IMPORT_HASH_CHUNK = 64
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+_SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+
+class HashingBusy(RuntimeError):
+    """Too many hashes running or queued; retry later."""
+
+
+@dataclass(frozen=True)
+class Verification:
+    ok: bool
+    new_hash: str | None = None  # set when the stored value should be replaced (legacy / old cost)
+
+
+# --- hashing (runs in the pool's processes) ---
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES,
+        maxmem=2 * 128 * r * (n + p),  # the working set is ~128 * r * n bytes
+    )
+
+
+def make_hash(password: str, n: int = PASSWORD_SCRYPT_N, r: int = PASSWORD_SCRYPT_R, p: int = PASSWORD_SCRYPT_P) -> str:
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    b64 = lambda b: base64.b64encode(b).decode("ascii")  # noqa: E731
+    return f"{SCHEME}${n}${r}${p}${b64(salt)}${b64(digest)}"
+
+
+def make_hashes(passwords: list[str], n: int = PASSWORD_SCRYPT_N) -> list[str]:
+    return [make_hash(pw, n) for pw in passwords]
+
+
+def _parse(stored: str) -> tuple[int, int, int, bytes, bytes] | None:
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3]), base64.b64decode(parts[4]), base64.b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def needs_rehash(stored: str, n: int = PASSWORD_SCRYPT_N, r: int = PASSWORD_SCRYPT_R, p: int = PASSWORD_SCRYPT_P) -> bool:
+    parsed = _parse(stored)
+    return parsed is None or parsed[:3] != (n, r, p)
+
+
+def check(
+    password: str, stored: str, n: int = PASSWORD_SCRYPT_N, r: int = PASSWORD_SCRYPT_R, p: int = PASSWORD_SCRYPT_P
+) -> Verification:
+    """Checks the password against any stored format; rehashes with (n, r, p) when the format is outdated."""
+    parsed = _parse(stored)
+    if parsed is not None:
+        ok = hmac.compare_digest(_scrypt(password, parsed[3], *parsed[:3]), parsed[4])
+    elif _SHA256_HEX.match(stored):
+        # legacy: sha256 hex (reception sale, member import); never compared as plaintext,
+        # or the leaked digest itself would log in
+        ok = hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), stored)
+    else:
+        ok = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))  # legacy: plaintext
+    if ok and needs_rehash(stored, n, r, p):
+        return Verification(True, make_hash(password, n, r, p))
+    return Verification(ok)
+
+
+def _noop() -> None:
+    return None
+
+
+# --- the pool ---
+
+class HashPool:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._executor: ProcessPoolExecutor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: a fork would copy a process with running threads and open database connections
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _drop_broken(self, broken: ProcessPoolExecutor) -> None:
+        """
+        A worker died (e.g. killed for memory) and the executor stays broken for good:
+        forget it, the next submit starts a new one. Its futures fail with
+        BrokenProcessPool and give their slots back in _done(). Call with the lock held.
+        """
+        if self._executor is broken:
+            self._executor = None
+            self.restarts += 1
+
+    def start(self) -> None:
+        """Starts the worker processes now instead of on the first hash (one retry on a broken pool)."""
+        for attempt in (1, 2):
+            with self._lock:
+                executor = self._get_executor()
+            try:
+                for f in [executor.submit(_noop) for _ in range(self.workers)]:
+                    f.result()
+                return
+            except BrokenProcessPool:
+                with self._lock:
+                    self._drop_broken(executor)
+                if attempt == 2:
+                    raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, executor: ProcessPoolExecutor, future: Future) -> None:
+        broken = not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            if broken:
+                self._drop_broken(executor)
+            self._slot_freed.notify()
+
+    def submit(self, fn: Callable, *args, wait: bool = False, limit: int | None = None) -> Future:
+        """
+        Queues fn(*args) on the pool. When `limit` (default max_pending) hashes are
+        already pending, raises HashingBusy, or with wait=True blocks until one finishes.
+        """
+        limit = min(limit or self.max_pending, self.max_pending)
+        with self._lock:
+            while self.pending >= limit:
+                if not wait:
+                    self.rejected += 1
+                    raise HashingBusy("Too many password hashes in progress, retry shortly.")
+                self._slot_freed.wait()
+            self.pending += 1
+            try:
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(fn, *args)
+                except BrokenProcessPool:
+                    self._drop_broken(executor)
+                    executor = self._get_executor()
+                    future = executor.submit(fn, *args)
+            except BaseException:
+                self.pending -= 1
+                raise
+        future.add_done_callback(lambda f: self._done(executor, f))
+        return future
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "started": self._executor is not None,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "cost": {"n": PASSWORD_SCRYPT_N, "r": PASSWORD_SCRYPT_R, "p": PASSWORD_SCRYPT_P},
+            }
+
+
+pool = HashPool()
+
+
+# --- API for the routes ---
+
+def _lost_worker() -> HashingBusy:
+    # the hash was running when a worker died; the pool restarts on the next submit
+    return HashingBusy("Password hashing worker restarted, retry shortly.")
+
+
+async def _run(fn: Callable, *args):
+    try:
+        return await asyncio.wrap_future(pool.submit(fn, *args))
+    except BrokenProcessPool:
+        raise _lost_worker()
+
+
+def _run_sync(fn: Callable, *args):
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        raise _lost_worker()
+
+
+async def hash_password(password: str) -> str:
+    return await _run(make_hash, password)
+
+
+async def verify_password(password: str, stored: str) -> Verification:
+    return await _run(check, password, stored)
+
+
+def hash_password_sync(password: str) -> str:
+    """For sync routes: the calling thread waits, the CPU work runs in the pool."""
+    return _run_sync(make_hash, password)
+
+
+def verify_password_sync(password: str, stored: str) -> Verification:
+    return _run_sync(check, password, stored)
+
+
+def hash_many(passwords: Iterable[str]) -> list[str]:
+    """
+    Hashes a batch (member import) with the import cost, IMPORT_HASH_CHUNK per
+    pool task. Waits for free slots instead of failing and keeps at most
+    `workers` tasks pending, so requests still find room in the queue.
+    """
+    passwords = list(passwords)
+    futures = [
+        pool.submit(make_hashes, passwords[i:i + IMPORT_HASH_CHUNK], PASSWORD_IMPORT_SCRYPT_N, wait=True, limit=pool.workers)
+        for i in range(0, len(passwords), IMPORT_HASH_CHUNK)
+    ]
+    return [h for f in futures for h in f.result()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Password hashing cost.")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    for _ in range(args.rounds):
+        make_hash("benchmark-password")
+    ms = (time.perf_counter() - t0) * 1000 / args.rounds
+    print(f"scrypt n={PASSWORD_SCRYPT_N} r={PASSWORD_SCRYPT_R} p={PASSWORD_SCRYPT_P}: {ms:.1f} ms per hash, "
+          f"~{PASSWORD_HASH_WORKERS * 1000 / ms:.0f} hashes/s with {PASSWORD_HASH_WORKERS} worker(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Membership price catalog: per club, effective-dated, cached in process.
+
+membership_prices holds a base price and a sauna surcharge per (club,
+membership type, valid_from); club_id 0 is the chain-wide price used by clubs
+without their own. The price on a day is the row with the latest valid_from on
+or before that day.
+
+Every worker keeps the whole table in memory (PriceCatalog) together with the
+catalog version it was loaded at. Price changes bump price_catalog_version in
+the same transaction; the worker's watch() task compares versions every
+PRICE_CATALOG_POLL_SECONDS and reloads when it changed, so a purchase prices
+the membership without touching the database, and a price change reaches
+every worker within one poll interval, without a redeploy. Processes without
+the watcher (commands, benchmarks) check the version themselves when their
+copy is older than PRICE_CATALOG_MAX_AGE_SECONDS.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from . import models, response_cache
+from .finance_models import MembershipPrice, PriceCatalogVersion
+
+ALL_CLUBS = 0
+
+PRICE_CATALOG_POLL_SECONDS = float(os.getenv("PRICE_CATALOG_POLL_SECONDS", "5"))
+PRICE_CATALOG_MAX_AGE_SECONDS = float(os.getenv("PRICE_CATALOG_MAX_AGE_SECONDS", "30"))
+
+# initial chain-wide prices (migration 12); afterwards prices only change in the table
+DEFAULT_PRICES = {
+    models.MembershipType.ONE_TIME_PASS: 30,
+    models.MembershipType.MONTHLY: 150,
+    models.MembershipType.QUARTERLY: 400,
+    models.MembershipType.ANNUAL: 1200,
+}
+DEFAULT_SAUNA_SURCHARGE = 50
+DEFAULT_VALID_FROM = date(2000, 1, 1)
+
+logger = logging.getLogger("gym.prices")
+
+
+class PriceNotFound(LookupError):
+    pass
+
+
+@dataclass(frozen=True)
+class Price:
+    club_id: int
+    membership_type: models.MembershipType
+    valid_from: date
+    base_price: int
+    sauna_surcharge: int
+
+    def amount(self, with_sauna: bool) -> int:
+        return self.base_price + (self.sauna_surcharge if with_sauna else 0)
+
+
+class PriceCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version: int | None = None  # None = not loaded yet
+        self.checked_at = 0.0
+        # (club_id, type) -> (valid_from dates ascending, prices in the same order)
+        self._prices: dict[tuple[int, models.MembershipType], tuple[list[date], list[Price]]] = {}
+
+    def _read_version(self, conn) -> int:
+        return conn.execute(select(PriceCatalogVersion.version).where(PriceCatalogVersion.id == 1)).scalar() or 0
+
+    def _load(self, conn, version: int) -> None:
+        rows = conn.execute(
+            select(MembershipPrice).order_by(MembershipPrice.club_id, MembershipPrice.membership_type, MembershipPrice.valid_from)
+        ).scalars().all()
+        prices: dict[tuple[int, models.MembershipType], tuple[list[date], list[Price]]] = {}
+        for r in rows:
+            days, items = prices.setdefault((r.club_id, r.membership_type), ([], []))
+            days.append(r.valid_from)
+            items.append(Price(r.club_id, r.membership_type, r.valid_from, r.base_price, r.sauna_surcharge))
+        self._prices = prices  # swapped in one assignment: readers never see half a catalog
+        self.version = version
+
+    def refresh(self) -> bool:
+        """Reloads when the stored version differs from the loaded one. Returns True when it reloaded."""
+        from .database import SessionLocal
+
+        with self._lock:
+            db = SessionLocal()
+            try:
+                version = self._read_version(db)
+                changed = version != self.version
+                if changed:
+                    self._load(db, version)
+                self.checked_at = time.monotonic()
+            finally:
+                db.close()
+        if changed:
+            response_cache.invalidate(response_cache.CATALOG)
+        return changed
+
+    def invalidate(self) -> None:
+        """Forces a version check on the next lookup (after a price change made by this process)."""
+        self.checked_at = 0.0
+
+    def _ensure_current(self) -> None:
+        if self.version is None or time.monotonic() - self.checked_at > PRICE_CATALOG_MAX_AGE_SECONDS:
+            self.refresh()
+
+    def price(self, mtype: models.MembershipType, club_id: int | None = None, on: date | None = None) -> Price:
+        """Price of a membership type in a club on a day (default: today), club price first, then chain-wide."""
+        self._ensure_current()
+        on = on or date.today()
+        for club in ((club_id, ALL_CLUBS) if club_id else (ALL_CLUBS,)):
+            entry = self._prices.get((club, mtype))
+            if entry is None:
+                continue
+            i = bisect_right(entry[0], on)
+            if i:
+                return entry[1][i - 1]
+        raise PriceNotFound(f"No price for {mtype.value} on {on}")
+
+
+catalog = PriceCatalog()
+
+
+def set_price(
+    db: Session,
+    *,
+    club_id: int,
+    membership_type: models.MembershipType,
+    valid_from: date,
+    base_price: int,
+    sauna_surcharge: int,
+) -> None:
+    """Adds or replaces the price row and bumps the catalog version (commit is up to the caller)."""
+    updated = db.execute(
+        update(MembershipPrice)
+        .where(
+            MembershipPrice.club_id == club_id,
+            MembershipPrice.membership_type == membership_type,
+            MembershipPrice.valid_from == valid_from,
+        )
+        .values(base_price=base_price, sauna_surcharge=sauna_surcharge)
+    ).rowcount
+    if not updated:
+        db.add(MembershipPrice(
+            club_id=club_id,
+            membership_type=membership_type,
+            valid_from=valid_from,
+            base_price=base_price,
+            sauna_surcharge=sauna_surcharge,
+        ))
+    db.execute(update(PriceCatalogVersion).where(PriceCatalogVersion.id == 1).values(version=PriceCatalogVersion.version + 1))
+
+
+async def watch() -> None:
+    """Background task of a worker: reloads the catalog when another process changed prices."""
+    while True:
+        try:
+            await asyncio.to_thread(catalog.refresh)
+        except Exception:  # database down: keep serving the loaded prices, try again later
+            logger.warning("price catalog refresh failed", exc_info=True)
+        await asyncio.sleep(PRICE_CATALOG_POLL_SECONDS)
@@ -0,0 +1,158 @@
+"""
+Seat reservation for group classes, shared by /schedule/book and
+/reception/group-classes/{id}/reserve.
+
+A seat is taken with one conditional UPDATE on the occupancy row:
+
+    UPDATE group_class_occupancy
+       SET booked_count = booked_count + 1
+     WHERE group_classes_id = :id AND booked_count < :capacity
+
+The UPDATE row-locks the class, so concurrent bookers of the same class queue
+on that lock (no retries) and the WHERE re-check makes overbooking impossible.
+A duplicate booking is caught by the (client_id, group_classes_id) primary key.
+"""
+from __future__ import annotations
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, occupancy, waitlist
+
+
+class ReservationError(Exception):
+    pass
+
+
+class ClassFullError(ReservationError):
+    pass
+
+
+class AlreadyBookedError(ReservationError):
+    pass
+
+
+def _take_seat(db: Session, group_class_id: int, max_capacity: int) -> bool:
+    updated = (
+        db.query(models.GroupClassOccupancy)
+        .filter(
+            models.GroupClassOccupancy.group_classes_id == group_class_id,
+            models.GroupClassOccupancy.booked_count < max_capacity,
+        )
+        .update(
+            {models.GroupClassOccupancy.booked_count: models.GroupClassOccupancy.booked_count + 1},
+            synchronize_session=False,
+        )
+    )
+    return updated == 1
+
+
+def reserve_seat(
+    db: Session,
+    *,
+    client_id: int,
+    group_class_id: int,
+    max_capacity: int,
+) -> models.BookGroupClasses:
+    """
+    Takes a seat and inserts the booking row in the current transaction (caller commits).
+    Raises ClassFullError / AlreadyBookedError; only this reservation's savepoint is
+    rolled back then, whatever the caller did before in the transaction stays.
+    """
+    # cheap PK lookup first, so a repeated click does not queue on the class lock
+    existing = db.get(models.BookGroupClasses, (client_id, group_class_id))
+    if existing is not None:
+        raise AlreadyBookedError()
+
+    booking = models.BookGroupClasses(client_id=client_id, group_classes_id=group_class_id)
+    try:
+        with db.begin_nested():
+            if not _take_seat(db, group_class_id, max_capacity):
+                # classes created before the occupancy table -> create the counter and try once more
+                if db.get(models.GroupClassOccupancy, group_class_id) is not None:
+                    raise ClassFullError()
+                occupancy.ensure_row(db, group_class_id)
+                if not _take_seat(db, group_class_id, max_capacity):
+                    raise ClassFullError()
+
+            db.add(booking)
+            db.flush()
+    except IntegrityError:
+        # the same client booked concurrently -> the savepoint gave the seat back
+        raise AlreadyBookedError()
+
+    waitlist.clear_entries(db, [(client_id, group_class_id)])
+    return booking
+
+
+def reserve_seats_bulk(
+    db: Session,
+    pairs: list[tuple[int, int]],
+    *,
+    max_capacity: int,
+) -> list[ReservationError | None]:
+    """
+    Books many (client_id, group_class_id) pairs in the current transaction (caller commits).
+    Occupancy rows of all touched classes are locked once (SELECT ... FOR UPDATE, in id order
+    to avoid deadlocks); seats are granted in input order until a class is full.
+    Returns one entry per pair: None if booked, otherwise the error.
+    """
+    if not pairs:
+        return []
+
+    client_ids = {c for c, _ in pairs}
+    class_ids = sorted({g for _, g in pairs})
+
+    # legacy classes without a counter row
+    have_row = {
+        r[0]
+        for r in db.query(models.GroupClassOccupancy.group_classes_id)
+        .filter(models.GroupClassOccupancy.group_classes_id.in_(class_ids))
+        .all()
+    }
+    for class_id in class_ids:
+        if class_id not in have_row:
+            occupancy.ensure_row(db, class_id)
+
+    booked = dict(
+        db.query(models.GroupClassOccupancy.group_classes_id, models.GroupClassOccupancy.booked_count)
+        .filter(models.GroupClassOccupancy.group_classes_id.in_(class_ids))
+        .order_by(models.GroupClassOccupancy.group_classes_id)
+        .with_for_update()
+        .all()
+    )
+
+    # read after taking the locks, so bookings committed meanwhile are visible
+    existing = set(
+        db.query(models.BookGroupClasses.client_id, models.BookGroupClasses.group_classes_id)
+        .filter(
+            models.BookGroupClasses.client_id.in_(client_ids),
+            models.BookGroupClasses.group_classes_id.in_(class_ids),
+        )
+        .all()
+    )
+
+    taken: dict[int, int] = {}
+    rows = []
+    out: list[ReservationError | None] = []
+    for pair in pairs:
+        client_id, class_id = pair
+        if pair in existing:
+            out.append(AlreadyBookedError())
+            continue
+        if booked.get(class_id, 0) + taken.get(class_id, 0) >= max_capacity:
+            out.append(ClassFullError())
+            continue
+        taken[class_id] = taken.get(class_id, 0) + 1
+        existing.add(pair)
+        rows.append({"client_id": client_id, "group_classes_id": class_id})
+        out.append(None)
+
+    if rows:
+        db.execute(insert(models.BookGroupClasses), rows)
+        waitlist.clear_entries(db, [(r["client_id"], r["group_classes_id"]) for r in rows])
+        for class_id, n in taken.items():
+            occupancy.increment(db, class_id, by=n)
+
+    return out
@@ -0,0 +1,164 @@
+"""
+In-process response cache for hot public read endpoints (timetable, membership catalog).
+
+Entries are stored per namespace as rendered JSON bytes plus a content ETag.
+Every namespace has a version counter; write routes call invalidate(namespace)
+after commit, which makes all older entries of that namespace stale at once.
+Entries also expire after RESPONSE_CACHE_TTL seconds, which bounds staleness
+for writes made by other worker processes.
+
+Clients that send If-None-Match with the current ETag get 304 straight from the
+cache, without touching the database.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+
+from . import fast_json
+
+TIMETABLE = "timetable"
+CATALOG = "catalog"
+
+CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    etag: str
+    version: int
+    expires_at: float
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def get(self, namespace: str, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry.version != self.version(namespace) or entry.expires_at <= time.monotonic():
+                del self._entries[(namespace, key)]
+                return None
+            self._entries.move_to_end((namespace, key))
+            return entry
+
+    def put(self, namespace: str, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            if entry.version != self.version(namespace):
+                # invalidated while the response was being built
+                return
+            self._entries[(namespace, key)] = entry
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *namespaces: str) -> None:
+        with self._lock:
+            for ns in namespaces:
+                self._versions[ns] = self.version(ns) + 1
+            stale = [k for k in self._entries if k[0] in namespaces]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+cache = ResponseCache()
+
+
+def invalidate(*namespaces: str) -> None:
+    cache.invalidate(*namespaces)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [t.strip() for t in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _to_response(request: Request, entry: CacheEntry) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _render(namespace: str, key: str, version: int, payload: Any, headers: dict[str, str]) -> CacheEntry:
+    body = fast_json.dumps(payload)
+    entry = CacheEntry(
+        body=body,
+        etag='"' + hashlib.sha1(body).hexdigest() + '"',
+        version=version,
+        expires_at=time.monotonic() + cache.ttl_seconds,
+        headers=headers,
+    )
+    cache.put(namespace, key, entry)
+    return entry
+
+
+def _cache_key(request: Request) -> str:
+    return str(sorted(request.query_params.multi_items()))
+
+
+def cached_json(
+    request: Request,
+    namespace: str,
+    build: Callable[[], tuple[Any, dict[str, str]]],
+    fresh: bool = False,
+) -> Response:
+    """
+    Serves the request from the cache, or calls build() -> (payload, extra_headers),
+    renders it once and stores it. The cache key is the query string.
+    fresh=True skips the lookup and replaces the entry (reads pinned to the primary).
+    """
+    key = _cache_key(request)
+
+    entry = None if fresh else cache.get(namespace, key)
+    if entry is None:
+        version = cache.version(namespace)
+        payload, headers = build()
+        entry = _render(namespace, key, version, payload, headers)
+
+    return _to_response(request, entry)
+
+
+async def cached_json_async(
+    request: Request,
+    namespace: str,
+    build: Callable[[], Awaitable[tuple[Any, dict[str, str]]]],
+    fresh: bool = False,
+) -> Response:
+    """cached_json for async endpoints: build is awaited only on a cache miss."""
+    key = _cache_key(request)
+
+    entry = None if fresh else cache.get(namespace, key)
+    if entry is None:
+        version = cache.version(namespace)
+        payload, headers = await build()
+        entry = _render(namespace, key, version, payload, headers)
+
+    return _to_response(request, entry)
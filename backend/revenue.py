@@ -0,0 +1,308 @@
+"""
+Daily / monthly revenue rollups for the manager dashboard.
+
+revenue_daily and revenue_monthly hold the number of memberships sold and their
+revenue per sale date (month) and per membership type, sauna variant, payment
+method, channel and club. Every write that creates or deletes memberships calls
+record() / remove_client_sales() in the same transaction, so the rollups commit
+(or roll back) together with the sale. Dashboard queries then read a few hundred
+rollup rows at most instead of scanning memberships.
+
+Sale date = date of the payment (membership_payments.created_at), as the
+database computes it (_sale_day), both when recording a sale and when
+rebuilding or removing it, so the two always land on the same day.
+Channel = RECEPTION when a receptionist sold the membership, CLIENT otherwise.
+
+Backfill / consistency check:
+    python -m backend.revenue check
+    python -m backend.revenue backfill                     # rebuild everything
+    python -m backend.revenue backfill --since 2026-01-01  # only from this day on
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import Date, case, cast, delete, func, insert, literal, select, text, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .finance_models import (
+    REVENUE_DIMENSIONS,
+    MembershipPayment,
+    PaymentMethod,
+    PaymentStatus,
+    RevenueDaily,
+    RevenueMonthly,
+    SalesChannel,
+)
+
+MEASURES = ("memberships_sold", "revenue", "revenue_to_pay")
+
+_daily = RevenueDaily.__table__
+_monthly = RevenueMonthly.__table__
+
+
+@dataclass(frozen=True)
+class Sale:
+    day: date
+    membership_type: models.MembershipType
+    with_sauna: bool
+    payment_method: PaymentMethod
+    channel: SalesChannel
+    club_id: int
+    price: int
+    to_pay: bool
+
+
+def channel_for(receptionist_id: int | None) -> SalesChannel:
+    return SalesChannel.CLIENT if receptionist_id is None else SalesChannel.RECEPTION
+
+
+def _sale_day():
+    return func.date(MembershipPayment.created_at, type_=Date)
+
+
+def sale_days(bind: Session | Connection, membership_ids: Iterable[int]) -> dict[int, date]:
+    """Sale date of each membership's payment, computed like the rebuild does (payments must be written)."""
+    p = MembershipPayment
+    return dict(bind.execute(select(p.membership_id, _sale_day()).where(p.membership_id.in_(list(membership_ids)))).all())
+
+
+def sale_of(db: Session, membership: models.Membership, payment: MembershipPayment) -> Sale:
+    db.flush()  # created_at comes from the database
+    return Sale(
+        day=sale_days(db, [payment.membership_id])[payment.membership_id],
+        membership_type=models.MembershipType(membership.type),
+        with_sauna=bool(membership.with_sauna),
+        payment_method=PaymentMethod(payment.payment_method),
+        channel=channel_for(membership.receptionist_id),
+        club_id=membership.club_id or 0,
+        price=int(membership.price),
+        to_pay=payment.status == PaymentStatus.TO_PAY,
+    )
+
+
+# --- incremental updates ---
+
+def _bump(bind: Session | Connection, table, key: dict, deltas: dict, create: bool) -> None:
+    cond = [table.c[k] == v for k, v in key.items()]
+    values = {k: table.c[k] + v for k, v in deltas.items()}
+    if bind.execute(update(table).where(*cond).values(values)).rowcount or not create:
+        return
+    try:
+        with bind.begin_nested():
+            bind.execute(insert(table).values(**key, **deltas))
+    except IntegrityError:
+        # created concurrently by another sale
+        bind.execute(update(table).where(*cond).values(values))
+
+
+def record(bind: Session | Connection, sales: Iterable[Sale], sign: int = 1) -> None:
+    """Adds (sign=-1: removes) sales to both rollups. Call in the transaction that writes them."""
+    per_day: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0])
+    per_month: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0])
+    for s in sales:
+        dims = (s.membership_type, s.with_sauna, s.payment_method, s.channel, s.club_id)
+        for acc in (per_day[(s.day, *dims)], per_month[(s.day.replace(day=1), *dims)]):
+            acc[0] += sign
+            acc[1] += sign * s.price
+            acc[2] += sign * s.price if s.to_pay else 0
+
+    for table, period, acc in ((_daily, "day", per_day), (_monthly, "month", per_month)):
+        # fixed key order -> concurrent multi-row updates lock rows in the same order
+        for key, deltas in sorted(acc.items(), key=lambda item: [str(v) for v in item[0]]):
+            _bump(
+                bind,
+                table,
+                dict(zip((period, *REVENUE_DIMENSIONS), key)),
+                dict(zip(MEASURES, deltas)),
+                create=sign > 0,  # nothing to remove from a row that was never recorded
+            )
+
+
+def remove_client_sales(db: Session, client_id: int) -> None:
+    """Takes the client's memberships out of the rollups (call BEFORE deleting them)."""
+    m, p = models.Membership, MembershipPayment
+    rows = db.execute(
+        select(m.type, m.with_sauna, m.price, m.receptionist_id, m.club_id, p.payment_method, p.status, _sale_day())
+        .join(p, p.membership_id == m.id_m)
+        .where(m.client_id == client_id)
+    ).all()
+    record(db, [
+        Sale(
+            day=day,
+            membership_type=mtype,
+            with_sauna=sauna,
+            payment_method=method,
+            channel=channel_for(receptionist_id),
+            club_id=club_id or 0,
+            price=price,
+            to_pay=status == PaymentStatus.TO_PAY,
+        )
+        for mtype, sauna, price, receptionist_id, club_id, method, status, day in rows
+    ], sign=-1)
+
+
+# --- rebuild from memberships / payments ---
+
+def _daily_select(since: date | None = None):
+    m, p = models.Membership, MembershipPayment
+    day = _sale_day()
+    channel = cast(
+        case((m.receptionist_id.is_(None), literal(SalesChannel.CLIENT.value)), else_=literal(SalesChannel.RECEPTION.value)),
+        _daily.c.channel.type,
+    )
+    club = func.coalesce(m.club_id, 0)
+    stmt = (
+        select(
+            day.label("day"),
+            m.type.label("membership_type"),
+            m.with_sauna,
+            p.payment_method,
+            channel.label("channel"),
+            club.label("club_id"),
+            func.count().label("memberships_sold"),
+            func.sum(m.price).label("revenue"),
+            func.sum(case((p.status == PaymentStatus.TO_PAY, m.price), else_=0)).label("revenue_to_pay"),
+        )
+        .join(p, p.membership_id == m.id_m)
+        .group_by(day, m.type, m.with_sauna, p.payment_method, channel, club)
+    )
+    if since is not None:
+        stmt = stmt.where(day >= since)
+    return stmt
+
+
+def _month_of(bind: Connection, col):
+    if bind.dialect.name == "postgresql":
+        return cast(func.date_trunc("month", col), Date)
+    return func.date(col, "start of month", type_=Date)
+
+
+def rebuild(bind: Connection, since: date | None = None) -> tuple[int, int]:
+    """
+    Recomputes revenue_daily (from `since`, default: everything) and the
+    affected months of revenue_monthly. Returns the number of (daily, monthly) rows.
+    """
+    if bind.dialect.name == "postgresql":
+        # sales committing meanwhile wait for the rebuild, then add themselves on top
+        bind.execute(text("LOCK TABLE revenue_daily, revenue_monthly IN EXCLUSIVE MODE"))
+
+    month_from = since.replace(day=1) if since else None
+
+    del_daily = delete(_daily)
+    del_monthly = delete(_monthly)
+    if since is not None:
+        del_daily = del_daily.where(_daily.c.day >= since)
+        del_monthly = del_monthly.where(_monthly.c.month >= month_from)
+    bind.execute(del_daily)
+    bind.execute(del_monthly)
+
+    cols = ["day", *REVENUE_DIMENSIONS, *MEASURES]
+    bind.execute(insert(_daily).from_select(cols, _daily_select(since)))
+
+    month = _month_of(bind, _daily.c.day)
+    dims = [_daily.c[d] for d in REVENUE_DIMENSIONS]
+    monthly = select(month, *dims, *[func.sum(_daily.c[k]) for k in MEASURES]).group_by(month, *dims)
+    if month_from is not None:
+        monthly = monthly.where(_daily.c.day >= month_from)
+    bind.execute(insert(_monthly).from_select(["month", *REVENUE_DIMENSIONS, *MEASURES], monthly))
+
+    return tuple(bind.execute(select(func.count()).select_from(t)).scalar() for t in (_daily, _monthly))
+
+
+def find_mismatches(bind: Connection) -> list[tuple[tuple, tuple | None, tuple | None]]:
+    """(key, stored measures, actual measures) for every revenue_daily row that differs from the raw tables."""
+    def as_dict(rows):
+        return {tuple(r[:6]): tuple(int(v) for v in r[6:]) for r in rows}
+
+    actual = as_dict(bind.execute(_daily_select()).all())
+    stored = {
+        k: v for k, v in as_dict(bind.execute(
+            select(_daily.c.day, *[_daily.c[d] for d in REVENUE_DIMENSIONS], *[_daily.c[k] for k in MEASURES])
+        ).all()).items()
+        if any(v)  # rows brought to zero by deletions are fine
+    }
+    return [(k, stored.get(k), actual.get(k)) for k in sorted(stored.keys() | actual.keys(), key=str)
+            if stored.get(k) != actual.get(k)]
+
+
+# --- dashboard queries ---
+
+_BREAKDOWNS = ("series", "by_type", "by_sauna", "by_payment_method", "by_channel", "by_club")
+
+
+def summarize(rows, period: str, period_format: str) -> dict:
+    """Totals + breakdowns of rollup rows (period = "day" or "month")."""
+    # sum per raw value first, format the (few) keys at the end
+    sums: list[dict] = [defaultdict(lambda: [0, 0, 0]) for _ in _BREAKDOWNS]
+    totals = [0, 0, 0]
+    for r in rows:
+        measures = (r.memberships_sold, r.revenue, r.revenue_to_pay)
+        keys = (getattr(r, period), r.membership_type, r.with_sauna, r.payment_method, r.channel, r.club_id)
+        for acc in (totals, *(s[k] for s, k in zip(sums, keys))):
+            acc[0] += measures[0]
+            acc[1] += measures[1]
+            acc[2] += measures[2]
+
+    formats = (
+        lambda d: d.strftime(period_format),
+        lambda t: t.value,
+        lambda sauna: "GYM_SAUNA" if sauna else "GYM",
+        lambda m: m.value,
+        lambda c: c.value,
+        lambda club: str(club) if club else "none",
+    )
+    out = {"totals": dict(zip(MEASURES, totals))}
+    for name, fmt, acc in zip(_BREAKDOWNS, formats, sums):
+        out[name] = sorted(({"key": fmt(k), **dict(zip(MEASURES, v))} for k, v in acc.items()), key=lambda b: b["key"])
+    return out
+
+
+def month_stmt(year: int, month: int, club_id: int | None = None):
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    stmt = select(_daily).where(_daily.c.day >= start, _daily.c.day < end)  # plain rows, no ORM objects
+    if club_id is not None:
+        stmt = stmt.where(_daily.c.club_id == club_id)
+    return stmt
+
+
+def year_stmt(year: int, club_id: int | None = None):
+    stmt = select(_monthly).where(_monthly.c.month >= date(year, 1, 1), _monthly.c.month < date(year + 1, 1, 1))
+    if club_id is not None:
+        stmt = stmt.where(_monthly.c.club_id == club_id)
+    return stmt
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check or backfill the revenue rollups.")
+    parser.add_argument("command", choices=["check", "backfill"])
+    parser.add_argument("--since", type=date.fromisoformat, default=None, help="backfill from this day (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    from .database import engine
+
+    if args.command == "check":
+        with engine.connect() as conn:
+            mismatches = find_mismatches(conn)
+        for key, stored, actual in mismatches[:50]:
+            print(f"{key}: stored={stored} actual={actual}")
+        print(f"{len(mismatches)} mismatched row(s)")
+        return 1 if mismatches else 0
+
+    with engine.begin() as conn:
+        daily, monthly = rebuild(conn, args.since)
+    print(f"revenue_daily: {daily} rows, revenue_monthly: {monthly} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
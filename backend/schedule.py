@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from datetime import date, time
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, literal, select, tuple_
 from pydantic import BaseModel
-from . import models, database, finance_models
-
-
-from . import models, database
+from . import models, finance_models, occupancy, reservations, response_cache, waitlist
+from .database import get_db, get_read_db, pin_primary, is_pinned
+from .async_database import get_async_read_db
 
 router = APIRouter(
     prefix="/schedule",
@@ -14,18 +18,58 @@ router = APIRouter(
 
 DEFAULT_MAX_CAPACITY = 20
 
+# Timetable page size (keyset pagination)
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 500
+
 
 class BookingRequest(BaseModel):
     client_id: int
     group_class_id: int
+    join_waitlist: bool = False  # when the class is full, wait for a seat instead of failing
 
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# --- response models (OpenAPI + validation of the returned rows) ---
+
+class TimetableClass(BaseModel):
+    id_c: int
+    name: str
+    room: str
+    start_date: date
+    end_date: date
+    start_time: time
+    end_time: time
+    max_capacity: int
+    booked_count: int
+
+
+class MyBooking(BaseModel):
+    booking_id: int
+    group_class_id: int
+    class_name: str
+    room: str
+    start_date: date
+    end_date: date
+    start_time: time
+    end_time: time
+
+
+class BookingResult(BaseModel):
+    status: str
+    message: str
+    booking_id: int
+    waitlist_position: Optional[int] = None  # only when waitlisted
+
+
+class StatusMessage(BaseModel):
+    status: str
+    message: str
+
+
+class WaitlistPosition(BaseModel):
+    group_class_id: int
+    client_id: int
+    waitlist_position: int
 
 
 def _get_max_capacity(group_class) -> int:
@@ -33,23 +77,70 @@ def _get_max_capacity(group_class) -> int:
     return getattr(group_class, "max_capacity", None) or DEFAULT_MAX_CAPACITY
 
 
-@router.get("/classes")
-def get_available_classes(db: Session = Depends(get_db)):
-    """
-    Public timetable list.
-    """
-    classes = db.query(models.GroupClasses).all()
+def _encode_cursor(c) -> str:
+    raw = f"{c.start_date.isoformat()}|{c.start_time.isoformat()}|{c.id_c}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
 
-    # policz zapisy per class_id jednym zapytaniem
-    counts = dict(
-        db.query(
-            models.BookGroupClasses.group_classes_id,
-            func.count(models.BookGroupClasses.client_id)
+
+def _decode_cursor(cursor: str) -> tuple[date, time, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        d, t, class_id = raw.split("|")
+        return date.fromisoformat(d), time.fromisoformat(t), int(class_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _timetable_stmt(
+    *,
+    date_from: Optional[date],
+    date_to: Optional[date],
+    room: Optional[str],
+    instructor_id: Optional[int],
+    name: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+):
+    stmt = select(models.GroupClasses)
+
+    if date_from is not None:
+        stmt = stmt.where(models.GroupClasses.end_date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(models.GroupClasses.start_date <= date_to)
+    if room is not None:
+        stmt = stmt.where(models.GroupClasses.room == room)
+    if instructor_id is not None:
+        stmt = stmt.where(models.GroupClasses.instructor_id == instructor_id)
+    if name is not None:
+        stmt = stmt.where(models.GroupClasses.name.ilike(f"%{name}%"))
+
+    if cursor is not None:
+        after_date, after_time, after_id = _decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(
+                models.GroupClasses.start_date,
+                models.GroupClasses.start_time,
+                models.GroupClasses.id_c,
+            ) > tuple_(literal(after_date), literal(after_time), literal(after_id))
         )
-        .group_by(models.BookGroupClasses.group_classes_id)
-        .all()
-    )
 
+    # pobieramy o jeden wiersz więcej, żeby wiedzieć czy jest następna strona
+    return stmt.order_by(
+        models.GroupClasses.start_date,
+        models.GroupClasses.start_time,
+        models.GroupClasses.id_c,
+    ).limit(limit + 1)
+
+
+def _timetable_page(rows, limit: int) -> tuple[list, dict[str, str]]:
+    classes = rows[:limit]
+    headers = {}
+    if len(rows) > limit:
+        headers["X-Next-Cursor"] = _encode_cursor(classes[-1])
+    return classes, headers
+
+
+def _timetable_rows(classes, counts: dict[int, int]) -> list[dict]:
     result = []
     for c in classes:
         booked = int(counts.get(c.id_c, 0) or 0)
@@ -66,13 +157,70 @@ def get_available_classes(db: Session = Depends(get_db)):
             "max_capacity": max_cap,
             "booked_count": booked, 
         })
-
     return result
 
 
+async def _build_timetable(db: AsyncSession, *, limit: int, **filters) -> tuple[list[dict], dict[str, str]]:
+    rows = (await db.execute(_timetable_stmt(limit=limit, **filters))).scalars().all()
+    classes, headers = _timetable_page(rows, limit)
+
+    # liczniki zapisów tylko dla zajęć z tej strony
+    counts = await occupancy.get_booked_counts_async(db, [c.id_c for c in classes])
+    return _timetable_rows(classes, counts), headers
+
 
-@router.post("/book")
-def book_class(booking: BookingRequest, db: Session = Depends(get_db)):
+def _timetable_range(date_from: Optional[date], date_to: Optional[date]) -> tuple[Optional[date], Optional[date]]:
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must be >= date_from")
+
+    # bez date_from pierwsza strona to nadchodzące zajęcia, nie najstarsze w bazie
+    today = date.today()
+    if date_from is None and (date_to is None or date_to >= today):
+        date_from = today
+    return date_from, date_to
+
+
+@router.get("/classes", response_model=list[TimetableClass])
+async def get_available_classes(
+    request: Request,
+    date_from: Optional[date] = Query(default=None),
+    date_to: Optional[date] = Query(default=None),
+    room: Optional[str] = Query(default=None),
+    instructor_id: Optional[int] = Query(default=None, ge=1),
+    name: Optional[str] = Query(default=None, min_length=1),
+    cursor: Optional[str] = Query(default=None),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """
+    Public timetable list, from today on unless date_from is given (or date_to is in the past).
+    Ordered by (start_date, start_time, id_c) and paginated with a keyset cursor:
+    the next page cursor is returned in the X-Next-Cursor header (absent on the last page).
+    Served from the response cache with an ETag (If-None-Match -> 304); a request
+    pinned to the primary after a write rebuilds the entry instead of reading it.
+    """
+    date_from, date_to = _timetable_range(date_from, date_to)
+
+    return await response_cache.cached_json_async(
+        request,
+        response_cache.TIMETABLE,
+        lambda: _build_timetable(
+            db,
+            date_from=date_from,
+            date_to=date_to,
+            room=room,
+            instructor_id=instructor_id,
+            name=name,
+            cursor=cursor,
+            limit=limit,
+        ),
+        fresh=is_pinned(request),
+    )
+
+
+
+@router.post("/book", response_model=BookingResult, response_model_exclude_none=True)
+def book_class(booking: BookingRequest, response: Response, db: Session = Depends(get_db)):
     """
     Book a group class for a client.
     """
@@ -83,31 +231,46 @@ def book_class(booking: BookingRequest, db: Session = Depends(get_db)):
     if not group_class:
         raise HTTPException(status_code=404, detail="Class not found")
 
-    # count bookings: BookGroupClasses ma PK (client_id, group_classes_id) bez id_booking
-    current_bookings_count = db.query(func.count(models.BookGroupClasses.client_id)) \
-        .filter(models.BookGroupClasses.group_classes_id == booking.group_class_id) \
-        .scalar() or 0
-
     max_capacity = _get_max_capacity(group_class)
 
-    if current_bookings_count >= max_capacity:
-        raise HTTPException(status_code=400, detail="Sorry, no places left (Full capacity)")
-
-    existing_booking = db.query(models.BookGroupClasses).filter(
-        models.BookGroupClasses.group_classes_id == booking.group_class_id,
-        models.BookGroupClasses.client_id == booking.client_id
-    ).first()
+    def reserve():
+        reservations.reserve_seat(
+            db,
+            client_id=booking.client_id,
+            group_class_id=booking.group_class_id,
+            max_capacity=max_capacity,
+        )
 
-    if existing_booking:
+    try:
+        try:
+            reserve()
+        except reservations.ClassFullError:
+            if not booking.join_waitlist:
+                raise HTTPException(status_code=400, detail="Sorry, no places left (Full capacity)")
+            try:
+                position = waitlist.join(
+                    db, client_id=booking.client_id, group_class_id=booking.group_class_id, max_capacity=max_capacity
+                )
+            except waitlist.AlreadyWaitlistedError:
+                raise HTTPException(status_code=400, detail="You are already on the waitlist for this class")
+            if position is None:
+                # a seat freed up meanwhile; join() holds the class lock, so it is still ours
+                reserve()
+            else:
+                db.commit()
+                pin_primary(response)
+                return {
+                    "status": "waitlisted",
+                    "message": f"The class is full. You are number {position} on the waitlist.",
+                    "booking_id": booking.group_class_id,
+                    "waitlist_position": position,
+                }
+    except reservations.AlreadyBookedError:
         raise HTTPException(status_code=400, detail="You are already booked for this class")
 
-    new_booking = models.BookGroupClasses(
-        client_id=booking.client_id,
-        group_classes_id=booking.group_class_id
-    )
-
-    db.add(new_booking)
     db.commit()
+    response_cache.invalidate(response_cache.TIMETABLE)
+    pin_primary(response) # the client's next reads see this booking
 
     return {
         "status": "success",
@@ -117,40 +280,85 @@ def book_class(booking: BookingRequest, db: Session = Depends(get_db)):
     }
 
 
-@router.get("/my-bookings/{client_id}")
-def get_my_bookings(client_id: int, db: Session = Depends(get_db)):
+def _my_bookings_stmt(client_id: int, when: Optional[str]):
+    stmt = (
+        select(
+            models.BookGroupClasses.group_classes_id,
+            models.GroupClasses.name,
+            models.GroupClasses.room,
+            models.GroupClasses.start_date,
+            models.GroupClasses.end_date,
+            models.GroupClasses.start_time,
+            models.GroupClasses.end_time,
+        )
+        .join(models.GroupClasses, models.GroupClasses.id_c == models.BookGroupClasses.group_classes_id)
+        .where(models.BookGroupClasses.client_id == client_id)
+    )
+
+    today = date.today()
+    if when == "upcoming":
+        stmt = stmt.where(models.GroupClasses.end_date >= today)
+    elif when == "past":
+        stmt = stmt.where(models.GroupClasses.end_date < today)
+
+    if when == "past":
+        stmt = stmt.order_by(
+            models.GroupClasses.start_date.desc(),
+            models.GroupClasses.start_time.desc(),
+            models.GroupClasses.id_c.desc(),
+        )
+    else:
+        stmt = stmt.order_by(
+            models.GroupClasses.start_date,
+            models.GroupClasses.start_time,
+            models.GroupClasses.id_c,
+        )
+    return stmt
+
+
+def _my_booking_rows(rows) -> list[dict]:
+    return [
+        {
+            "booking_id": row.group_classes_id,   # stabilny "id" dla frontu
+            "group_class_id": row.group_classes_id,
+            "class_name": row.name,
+            "room": row.room,
+            "start_date": row.start_date,
+            "end_date": row.end_date,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+        }
+        for row in rows
+    ]
+
+
+@router.get("/my-bookings/{client_id}", response_model=list[MyBooking])
+async def get_my_bookings(
+    client_id: int,
+    response: Response,
+    when: Optional[Literal["upcoming", "past"]] = Query(default=None),
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(default=0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """
-    Shows all bookings for a specific client.
+    Shows bookings for a specific client (one joined query).
+    when=upcoming -> classes ending today or later (soonest first),
+    when=past -> classes that already ended (most recent first).
+    The total number of matching bookings is returned in the X-Total-Count header when paginating.
     """
-    my_bookings = db.query(models.BookGroupClasses).filter(
-        models.BookGroupClasses.client_id == client_id
-    ).all()
-
-    if not my_bookings:
-        return []
-
-    result_list = []
-    for booking in my_bookings:
-        class_info = db.query(models.GroupClasses).filter(
-            models.GroupClasses.id_c == booking.group_classes_id
-        ).first()
-
-        if class_info:
-            result_list.append({
-                "booking_id": booking.group_classes_id,   # stabilny "id" dla frontu
-                "group_class_id": booking.group_classes_id,
-                "class_name": class_info.name,
-                "room": class_info.room,
-                "start_date": class_info.start_date,
-                "end_date": class_info.end_date,
-                "start_time": class_info.start_time,
-                "end_time": class_info.end_time,
-            })
-
-    return result_list
-
-@router.delete("/bookings/{client_id}/{group_class_id}")
-def cancel_booking(client_id: int, group_class_id: int, db: Session = Depends(get_db)):
+    stmt = _my_bookings_stmt(client_id, when)
+
+    if limit is not None:
+        total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+        response.headers["X-Total-Count"] = str(total)
+        stmt = stmt.limit(limit).offset(offset)
+
+    rows = (await db.execute(stmt)).all()
+    return _my_booking_rows(rows)
+
+@router.delete("/bookings/{client_id}/{group_class_id}", response_model=StatusMessage)
+def cancel_booking(client_id: int, group_class_id: int, response: Response, db: Session = Depends(get_db)):
     """Cancel an existing booking for a client (removes row from book_group_classes)."""
     deleted = (
         db.query(models.BookGroupClasses)
@@ -162,13 +370,36 @@ def cancel_booking(client_id: int, group_class_id: int, db: Session = Depends(ge
     )
 
     if deleted == 0:
+        # not booked -> maybe waiting for a seat
+        if waitlist.leave(db, client_id=client_id, group_class_id=group_class_id):
+            db.commit()
+            pin_primary(response)
+            return {"status": "success", "message": "Removed from the waitlist"}
         raise HTTPException(status_code=404, detail="Booking not found")
 
+    occupancy.decrement(db, group_class_id)
+
     # optional meta cleanup (if booking was created via reception flow)
     db.query(finance_models.BookGroupClassesMeta).filter(
         finance_models.BookGroupClassesMeta.client_id == client_id,
         finance_models.BookGroupClassesMeta.group_classes_id == group_class_id,
     ).delete(synchronize_session=False)
 
+    # freed seat goes to the first client on the waitlist
+    group_class = db.get(models.GroupClasses, group_class_id)
+    if group_class is not None:
+        waitlist.promote(db, group_class_id, _get_max_capacity(group_class))
+
     db.commit()
+    response_cache.invalidate(response_cache.TIMETABLE)
+    pin_primary(response)
     return {"status": "success", "message": "Booking cancelled"}
+
+
+@router.get("/waitlist/{client_id}/{group_class_id}", response_model=WaitlistPosition)
+def get_waitlist_position(client_id: int, group_class_id: int, db: Session = Depends(get_read_db)):
+    """Client's current position on the waitlist of a class."""
+    position = waitlist.position(db, client_id=client_id, group_class_id=group_class_id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="Not on the waitlist")
+    return {"group_class_id": group_class_id, "client_id": client_id, "waitlist_position": position}
@@ -0,0 +1,237 @@
+"""
+Per-request SQL instrumentation.
+
+Engine event hooks time every statement (sync engines, the replica and the
+async engines, which run on a sync Engine underneath). SQLMetricsMiddleware
+collects them per request and aggregates per route ("GET /schedule/my-bookings/{client_id}"):
+  - statements per request and DB time per request (histograms),
+  - totals, and the slowest statement seen.
+GET /metrics/sql returns the aggregate, hottest routes first. Every response
+also carries a Server-Timing header with its DB time and statement count.
+
+Statements slower than SLOW_QUERY_MS are logged to the "gym.sql.slow" logger
+with the route and the shape of the bound parameters (names and types, never
+the values), so N+1 loops and slow lookups can be found from production logs.
+
+Settings: SQL_METRICS_ENABLED (default true), SLOW_QUERY_MS (default 200).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_METRICS_ENABLED = os.getenv("SQL_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+slow_log = logging.getLogger("gym.sql.slow")
+
+# upper bounds of the per-request histograms
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+_MAX_STATEMENT_CHARS = 500
+_MAX_PARAMS_SHOWN = 20
+
+
+@dataclass
+class RequestStats:
+    scope: dict | None = None
+    statements: int = 0
+    db_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_sql: str | None = None
+
+    @property
+    def route(self) -> str:
+        """Route template once the router has matched ("GET /schedule/my-bookings/{client_id}")."""
+        if self.scope is None:
+            return "(no request)"
+        path = getattr(self.scope.get("route"), "path", None)
+        return f"{self.scope['method']} {path or '(unmatched)'}"
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("sql_request_stats", default=None)
+
+
+def _compact(sql: str) -> str:
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql if len(sql) <= _MAX_STATEMENT_CHARS else sql[:_MAX_STATEMENT_CHARS] + "..."
+
+
+def param_shape(params, executemany: bool = False):
+    """Names and types of the bound parameters, e.g. {"client_id_1": "int"} or ["int", "date"]."""
+    if executemany and isinstance(params, (list, tuple)):
+        return {"rows": len(params), "row": param_shape(params[0]) if params else None}
+    if isinstance(params, dict):
+        items = list(params.items())
+        shape = {k: type(v).__name__ for k, v in items[:_MAX_PARAMS_SHOWN]}
+        if len(items) > _MAX_PARAMS_SHOWN:
+            shape["..."] = f"+{len(items) - _MAX_PARAMS_SHOWN} more"
+        return shape
+    if isinstance(params, (list, tuple)):
+        shape = [type(v).__name__ for v in params[:_MAX_PARAMS_SHOWN]]
+        if len(params) > _MAX_PARAMS_SHOWN:
+            shape.append(f"+{len(params) - _MAX_PARAMS_SHOWN} more")
+        return shape
+    return type(params).__name__
+
+
+def _histogram(bounds, values_counts):
+    labels = [f"<={b}" for b in bounds] + [f">{bounds[-1]}"]
+    return dict(zip(labels, values_counts))
+
+
+def _bucket(bounds, value) -> int:
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    statements: int = 0
+    db_ms: float = 0.0
+    max_statements: int = 0
+    slowest_ms: float = 0.0
+    slowest_sql: str | None = None
+    statement_hist: list[int] = field(default_factory=lambda: [0] * (len(STATEMENT_BUCKETS) + 1))
+    db_time_hist: list[int] = field(default_factory=lambda: [0] * (len(DB_TIME_BUCKETS_MS) + 1))
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "statements_total": self.statements,
+            "statements_avg": round(self.statements / self.requests, 2) if self.requests else 0.0,
+            "statements_max": self.max_statements,
+            "db_ms_total": round(self.db_ms, 3),
+            "db_ms_avg": round(self.db_ms / self.requests, 3) if self.requests else 0.0,
+            "slowest_statement_ms": round(self.slowest_ms, 3),
+            "slowest_statement": self.slowest_sql,
+            "statements_per_request": _histogram(STATEMENT_BUCKETS, self.statement_hist),
+            "db_ms_per_request": _histogram(DB_TIME_BUCKETS_MS, self.db_time_hist),
+        }
+
+
+class SQLMetrics:
+    """Aggregated per-route numbers (process-wide)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[str, RouteStats] = {}
+
+    def record(self, stats: RequestStats) -> None:
+        with self._lock:
+            route = self._routes.setdefault(stats.route, RouteStats())
+            route.requests += 1
+            route.statements += stats.statements
+            route.db_ms += stats.db_ms
+            route.max_statements = max(route.max_statements, stats.statements)
+            route.statement_hist[_bucket(STATEMENT_BUCKETS, stats.statements)] += 1
+            route.db_time_hist[_bucket(DB_TIME_BUCKETS_MS, stats.db_ms)] += 1
+            if stats.slowest_ms > route.slowest_ms:
+                route.slowest_ms = stats.slowest_ms
+                route.slowest_sql = stats.slowest_sql
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = sorted(self._routes.items(), key=lambda kv: kv[1].db_ms, reverse=True)
+            return {
+                "slow_query_ms": SLOW_QUERY_MS,
+                "routes": {name: r.snapshot() for name, r in routes},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+sql_metrics = SQLMetrics()
+
+
+# --- engine hooks (every Engine in the process) ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_metrics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("sql_metrics_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_ms += elapsed_ms
+        if elapsed_ms > stats.slowest_ms:
+            stats.slowest_ms = elapsed_ms
+            stats.slowest_sql = _compact(statement)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        slow_log.warning(
+            "slow query %.1f ms route=%s params=%s sql=%s",
+            elapsed_ms,
+            stats.route if stats is not None else "(no request)",
+            param_shape(parameters, executemany),
+            _compact(statement),
+        )
+
+
+def _handle_error(exception_context):
+    # failed statement: drop its start time so the stack stays aligned
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_metrics_start"):
+        conn.info["sql_metrics_start"].pop()
+
+
+def install() -> None:
+    """Registers the engine hooks once (no-op when SQL_METRICS_ENABLED is false)."""
+    if not SQL_METRICS_ENABLED or event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+
+# --- middleware ---
+
+class SQLMetricsMiddleware:
+    """ASGI middleware: opens a RequestStats per HTTP request and records it under the route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.db_ms:.1f};desc="{stats.statements} statements"'.encode(),
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            sql_metrics.record(stats)
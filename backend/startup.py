@@ -0,0 +1,98 @@
+"""
+Worker warm-up and readiness.
+
+Importing the app does no I/O: no connection, no DDL (the schema is managed by
+`python -m backend.migrate`, run once per deploy). A worker becomes ready after
+warm_up() has
+  - configured the ORM mappers (otherwise paid by the first request),
+  - opened the first pooled database connection,
+  - checked that no migration is pending,
+  - loaded the membership price catalog (prices.py),
+  - started the password hashing processes (passwords.py).
+
+GET /ready answers 503 until that has succeeded, so a load balancer only routes
+traffic to warm workers. A failed warm-up (database down, migrations pending,
+any step raising) is retried by the next readiness probe.
+
+Cold-start target: import <= COLD_START_IMPORT_TARGET_MS and import + warm-up
+<= COLD_START_READY_TARGET_MS; measured by backend/benchmarks/cold_start.py.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy.orm import configure_mappers
+
+from . import migrate, passwords, prices
+from .database import engine, check_database
+
+COLD_START_IMPORT_TARGET_MS = float(os.getenv("COLD_START_IMPORT_TARGET_MS", "1500"))
+COLD_START_READY_TARGET_MS = float(os.getenv("COLD_START_READY_TARGET_MS", "2500"))
+
+# measured from the import of this module (early in backend.main)
+_t0 = time.perf_counter()
+
+
+class Readiness:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.status = "starting"
+        self.pending_migrations: list[int] = []
+        self.ready_after_ms: float | None = None
+        self.warm_up_ms: float | None = None
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "ready" if self.ready else self.status,
+            "ready_after_ms": self.ready_after_ms,
+            "warm_up_ms": self.warm_up_ms,
+            "pending_migrations": self.pending_migrations,
+        }
+
+
+readiness = Readiness()
+
+logger = logging.getLogger("gym.startup")
+
+
+def warm_up() -> bool:
+    """Runs the warm-up steps once (thread-safe, skipped when already ready). Returns readiness."""
+    if readiness.ready:
+        return True
+    if not readiness._lock.acquire(blocking=False):
+        return False  # another thread is warming up right now
+
+    try:
+        start = time.perf_counter()
+        configure_mappers()
+
+        if not check_database():
+            readiness.status = "database unavailable"
+            return False
+
+        pending = migrate.pending_versions_readonly(engine)
+        readiness.pending_migrations = pending
+        if pending:
+            readiness.status = "migrations pending"
+            return False
+
+        prices.catalog.refresh()
+        passwords.pool.start()
+
+        now = time.perf_counter()
+        readiness.warm_up_ms = round((now - start) * 1000, 1)
+        readiness.ready_after_ms = round((now - _t0) * 1000, 1)
+        readiness.status = "ready"
+        readiness.ready = True
+        return True
+    except Exception as e:
+        # not ready (503), retried by the next probe; never an error out of /ready or the lifespan
+        logger.warning("warm-up failed", exc_info=True)
+        readiness.status = f"warm-up failed: {type(e).__name__}"
+        return False
+    finally:
+        readiness._lock.release()
@@ -0,0 +1,140 @@
+"""
+FIFO waitlist for full group classes.
+
+A waiting client is a book_group_classes_meta row with status WAITLISTED and no
+book_group_classes row. When a seat frees up (cancel_booking, delete_client),
+promote() moves the oldest waiting clients into book_group_classes in the same
+transaction, under the class occupancy row lock, so two concurrent cancellations
+never hand out the same seat twice.
+"""
+from __future__ import annotations
+
+from sqlalchemy import and_, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from . import models, occupancy
+from .finance_models import BookGroupClassesMeta, ReservationStatus
+
+
+class AlreadyWaitlistedError(Exception):
+    pass
+
+
+def _waiting(db: Session, group_class_id: int):
+    return db.query(BookGroupClassesMeta).filter(
+        BookGroupClassesMeta.group_classes_id == group_class_id,
+        BookGroupClassesMeta.status == ReservationStatus.WAITLISTED,
+    )
+
+
+def _lock_occupancy(db: Session, group_class_id: int) -> models.GroupClassOccupancy:
+    occupancy.ensure_row(db, group_class_id)
+    return (
+        db.query(models.GroupClassOccupancy)
+        .filter(models.GroupClassOccupancy.group_classes_id == group_class_id)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+
+
+def join(db: Session, *, client_id: int, group_class_id: int, max_capacity: int) -> int | None:
+    """
+    Adds the client at the end of the waitlist (caller commits). Returns the 1-based position.
+    Under the occupancy row lock (like promote()): if a seat freed up since the failed
+    booking, nothing is added and None is returned; the lock is held until commit, so the
+    caller can book that seat.
+    """
+    occ = _lock_occupancy(db, group_class_id)
+    if occ.booked_count < max_capacity:
+        return None
+
+    entry = BookGroupClassesMeta(
+        client_id=client_id,
+        group_classes_id=group_class_id,
+        membership_id=None,
+        status=ReservationStatus.WAITLISTED,
+        booked_by_receptionist_id=None,
+    )
+    try:
+        with db.begin_nested():
+            db.add(entry)
+            db.flush()
+    except IntegrityError:
+        raise AlreadyWaitlistedError()
+
+    return position(db, client_id=client_id, group_class_id=group_class_id)
+
+
+def position(db: Session, *, client_id: int, group_class_id: int) -> int | None:
+    """1-based position on the waitlist, None if the client is not waiting for this class."""
+    me = aliased(BookGroupClassesMeta)
+    row = (
+        db.query(me.client_id, func.count(BookGroupClassesMeta.client_id))
+        .outerjoin(
+            BookGroupClassesMeta,
+            and_(
+                BookGroupClassesMeta.group_classes_id == me.group_classes_id,
+                BookGroupClassesMeta.status == ReservationStatus.WAITLISTED,
+                tuple_(BookGroupClassesMeta.created_at, BookGroupClassesMeta.client_id)
+                < tuple_(me.created_at, me.client_id),
+            ),
+        )
+        .filter(
+            me.client_id == client_id,
+            me.group_classes_id == group_class_id,
+            me.status == ReservationStatus.WAITLISTED,
+        )
+        .group_by(me.client_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return int(row[1]) + 1
+
+
+def leave(db: Session, *, client_id: int, group_class_id: int) -> bool:
+    """Removes the client from the waitlist (caller commits). True if an entry was removed."""
+    deleted = _waiting(db, group_class_id).filter(
+        BookGroupClassesMeta.client_id == client_id
+    ).delete(synchronize_session=False)
+    return deleted > 0
+
+
+def clear_entries(db: Session, pairs: list[tuple[int, int]]) -> None:
+    """Drops waitlist entries of (client_id, group_class_id) pairs that just got a seat another way."""
+    if not pairs:
+        return
+    db.query(BookGroupClassesMeta).filter(
+        BookGroupClassesMeta.status == ReservationStatus.WAITLISTED,
+        tuple_(BookGroupClassesMeta.client_id, BookGroupClassesMeta.group_classes_id).in_(pairs),
+    ).delete(synchronize_session=False)
+
+
+def promote(db: Session, group_class_id: int, max_capacity: int) -> list[int]:
+    """
+    Fills free seats of the class from the head of the waitlist (caller commits).
+    Returns the promoted client ids, oldest first.
+    """
+    occ = _lock_occupancy(db, group_class_id)
+
+    free = max_capacity - occ.booked_count
+    if free <= 0:
+        return []
+
+    entries = (
+        _waiting(db, group_class_id)
+        .order_by(BookGroupClassesMeta.created_at, BookGroupClassesMeta.client_id)
+        .limit(free)
+        .all()
+    )
+    if not entries:
+        return []
+
+    promoted = [e.client_id for e in entries]
+    for e in entries:
+        db.add(models.BookGroupClasses(client_id=e.client_id, group_classes_id=group_class_id))
+        db.delete(e)
+    occupancy.increment(db, group_class_id, by=len(promoted))
+    return promoted